@@ -1,6 +1,6 @@
 # /usr/bin/env python3
 # -*- coding: utf-8 -*-
-from .core import Argonaut, SubCommand
+from .core import Argonaut, SubCommand, LazySubCommand
 from .arguments import Argument, ArgumentGroup, MutuallyExclusiveGroup
 from .decorators import (
     env_var,
@@ -28,18 +28,37 @@ from .exceptions import (
     ArgonautDependencyError,
     PluginLoadError,
     PluginExecutionError,
+    PluginTimeoutError,
+    PluginCancelledError,
+    PluginWorkerLostError,
 )
 from .shell_completion import generate_completion_script
 from .logging import ArgonautLogger, LogLevel
-from .plugins import PluginManager, Plugin, PluginMetadata, PluginContext
+from .plugins import (
+    PluginManager,
+    Plugin,
+    PluginMetadata,
+    PluginContext,
+    PluginHook,
+    HookResult,
+    LazyPlugin,
+)
+from .plugin_manifest import PluginManifest
+from .executors import MapResult
+from .cancellation import CancellationToken
+from .pipeline import Pipeline, PipelineStage
+from .metrics import MetricsRegistry
+from .tracing import Tracer
+from .result_cache import ResultCache, MemoryCache, SQLiteCache
 from .input_sanitizer import sanitize_input
 from .fancy_output import ProgressBar, ColoredOutput
-from .utils import get_input_with_autocomplete
+from .utils import PrefixIndex, get_input_with_autocomplete
 
 
 __all__ = [
     "Argonaut",
     "SubCommand",
+    "LazySubCommand",
     "Argument",
     "ArgumentGroup",
     "MutuallyExclusiveGroup",
@@ -66,6 +85,9 @@ __all__ = [
     "ArgonautDependencyError",
     "PluginLoadError",
     "PluginExecutionError",
+    "PluginTimeoutError",
+    "PluginCancelledError",
+    "PluginWorkerLostError",
     "generate_completion_script",
     "ArgonautLogger",
     "LogLevel",
@@ -76,7 +98,21 @@ __all__ = [
     "ProgressBar",
     "ColoredOutput",
     "get_input_with_autocomplete",
+    "PrefixIndex",
     "PluginContext",
+    "LazyPlugin",
+    "PluginManifest",
+    "MapResult",
+    "PluginHook",
+    "HookResult",
+    "ResultCache",
+    "MemoryCache",
+    "SQLiteCache",
+    "CancellationToken",
+    "Pipeline",
+    "PipelineStage",
+    "MetricsRegistry",
+    "Tracer",
 ]
 
 __version__ = "1.2.0"
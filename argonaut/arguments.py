@@ -38,6 +38,8 @@ class Argument:
         "dependencies",
         "conflicts",
         "is_global",
+        "completer",
+        "completion_ttl",
     ]
 
     def __init__(self, *names: str, **kwargs):
@@ -59,6 +61,10 @@ class Argument:
         self.dependencies: List[str] = kwargs.get("dependencies", [])
         self.conflicts: List[str] = kwargs.get("conflicts", [])
         self.is_global: bool = kwargs.get("is_global", False)
+        self.completer: Optional[Union[str, Callable[[], Any]]] = kwargs.get(
+            "completer"
+        )
+        self.completion_ttl: float = kwargs.get("completion_ttl", 60.0)
 
         if callable(self.default):
             self._dynamic_default = self.default
@@ -166,6 +172,22 @@ class Argument:
         self.custom_validators.append(validator)
         return self
 
+    def set_completer(
+        self, completer: Union[str, Callable[[], Any]], ttl: Optional[float] = None
+    ) -> "Argument":
+        """
+        Complete this argument's values with a provider.
+
+        The provider takes no arguments and returns the candidate values. Give
+        it as a ``"module:function"`` string (or a module-level function) so
+        generated shell completion scripts can import it without loading the
+        application. Its results are cached on disk for ``ttl`` seconds.
+        """
+        self.completer = completer
+        if ttl is not None:
+            self.completion_ttl = ttl
+        return self
+
     def add_action(self, action: Callable[[Any], Any]) -> "Argument":
         self.custom_actions.append(action)
         return self
@@ -0,0 +1,202 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+import json
+import multiprocessing
+import shlex
+import sys
+import threading
+from functools import partial
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Any, Iterator, Optional, TextIO, Tuple, Union
+from .exceptions import ArgonautError
+from .executors import process_context
+from .utils import import_from_string
+
+# The parser used by process-pool workers. Workers either build their own
+# from the parser factory, or are forked and inherit it (and every loaded
+# plugin) instead of unpickling a copy.
+_BATCH_PARSER: Any = None
+
+
+class _ThreadOutput(io.TextIOBase):
+    """Routes writes to the current thread's capture buffer, if it has one."""
+
+    def __init__(self, fallback: TextIO):
+        self.fallback = fallback
+        self.local = threading.local()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: str) -> int:
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer if buffer is not None else self.fallback).write(data)
+
+    def flush(self) -> None:
+        if getattr(self.local, "buffer", None) is None:
+            self.fallback.flush()
+
+
+def _read_commands(source: Union[str, TextIO]) -> Iterator[Tuple[int, str]]:
+    if isinstance(source, str):
+        if source == "-":
+            yield from _read_commands(sys.stdin)
+            return
+        with open(source, "r", encoding="utf-8") as f:
+            yield from _read_commands(f)
+        return
+    for lineno, line in enumerate(source, 1):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield lineno, line
+
+
+def run_line(parser: Any, lineno: int, line: str) -> Tuple[int, str]:
+    """
+    Dispatch one command line and return ``(exit_code, json_record)``.
+
+    The record holds the line number, the command, its exit code, the
+    dispatch result, any error message and everything the command printed.
+    """
+    record = {"line": lineno, "command": line, "exit": 0, "result": None}
+    output = sys.stdout if isinstance(sys.stdout, _ThreadOutput) else None
+    buffer = io.StringIO()
+    if output is not None:
+        output.local.buffer = buffer
+    try:
+        result = parser.dispatch(shlex.split(line))
+    except SystemExit as e:
+        record["exit"] = e.code if isinstance(e.code, int) else int(bool(e.code))
+    except (ArgonautError, ValueError) as e:
+        record["exit"] = 2
+        record["error"] = str(e)
+    except Exception as e:
+        record["exit"] = 1
+        record["error"] = f"{type(e).__name__}: {str(e)}"
+    else:
+        if isinstance(result, int) and not isinstance(result, bool):
+            record["exit"] = result
+        else:
+            record["result"] = result
+    finally:
+        if output is not None:
+            output.local.buffer = None
+    record["stdout"] = buffer.getvalue()
+    return record["exit"], json.dumps(record, default=str)
+
+
+def _initialize_batch_worker(parser_factory: str) -> None:
+    global _BATCH_PARSER
+    # Started fresh rather than forked, so the worker has to set up the
+    # output capture run_line relies on itself.
+    if not isinstance(sys.stdout, _ThreadOutput):
+        sys.stdout = _ThreadOutput(sys.stdout)
+    _BATCH_PARSER = import_from_string(parser_factory)()
+
+
+def _run_line_in_worker(lineno: int, line: str) -> Tuple[int, str]:
+    return run_line(_BATCH_PARSER, lineno, line)
+
+
+def run_batch(
+    parser: Any,
+    source: Union[str, TextIO],
+    output: Optional[Union[str, TextIO]] = None,
+    jobs: int = 1,
+    use_processes: bool = False,
+    parser_factory: Optional[str] = None,
+) -> int:
+    """
+    Run every command line in ``source`` through ``parser.dispatch``.
+
+    Blank lines and lines starting with ``#`` are skipped. One JSON object is
+    written to ``output`` per command, in completion order. With ``jobs``
+    above 1, lines run concurrently on a thread pool or, with
+    ``use_processes``, on worker processes. Given a ``parser_factory``, the
+    workers are started with ``forkserver`` (or ``spawn``) and each builds
+    its own parser with it. Without one, they are forked and inherit the
+    parser and its loaded plugins, which is only safe if no other thread
+    holds a lock at that moment. At most ``jobs * 4`` lines are in flight
+    at once, so memory stays flat on large inputs.
+
+    Args:
+        parser (Argonaut): The parser used to dispatch each line.
+        source (Union[str, TextIO]): A path, ``"-"`` for stdin, or a file object.
+        output (Optional[Union[str, TextIO]]): A path or file object for the
+            JSON Lines results. Defaults to stdout.
+        jobs (int): The number of lines to run concurrently.
+        use_processes (bool): Use a process pool instead of a thread pool.
+        parser_factory (Optional[str]): A ``"module:function"`` that returns
+            the parser, with its plugins loaded, for process workers.
+
+    Returns:
+        int: The number of commands that exited with a non-zero code.
+    """
+    global _BATCH_PARSER
+
+    if isinstance(output, str):
+        with open(output, "w", encoding="utf-8") as f:
+            return run_batch(parser, source, f, jobs, use_processes, parser_factory)
+
+    real_stdout = sys.stdout
+    output = output or real_stdout
+    sys.stdout = _ThreadOutput(real_stdout)
+    failures = 0
+
+    def write(exit_code: int, record: str) -> None:
+        nonlocal failures
+        failures += exit_code != 0
+        output.write(record + "\n")
+        output.flush()
+
+    try:
+        commands = _read_commands(source)
+        if jobs <= 1:
+            for lineno, line in commands:
+                write(*run_line(parser, lineno, line))
+            return failures
+
+        executor: Executor
+        if use_processes and parser_factory:
+            executor = ProcessPoolExecutor(
+                jobs,
+                mp_context=process_context(),
+                initializer=_initialize_batch_worker,
+                initargs=(parser_factory,),
+            )
+            submit = partial(executor.submit, _run_line_in_worker)
+        elif use_processes:
+            if "fork" not in multiprocessing.get_all_start_methods():
+                raise ArgonautError(
+                    "Process-based batch mode requires fork() or a parser_factory"
+                )
+            _BATCH_PARSER = parser
+            executor = ProcessPoolExecutor(
+                jobs, mp_context=multiprocessing.get_context("fork")
+            )
+            submit = partial(executor.submit, _run_line_in_worker)
+        else:
+            executor = ThreadPoolExecutor(jobs)
+            submit = partial(executor.submit, run_line, parser)
+
+        with executor:
+            pending = set()
+            for lineno, line in commands:
+                pending.add(submit(lineno, line))
+                if len(pending) >= jobs * 4:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        write(*future.result())
+            for future in wait(pending).done:
+                write(*future.result())
+        return failures
+    finally:
+        sys.stdout = real_stdout
+        _BATCH_PARSER = None
@@ -0,0 +1,120 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import contextvars
+import threading
+from typing import Any, Callable, List, Optional
+
+from .exceptions import PluginCancelledError
+
+
+class CancellationToken:
+    """
+    Tells a running plugin execution that it should stop.
+
+    Python cannot stop a thread from the outside, so a plugin that runs for
+    long should check :attr:`cancelled` (or call :meth:`raise_if_cancelled`)
+    between units of work, wait on the token instead of sleeping, and
+    register callbacks that release what it holds, such as closing a socket
+    a blocking read is waiting on. A plugin reaches the token of its current
+    execution through ``self.context.cancellation``.
+
+    Attributes:
+        name (str): The plugin the execution belongs to.
+        reason (Optional[str]): Why the execution was cancelled.
+    """
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._finished = threading.Event()
+        self._callbacks: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Cancel the execution and run the registered callbacks once."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def add_callback(self, callback: Callable[[], Any]) -> None:
+        """Call ``callback`` on cancellation, or now if already cancelled."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise PluginCancelledError(self.name, self.reason)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep for up to ``timeout`` seconds; returns True if cancelled."""
+        return self._event.wait(timeout)
+
+    def finish(self) -> None:
+        """Mark the execution as ended, waking :meth:`wait_finished`."""
+        self._finished.set()
+
+    def wait_finished(self, timeout: Optional[float] = None) -> bool:
+        """Block until the execution has ended; returns False on timeout."""
+        return self._finished.wait(timeout)
+
+    async def wait_async(self, timeout: Optional[float] = None) -> bool:
+        """Asynchronous version of :meth:`wait`."""
+        step = 0.05
+        remaining = timeout
+        while not self._event.is_set():
+            if remaining is not None:
+                if remaining <= 0:
+                    return False
+                step = min(step, remaining)
+                remaining -= step
+            await asyncio.sleep(step)
+        return True
+
+
+# The token of the execution running in the current thread or task.
+_current_token: contextvars.ContextVar = contextvars.ContextVar(
+    "argonaut_cancellation_token"
+)
+# Returned outside of any execution; it is never cancelled.
+_NEVER_CANCELLED = CancellationToken()
+
+
+def current_token() -> CancellationToken:
+    return _current_token.get(_NEVER_CANCELLED)
+
+
+def run_with_token(token: CancellationToken, function: Callable, *args) -> Any:
+    """Call ``function`` with ``token`` as the current token."""
+    reset = _current_token.set(token)
+    try:
+        return function(*args)
+    finally:
+        _current_token.reset(reset)
+
+
+async def run_with_token_async(
+    token: CancellationToken, function: Callable, *args
+) -> Any:
+    """Await ``function(*args)`` with ``token`` as the current token."""
+    reset = _current_token.set(token)
+    try:
+        return await function(*args)
+    finally:
+        _current_token.reset(reset)
@@ -0,0 +1,120 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+from typing import Any, Dict, List, Optional, Tuple
+from .arguments import Argument
+from .exceptions import ParsingError
+
+
+class CommandTrie:
+    """
+    A prefix trie over the names and aliases of a single command level.
+
+    Every node remembers the set of distinct commands reachable below it, so
+    resolving an abbreviation is a single walk down the trie: the prefix is
+    unambiguous exactly when that set has one member. Aliases of the same
+    command therefore never make a prefix ambiguous.
+    """
+
+    __slots__ = ("_root", "_exact")
+
+    def __init__(self):
+        self._root: Dict[str, Any] = {}
+        self._exact: Dict[str, Tuple[str, Any]] = {}
+
+    def insert(self, key: str, name: str, command: Any) -> None:
+        """Register ``key`` (a name or an alias) for the command called ``name``."""
+        self._exact[key] = (name, command)
+        node = self._root
+        for char in key:
+            node = node.setdefault(char, {})
+            node.setdefault("", {})[name] = command
+
+    def resolve(
+        self, token: str, allow_prefix: bool = False
+    ) -> Optional[Tuple[str, Any]]:
+        """
+        Resolve a token to ``(canonical_name, command)``.
+
+        Exact names and aliases always win. Otherwise, if ``allow_prefix`` is
+        set, a prefix shared by exactly one command resolves to it.
+
+        Raises:
+            ParsingError: If the prefix matches more than one command.
+        """
+        match = self._exact.get(token)
+        if match is not None or not allow_prefix or not token:
+            return match
+
+        node = self._root
+        for char in token:
+            node = node.get(char)
+            if node is None:
+                return None
+        candidates = node[""]
+        if len(candidates) > 1:
+            raise ParsingError(
+                token,
+                f"Ambiguous subcommand, could be: {', '.join(sorted(candidates))}",
+            )
+        return next(iter(candidates.items()))
+
+    def keys(self) -> List[str]:
+        """Return every registered name and alias."""
+        return list(self._exact)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._exact
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+
+class CommandNode:
+    """
+    The compiled dispatch table for one level of the command tree.
+
+    Holds that level's option lookup table (every spelling of every option,
+    including argument groups) and a :class:`CommandTrie` of its direct
+    subcommands. Each :class:`SubCommand` compiles its own node, so deeper
+    levels are only compiled when dispatch actually reaches them.
+    """
+
+    __slots__ = ("command", "options", "children", "allow_prefix")
+
+    def __init__(self, command: Any, allow_prefix: bool = False):
+        self.command = command
+        self.allow_prefix = allow_prefix
+        self.options: Dict[str, Argument] = {}
+        self.children = CommandTrie()
+
+        arguments: List[Argument] = list(command.arguments)
+        for group in command.argument_groups:
+            arguments.extend(group.arguments)
+        for group in command.exclusive_groups:
+            arguments.extend(group.arguments)
+        for arg in reversed(arguments):
+            self.options[arg.name] = arg
+            for name in arg.names:
+                self.options[name] = arg
+
+        for name, subcommand in command.subcommands.items():
+            self.children.insert(name, name, subcommand)
+        for alias, name in command.subcommand_aliases.items():
+            if name in command.subcommands:
+                self.children.insert(alias, name, command.subcommands[name])
+
+    def get_option(self, token: str) -> Optional[Argument]:
+        return self.options.get(token)
+
+    def get_child(self, token: str) -> Optional[Tuple[str, Any]]:
+        """Resolve a token to a direct subcommand, building it if it is lazy."""
+        if not self.children or token.startswith("-"):
+            return None
+        match = self.children.resolve(token, self.allow_prefix)
+        if match is not None and getattr(match[1], "is_lazy", False):
+            return match[0], match[1].load()
+        return match
+
+
+def build_global_options(arguments: List[Argument]) -> Dict[str, Argument]:
+    return {name: arg for arg in arguments for name in arg.names}
@@ -2,13 +2,17 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
-from typing import Any, Dict, List, Optional, Callable, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Callable, Tuple, Union
 from .arguments import Argument, ArgumentGroup, MutuallyExclusiveGroup
 from .plugins import PluginManager
 from .logging import ArgonautLogger, LogLevel
 from .input_sanitizer import sanitize_input
+from .profiling import Profiler
+from .tracing import Tracer
 from .fancy_output import ProgressBar, ColoredOutput
+from .utils import PrefixIndex, import_from_string
 from .shell_completion import generate_completion_script
+from .command_trie import CommandNode, build_global_options
 from .exceptions import (
     ArgonautError,
     ArgonautUnknownArgumentError,
@@ -26,6 +30,10 @@ from pathlib import Path
 import configparser
 import textwrap
 import asyncio
+import atexit
+import multiprocessing
+import threading
+import time
 
 
 # Try to import readline, use a dummy object if not available
@@ -51,37 +59,76 @@ class SubCommand:
         self.argument_groups: List[ArgumentGroup] = []
         self.exclusive_groups: List[MutuallyExclusiveGroup] = []
         self.subcommands: Dict[str, SubCommand] = {}
+        self.subcommand_aliases: Dict[str, str] = {}
+        self.aliases: List[str] = list(kwargs.get("aliases") or [])
         self.parent: Optional[Union["Argonaut", "SubCommand"]] = kwargs.get("parent")
         self.custom_parsers: List[Callable[[List[str]], Dict[str, Any]]] = []
+        self.handler: Optional[Callable[[Dict[str, Any]], Any]] = kwargs.get("handler")
+        self._command_node: Optional[CommandNode] = None
 
     def add(self, *names: str, **kwargs: Any) -> Argument:
         arg = Argument(*names, **kwargs)
         self.arguments.append(arg)
+        self._invalidate_command_tree()
         return arg
 
     def add_group(self, title: str, description: str = "") -> ArgumentGroup:
         group = ArgumentGroup(title, description)
         self.argument_groups.append(group)
+        self._invalidate_command_tree()
         return group
 
     def add_exclusive_group(self) -> MutuallyExclusiveGroup:
         group = MutuallyExclusiveGroup()
         self.exclusive_groups.append(group)
+        self._invalidate_command_tree()
         return group
 
-    def add_subcommand(self, name: str, **kwargs: Any) -> "SubCommand":
-        subcommand = SubCommand(name, parent=self, **kwargs)
+    def add_subcommand(
+        self,
+        name: str,
+        aliases: Optional[List[str]] = None,
+        loader: Optional[Union[str, Callable]] = None,
+        **kwargs: Any,
+    ) -> Union["SubCommand", "LazySubCommand"]:
+        if loader is not None:
+            subcommand = LazySubCommand(
+                name, loader, parent=self, aliases=aliases, **kwargs
+            )
+        else:
+            subcommand = SubCommand(name, parent=self, aliases=aliases, **kwargs)
         self.subcommands[name] = subcommand
+        for alias in subcommand.aliases:
+            self.subcommand_aliases[alias] = name
+        self._invalidate_command_tree()
         return subcommand
 
     def add_custom_parser(self, parser: Callable[[List[str]], Dict[str, Any]]):
         self.custom_parsers.append(parser)
 
+    def set_handler(self, handler: Callable[[Dict[str, Any]], Any]) -> "SubCommand":
+        """Set the callable that :meth:`Argonaut.dispatch` runs for this subcommand."""
+        self.handler = handler
+        return self
+
     def parse_arguments(self, args: List[str]) -> Dict[str, Any]:
+        """
+        Parse the arguments that follow this subcommand on the command line.
+
+        Nested subcommands are dispatched in the same pass: whenever a token
+        names a child of the current level (by name, alias or unambiguous
+        prefix) parsing descends into it, and options from then on are looked
+        up in that child's own table. The canonical names of every level
+        visited are recorded under ``subcommand_path``.
+        """
         parsed_args: Dict[str, Any] = {"subcommand": self.name}
+        path = [self.name]
+        visited = [self]
 
-        global_args = self.parent._get_global_arguments()
-        global_arg_dict = {name: arg for arg in global_args for name in arg.names}
+        root = self._get_root()
+        global_arg_dict = root._get_global_options()
+        command = self
+        node = self._get_command_node()
 
         i = 0
         while i < len(args):
@@ -90,27 +137,51 @@ class SubCommand:
                 parsed_args[arg.lstrip("-")] = True
             elif arg.startswith("--"):
                 key = arg[2:].replace("-", "_")
-                argument = self._get_argument(key) or global_arg_dict.get(arg)
+                argument = (
+                    node.get_option(arg)
+                    or node.get_option(key)
+                    or global_arg_dict.get(arg)
+                )
                 if argument:
-                    i = self._parse_option(argument, args, i, parsed_args)
+                    i = command._parse_option(argument, args, i, parsed_args)
                 else:
                     raise ArgonautUnknownArgumentError([arg])
-            elif arg.startswith("-") and not self.parent._is_negative_number(arg):
+            elif arg.startswith("-") and not root._is_negative_number(arg):
                 for flag in arg[1:]:
-                    argument = self._get_argument(flag) or global_arg_dict.get(
-                        f"-{flag}"
+                    argument = (
+                        node.get_option(f"-{flag}")
+                        or node.get_option(flag)
+                        or global_arg_dict.get(f"-{flag}")
                     )
                     if argument:
                         parsed_args[argument.name] = True
                     else:
                         raise ArgonautUnknownArgumentError([f"-{flag}"])
             else:
-                self._parse_positional(arg, parsed_args)
+                child = node.get_child(arg)
+                if child is not None:
+                    name, command = child
+                    node = command._get_command_node()
+                    path.append(name)
+                    visited.append(command)
+                else:
+                    command._parse_positional(arg, parsed_args)
             i += 1
 
-        self._validate_args(parsed_args)
+        parsed_args["subcommand_path"] = path
+        for level in visited:
+            level._validate_args(parsed_args)
         return parsed_args
 
+    def resolve_path(self, args: List[str]) -> "SubCommand":
+        """Return the deepest subcommand named by ``args``, without parsing options."""
+        command = self
+        for arg in args:
+            child = command._get_command_node().get_child(sanitize_input(arg))
+            if child is not None:
+                command = child[1]
+        return command
+
     def _parse_option(
         self, argument: Argument, args: List[str], i: int, parsed_args: Dict[str, Any]
     ) -> int:
@@ -182,6 +253,22 @@ class SubCommand:
         for group in self.exclusive_groups:
             group.validate(parsed_args)
 
+    def _get_command_node(self) -> CommandNode:
+        if self._command_node is None:
+            self._command_node = CommandNode(
+                self, self._get_root().allow_subcommand_prefix
+            )
+        return self._command_node
+
+    def _invalidate_command_tree(self) -> None:
+        self._command_node = None
+
+    def _get_root(self) -> "Argonaut":
+        parent = self.parent
+        while isinstance(parent, SubCommand):
+            parent = parent.parent
+        return parent
+
     def _get_argument(self, name: str) -> Optional[Argument]:
         for arg in self.arguments:
             if arg.name == name or name in arg.names:
@@ -206,7 +293,9 @@ class SubCommand:
         if self.subcommands:
             help_text += "\nSubcommands:\n"
             for name, subcommand in self.subcommands.items():
-                help_text += f"  {name:<20} {subcommand.description}\n"
+                help_text += (
+                    f"  {subcommand._get_display_name():<20} {subcommand.description}\n"
+                )
 
         help_text += f"\nUse '{self._get_full_command()} <subcommand> --help' for more information about a subcommand.\n"
         return help_text
@@ -216,17 +305,83 @@ class SubCommand:
             return f"{self.parent._get_full_command()} {self.name}"
         return f"{self.parent.prog} {self.name}"
 
+    def _get_display_name(self) -> str:
+        if self.aliases:
+            return f"{self.name} ({', '.join(self.aliases)})"
+        return self.name
+
     def print_help(self):
         help_text = self.generate_help()
         print(help_text)
 
 
+class LazySubCommand:
+    """
+    Placeholder for a subcommand that is only built when it is needed.
+
+    Holds just enough to list the subcommand in help output and resolve it
+    during dispatch: its name, aliases, description and a loader. The loader
+    is either a callable or a ``"module:function"`` string, and is called with
+    a fresh, empty :class:`SubCommand` the first time the subcommand is
+    dispatched or its help is requested. It may populate that subcommand in
+    place or return a different one. The built subcommand then replaces the
+    placeholder in its parent.
+    """
+
+    is_lazy = True
+
+    def __init__(
+        self,
+        name: str,
+        loader: Union[str, Callable[[SubCommand], Optional[SubCommand]]],
+        description: str = "",
+        **kwargs: Any,
+    ):
+        self.name: str = name
+        self.description: str = description
+        self.loader = loader
+        self.aliases: List[str] = list(kwargs.get("aliases") or [])
+        self.parent: Union["Argonaut", SubCommand] = kwargs["parent"]
+        self._subcommand: Optional[SubCommand] = None
+
+    def load(self) -> SubCommand:
+        if self._subcommand is None:
+            subcommand = SubCommand(
+                self.name, self.description, parent=self.parent, aliases=self.aliases
+            )
+            try:
+                built = import_from_string(self.loader)(subcommand)
+            except Exception as e:
+                raise ArgonautError(
+                    f"Could not load subcommand '{self.name}' from {self.loader!r}: {str(e)}"
+                )
+            if isinstance(built, SubCommand):
+                built.parent = self.parent
+                subcommand = built
+            if self.parent.subcommands.get(self.name) is self:
+                self.parent.subcommands[self.name] = subcommand
+                self.parent._invalidate_command_tree()
+            self._subcommand = subcommand
+        return self._subcommand
+
+    def _get_display_name(self) -> str:
+        if self.aliases:
+            return f"{self.name} ({', '.join(self.aliases)})"
+        return self.name
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+
 class Argonaut:
     def __init__(
         self,
         description: str = "",
         epilog: str = "",
         custom_help_formatter: Optional[Callable] = None,
+        allow_subcommand_prefix: bool = False,
     ):
         self.description: str = description
         self.epilog: str = epilog
@@ -236,6 +391,16 @@ class Argonaut:
         self.subcommands: Dict[str, SubCommand] = {}
         self.logger: ArgonautLogger = ArgonautLogger.get_logger("Argonaut")
         self.colored_output: ColoredOutput = ColoredOutput()
+        # Tracing starts right away when ARGONAUT_TRACE is set, so that the
+        # plugins loaded before parse() are traced too. Worker processes
+        # inherit the environment but are not traced.
+        self.tracer = Tracer(os.path.basename(sys.argv[0]) or "argonaut")
+        self.profiler = Profiler(self.tracer)
+        if multiprocessing.parent_process() is None:
+            if self.tracer.start_from_env():
+                atexit.register(self.tracer.write_at_exit)
+        # The --profile argument, once enable_profiling has added it.
+        self._profile_argument: Optional[Argument] = None
         self.plugin_manager: PluginManager = PluginManager(
             self, self.logger, self.colored_output
         )
@@ -256,31 +421,69 @@ class Argonaut:
             "--debug", "-d", action="store_true", help="Enable debug mode"
         )
         self.conflicting_groups: List[set] = []
+        self.allow_subcommand_prefix: bool = allow_subcommand_prefix
+        self._command_node: Optional[CommandNode] = None
+        self._global_options: Optional[Dict[str, Argument]] = None
+        self._dispatch_lock = threading.Lock()
 
     def add(self, *names: str, **kwargs: Any) -> Argument:
         arg = Argument(*names, **kwargs)
         self.arguments.append(arg)
+        self._invalidate_command_tree()
         return arg
 
     def add_group(self, title: str, description: str = "") -> ArgumentGroup:
         group = ArgumentGroup(title, description)
         self.argument_groups.append(group)
+        self._invalidate_command_tree()
         return group
 
-    def add_subcommand(self, name: str, **kwargs: Any) -> SubCommand:
-        subcommand = SubCommand(name, parent=self, **kwargs)
+    def add_subcommand(
+        self,
+        name: str,
+        aliases: Optional[List[str]] = None,
+        loader: Optional[Union[str, Callable]] = None,
+        **kwargs: Any,
+    ) -> Union[SubCommand, LazySubCommand]:
+        """
+        Add a subcommand.
+
+        When ``loader`` is given the subcommand is registered lazily: only the
+        name, aliases and ``description`` are kept, and ``loader`` (a callable
+        or a ``"module:function"`` string) builds it on first dispatch or when
+        its help is requested. See :class:`LazySubCommand`.
+        """
+        if loader is not None:
+            subcommand = LazySubCommand(
+                name, loader, parent=self, aliases=aliases, **kwargs
+            )
+        else:
+            subcommand = SubCommand(name, parent=self, aliases=aliases, **kwargs)
         self.subcommands[name] = subcommand
+        for alias in subcommand.aliases:
+            self.subcommand_aliases[alias] = name
+        self._invalidate_command_tree()
+        self.plugin_manager._record_subcommand(subcommand)
         return subcommand
 
+    def add_subcommand_alias(self, alias: str, name: str) -> None:
+        if name not in self.subcommands:
+            raise ArgonautError(f"Unknown subcommand: {name}")
+        self.subcommand_aliases[alias] = name
+        self.subcommands[name].aliases.append(alias)
+        self._invalidate_command_tree()
+
     def add_mutually_exclusive_group(self) -> MutuallyExclusiveGroup:
         group = MutuallyExclusiveGroup()
         self.exclusive_groups.append(group)
+        self._invalidate_command_tree()
         return group
 
     def add_global_argument(self, *names: str, **kwargs: Any) -> Argument:
         kwargs["is_global"] = True
         arg = Argument(*names, **kwargs)
         self.global_arguments.append(arg)
+        self._invalidate_command_tree()
         return arg
 
     def add_custom_parser(self, parser: Callable[[List[str]], Dict[str, Any]]):
@@ -289,6 +492,20 @@ class Argonaut:
     def _get_global_arguments(self) -> List[Argument]:
         return self.global_arguments + [arg for arg in self.arguments if arg.is_global]
 
+    def _get_global_options(self) -> Dict[str, Argument]:
+        if self._global_options is None:
+            self._global_options = build_global_options(self._get_global_arguments())
+        return self._global_options
+
+    def _get_command_node(self) -> CommandNode:
+        if self._command_node is None:
+            self._command_node = CommandNode(self, self.allow_subcommand_prefix)
+        return self._command_node
+
+    def _invalidate_command_tree(self) -> None:
+        self._command_node = None
+        self._global_options = None
+
     def _get_all_arguments(self):
         all_args = self.arguments + self.global_arguments
         for group in self.argument_groups:
@@ -309,36 +526,91 @@ class Argonaut:
     ) -> Dict[str, Any]:
         if args is None:
             args = sys.argv[1:]
+        profiling = self.profiler.active
+        parsed_args = self._parse_profiled(args, ignore_unknown)
+        if not profiling and self.profiler.active:
+            atexit.register(self.profiler.print_report)
+        return parsed_args
+
+    def _parse_profiled(self, args: List[str], ignore_unknown: bool) -> Dict[str, Any]:
+        """
+        Parse, and start the profiler if that resolved ``--profile``.
+
+        Whether to profile is only known once the command line is parsed,
+        so while ``--profile`` is enabled the spans of parsing are held
+        back, and handed to the profiler if it starts.
+        """
+        if self._profile_argument is None or self.profiler.active:
+            with self.tracer.span("parse"):
+                return self._parse(args, ignore_unknown)
+        spans: List[Any] = []
+        started = time.perf_counter()
+        self.tracer.add_listener(spans.append)
+        try:
+            with self.tracer.span("parse"):
+                parsed_args = self._parse(args, ignore_unknown)
+        finally:
+            self.tracer.remove_listener(spans.append)
+        if parsed_args.get(self._profile_argument.name) is True:
+            self.profiler.start_from_env(since=started)
+            for span in spans:
+                self.profiler.record(span)
+        return parsed_args
+
+    def enable_profiling(self) -> None:
+        """
+        Add the ``--profile`` global argument, which prints how long each
+        phase of the command took. Does nothing if the application already
+        has a ``--profile`` argument of its own.
+        """
+        if self._profile_argument is not None:
+            return
+        if any(
+            "--profile" in argument.names
+            for argument in self._get_global_arguments() + self._get_all_arguments()
+        ):
+            self.logger.debug("Not adding --profile: the parser already has one")
+            return
+        self._profile_argument = self.add_global_argument(
+            "--profile",
+            action="store_true",
+            help="Print how long each phase of the command took. Set "
+            "ARGONAUT_PROFILE_OUTPUT=FILE to also write a cProfile of it, and "
+            "ARGONAUT_PROFILE_MEMORY=N to list the N lines that allocated the "
+            "most memory",
+        )
+
+    def _parse(self, args: List[str], ignore_unknown: bool) -> Dict[str, Any]:
+        phase = self.tracer.span
 
         global_args = {}
         remaining_args = []
-        all_arguments = self._get_all_arguments()
-        arg_dict = {name: arg for arg in all_arguments for name in arg.names}
+        node = self._get_command_node()
+        global_options = self._get_global_options()
         subcommand = None
 
+        started = time.perf_counter()
         i = 0
         while i < len(args):
             arg = sanitize_input(args[i])
             if arg in ("--debug", "-d"):
                 global_args["debug"] = True
-            elif arg in self.subcommands:
-                subcommand = self.subcommands[arg]
-                global_args["subcommand"] = arg
-                remaining_args = args[i + 1 :]
-                break
             elif arg in ("--help", "-h"):
                 self.print_help()
                 sys.exit(0)
             elif arg.startswith("-"):
-                argument = arg_dict.get(arg)
+                argument = node.get_option(arg) or global_options.get(arg)
                 if argument:
                     if argument.action == "store_true":
                         global_args[argument.name] = True
                     elif i + 1 < len(args):
-                        if not args[i + 1].startswith("-") or self._is_negative_number(
-                            args[i + 1]
+                        value = args[i + 1]
+                        if (
+                            not value.startswith("-")
+                            or value == "-"
+                            or self._is_negative_number(value)
                         ):
-                            global_args[argument.name] = args[i + 1]
+                            global_args[argument.name] = value
                             i += 1
                         else:
                             global_args[argument.name] = True
@@ -347,8 +619,22 @@ class Argonaut:
                 else:
                     remaining_args.append(arg)
             else:
+                # Only bare words can name a subcommand; option values were
+                # consumed above. An ambiguous prefix is a parse error like
+                # any other.
+                try:
+                    child = node.get_child(arg)
+                except ArgonautError as e:
+                    if self.debug or global_args.get("debug"):
+                        self.logger.error(f"Error during argument parsing: {str(e)}")
+                    raise
+                if child is not None:
+                    global_args["subcommand"], subcommand = child
+                    remaining_args = args[i + 1 :]
+                    break
                 remaining_args.append(arg)
             i += 1
+        self.tracer.record("parse: tokenize", time.perf_counter() - started)
 
         self.set_debug(global_args.get("debug", False))
 
@@ -361,20 +647,23 @@ class Argonaut:
             self.unknown_args = []
 
             try:
-                for parser in self.custom_parsers:
-                    custom_parsed = parser(remaining_args)
-                    parsed_args.update(custom_parsed)
-                    remaining_args = [
-                        arg for arg in remaining_args if arg not in custom_parsed
-                    ]
+                with phase("parse: custom parsers"):
+                    for parser in self.custom_parsers:
+                        custom_parsed = parser(remaining_args)
+                        parsed_args.update(custom_parsed)
+                        remaining_args = [
+                            arg for arg in remaining_args if arg not in custom_parsed
+                        ]
 
                 if subcommand:
                     if "--help" in remaining_args or "-h" in remaining_args:
-                        subcommand.print_help()
+                        subcommand.resolve_path(remaining_args).print_help()
                         sys.exit(0)
-                    subcommand_args = subcommand.parse_arguments(remaining_args)
+                    with phase("parse: subcommand"):
+                        subcommand_args = subcommand.parse_arguments(remaining_args)
                     parsed_args.update(subcommand_args)
                 else:
+                    started = time.perf_counter()
                     i = 0
                     while i < len(remaining_args):
                         arg = remaining_args[i]
@@ -416,12 +705,19 @@ class Argonaut:
                         else:
                             self._parse_positional(arg, parsed_args)
                         i += 1
+                    self.tracer.record(
+                        "parse: arguments", time.perf_counter() - started
+                    )
 
-                self._validate_args(parsed_args)
-                self._validate_conflicts(parsed_args)
-                self._validate_dependencies(parsed_args)
-                self._handle_env_var_defaults(parsed_args)
-                self._handle_config_file(parsed_args)
+                with phase("parse: validate"):
+                    self._validate_args(parsed_args)
+                with phase("parse: constraints"):
+                    self._validate_conflicts(parsed_args)
+                    self._validate_dependencies(parsed_args)
+                with phase("parse: env defaults"):
+                    self._handle_env_var_defaults(parsed_args)
+                with phase("parse: config"):
+                    self._handle_config_file(parsed_args)
 
                 self.parsed_args = parsed_args
             except ArgonautError as e:
@@ -590,7 +886,7 @@ class Argonaut:
             help_text += f"\n{self.colored_output.underline('Subcommands:')}\n"
             for name, subcommand in self.subcommands.items():
                 help_text += (
-                    self.colored_output.blue(f"  {name:<20}")
+                    self.colored_output.blue(f"  {subcommand._get_display_name():<20}")
                     + f" {subcommand.description}\n"
                 )
 
@@ -614,6 +910,185 @@ class Argonaut:
         """Add a group of mutually conflicting arguments."""
         self.conflicting_groups.append(set(args))
 
+    def dispatch(
+        self, args: List[str], sink: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """
+        Parse a complete command line and run the handler it selects.
+
+        The deepest subcommand on the parsed path that has a handler wins.
+        Failing that, the plugin that registered the top-level subcommand is
+        executed with the parsed arguments. Without either, the parsed
+        arguments themselves are returned.
+
+        The parser's own parse state is left untouched, so one parser (and its
+        loaded plugins) can dispatch any number of command lines in the same
+        process. Parsing is serialized between threads; the handler itself
+        runs unlocked.
+
+        Args:
+            args (List[str]): The command line, without the program name.
+            sink (Optional[Callable[[Any], Any]]): Receives the results of a
+                streaming plugin one by one as they are produced, in which
+                case None is returned.
+
+        Returns:
+            Any: The handler's or plugin's result, or the parsed arguments.
+        """
+        # With --profile, just this command line is profiled, e.g. one
+        # typed into the shell.
+        profiling = self.profiler.active
+        try:
+            with self.tracer.span("dispatch", command=args[0] if args else ""):
+                parsed_args, handler, plugin_name = self._resolve_command(args)
+                if handler is not None:
+                    return handler(parsed_args)
+                if plugin_name is not None:
+                    manager = self.plugin_manager
+                    if sink is not None and manager._get_plugin(plugin_name).streams:
+                        manager.execute_stream(plugin_name, parsed_args, sink)
+                        return None
+                    return self.execute_plugin(plugin_name, parsed_args)
+                return parsed_args
+        finally:
+            if not profiling and self.profiler.active:
+                self.profiler.print_report()
+
+    def _resolve_command(
+        self, args: List[str]
+    ) -> Tuple[Dict[str, Any], Optional[Callable], Optional[str]]:
+        """Parse a command line into its arguments, handler and plugin."""
+        with self._dispatch_lock:
+            saved_state = (self.parsed_args, self.unknown_args)
+            self.parsed_args = None
+            try:
+                parsed_args = self._parse_profiled(list(args), False)
+            finally:
+                self.parsed_args, self.unknown_args = saved_state
+
+            handler = None
+            command: Union[Argonaut, SubCommand] = self
+            for name in parsed_args.get("subcommand_path", []):
+                command = command.subcommands[name]
+                handler = command.handler or handler
+            plugin_name = self.plugin_manager.command_plugins.get(
+                parsed_args.get("subcommand")
+            )
+        return parsed_args, handler, plugin_name
+
+    def enable_pipeline_mode(self) -> None:
+        """Add the ``--pipeline`` global argument."""
+        self.add_global_argument(
+            "--pipeline",
+            help="Run plugin subcommands separated by '|', each consuming "
+            "the results of the one before it",
+        )
+
+    def run_pipeline(
+        self, spec: str, sink: Optional[Any] = None, buffer: int = 16
+    ) -> Union[Iterator[Any], int]:
+        """
+        Run plugin subcommands as a pipeline, e.g.
+        ``"scrape --url https://example.com | analyze@process | report"``.
+
+        Each stage is a command line that runs a plugin, optionally followed
+        by ``@backend``. The first stage is called with its parsed
+        arguments; every later stage is called once per result of the stage
+        before it, with its own parsed arguments plus that result as
+        ``input``. See :class:`argonaut.pipeline.Pipeline`.
+
+        Args:
+            spec (str): The stages, separated by ``|``.
+            sink (Optional[Any]): Receives every result, as in
+                :meth:`PluginManager.execute_stream`.
+            buffer (int): The most results queued between two stages.
+
+        Returns:
+            Union[Iterator[Any], int]: The results of the last stage, or
+            their number when they went to ``sink``.
+        """
+        from .pipeline import split_pipeline
+
+        pipeline = self.plugin_manager.pipeline(buffer=buffer)
+        for argv, backend in split_pipeline(spec):
+            parsed_args, handler, plugin_name = self._resolve_command(argv)
+            if handler is not None or plugin_name is None:
+                raise ArgonautError(
+                    f"Pipeline stage '{' '.join(argv)}' does not run a plugin"
+                )
+            pipeline.stage(plugin_name, parsed_args, backend=backend)
+        return pipeline.run(sink=sink)
+
+    def shell(
+        self, prompt: Optional[str] = None, history_file: Optional[str] = None
+    ) -> None:
+        """
+        Run an interactive shell that dispatches whole command lines.
+
+        See :class:`argonaut.repl.ArgonautShell`.
+        """
+        from .repl import ArgonautShell
+
+        ArgonautShell(self, prompt=prompt, history_file=history_file).run()
+
+    def serve(
+        self,
+        socket_path: Optional[str] = None,
+        handler: Optional[Callable[[List[str]], Any]] = None,
+    ) -> None:
+        """
+        Keep this parser and its plugins resident and serve invocations.
+
+        See :class:`argonaut.daemon.ArgonautDaemon`.
+        """
+        from .daemon import ArgonautDaemon
+
+        ArgonautDaemon(self, socket_path, handler).serve_forever()
+
+    def add_daemon_client(
+        self, directory: Optional[str] = None, socket_path: Optional[str] = None
+    ):
+        from .daemon import default_socket_path, write_client_script
+
+        script_path = write_client_script(
+            self.prog, socket_path or default_socket_path(self.prog), directory
+        )
+        self.logger.info(f"Daemon client has been written to {script_path}")
+        self.logger.info(f"Add the following line to your shell configuration file:")
+        self.logger.info(f"alias {self.prog}='{script_path}'")
+
+    def enable_batch_mode(self) -> None:
+        """Add the ``--batch``, ``--jobs`` and ``--batch-output`` global arguments."""
+        self.add_global_argument(
+            "--batch", help="Run the command lines in FILE ('-' for stdin)"
+        )
+        self.add_global_argument(
+            "--jobs", type=int, default=1, help="Run up to N batch lines concurrently"
+        )
+        self.add_global_argument(
+            "--batch-output", help="Write batch results as JSON Lines to FILE"
+        )
+
+    def run_batch(
+        self,
+        source: Union[str, Any],
+        output: Optional[Union[str, Any]] = None,
+        jobs: int = 1,
+        use_processes: bool = False,
+        parser_factory: Optional[str] = None,
+    ) -> int:
+        """
+        Dispatch every command line in a file or stream in this process.
+
+        See :func:`argonaut.batch.run_batch`.
+
+        Returns:
+            int: The number of commands that failed.
+        """
+        from .batch import run_batch
+
+        return run_batch(self, source, output, jobs, use_processes, parser_factory)
+
     def interactive(self) -> Dict[str, Any]:
         parsed_args: Dict[str, Any] = {}
         for arg in self.arguments + [
@@ -629,17 +1104,54 @@ class Argonaut:
                     print(f"Invalid input: {str(e)}")
         return parsed_args
 
-    def load_plugin(self, module_path: str):
-        self.plugin_manager.load_plugin(module_path)
+    def load_plugin(self, module_path: str, lazy: bool = False):
+        self.plugin_manager.load_plugin(module_path, lazy)
+
+    def load_plugins(
+        self, paths: List[str], max_workers: Optional[int] = None, lazy: bool = False
+    ) -> Dict[str, float]:
+        return self.plugin_manager.load_plugins(paths, max_workers, lazy)
+
+    def load_entry_points(self, group: str = "argonaut.plugins", lazy: bool = True):
+        self.plugin_manager.load_entry_points(group, lazy)
 
     def unload_plugin(self, name: str):
         self.plugin_manager.unload_plugin(name)
 
+    def reload_plugin(self, name: str):
+        return self.plugin_manager.reload_plugin(name)
+
     def initialize_plugins(self):
         self.plugin_manager.initialize_plugins(self)
 
-    def execute_plugin(self, name: str, args: Dict[str, Any]):
-        return self.plugin_manager.execute_plugin(name, args)
+    def execute_plugin(
+        self,
+        name: str,
+        args: Dict[str, Any],
+        backend: Optional[str] = None,
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ):
+        return self.plugin_manager.execute_plugin(name, args, backend, block, timeout)
+
+    def execute_stream(
+        self,
+        name: str,
+        args: Dict[str, Any],
+        sink: Optional[Any] = None,
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ):
+        return self.plugin_manager.execute_stream(name, args, sink, block, timeout)
+
+    def execute_stream_async(
+        self,
+        name: str,
+        args: Dict[str, Any],
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ):
+        return self.plugin_manager.execute_stream_async(name, args, block, timeout)
 
     def list_plugins(self) -> List[Dict[str, str]]:
         return self.plugin_manager.list_plugins()
@@ -700,6 +1212,7 @@ class Argonaut:
     def reset(self):
         self.parsed_args = None
         self._parsed_args_cache = None
+        self._invalidate_command_tree()
 
     def get_argument(self, name: str) -> Optional[Argument]:
         for arg in self.arguments + self.global_arguments:
@@ -756,14 +1269,7 @@ class Argonaut:
         self.config = config
 
     def interactive_input(self):
-        def completer(text, state):
-            options = [arg.name for arg in self.arguments if arg.name.startswith(text)]
-            if state < len(options):
-                return options[state]
-            else:
-                return None
-
-        readline.set_completer(completer)
+        readline.set_completer(PrefixIndex(arg.name for arg in self.arguments).complete)
         readline.parse_and_bind("tab: complete")
 
         for arg in self.arguments:
@@ -774,6 +1280,7 @@ class Argonaut:
     def add_dynamic_argument(self, *names: str, **kwargs: Any) -> Argument:
         arg = Argument(*names, **kwargs)
         self.arguments.append(arg)
+        self._invalidate_command_tree()
         return arg
 
     def load_config(self, config_file: Union[str, Path]):
@@ -791,15 +1298,16 @@ class Argonaut:
         if not config_path.exists():
             raise FileNotFoundError(f"Config file not found: {config_file}")
 
-        with config_path.open() as f:
-            if config_path.suffix in (".yaml", ".yml"):
-                config = yaml.safe_load(f)
-            elif config_path.suffix == ".json":
-                config = json.load(f)
-            else:
-                raise ValueError(
-                    f"Unsupported config file format: {config_path.suffix}"
-                )
+        with self.tracer.span("config: load", file=str(config_path)):
+            with config_path.open() as f:
+                if config_path.suffix in (".yaml", ".yml"):
+                    config = yaml.safe_load(f)
+                elif config_path.suffix == ".json":
+                    config = json.load(f)
+                else:
+                    raise ValueError(
+                        f"Unsupported config file format: {config_path.suffix}"
+                    )
 
         for arg_name, arg_value in config.items():
             self.add_dynamic_argument(arg_name, default=arg_value)
@@ -827,6 +1335,7 @@ class Argonaut:
     def create_argument_group(self, title: str, description: str = "") -> ArgumentGroup:
         group = ArgumentGroup(title, description)
         self.argument_groups.append(group)
+        self._invalidate_command_tree()
         return group
 
     def create_progress_bar(
@@ -856,7 +1365,14 @@ class Argonaut:
         """
         return await asyncio.to_thread(self.parse, args, ignore_unknown)
 
-    async def execute_plugin_async(self, name: str, args: Dict[str, Any]) -> Any:
+    async def execute_plugin_async(
+        self,
+        name: str,
+        args: Dict[str, Any],
+        backend: Optional[str] = None,
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
         """
         Asynchronous version of execute_plugin method.
 
@@ -865,11 +1381,21 @@ class Argonaut:
         Args:
             name (str): Name of the plugin to execute.
             args (Dict[str, Any]): Arguments to pass to the plugin.
+            backend (Optional[str]): The execution backend: "inline", "thread"
+                or "process". Defaults to the plugin's execution_backend.
+            block (Optional[bool]): Whether to wait at a concurrency or rate
+                limit, or to fail with RateLimitError.
+            timeout (Optional[float]): Seconds to wait for the result.
+                Defaults to the plugin's execution_timeout.
 
         Returns:
             Any: The result of the plugin execution.
 
         Raises:
             PluginError: If there's an error executing the plugin.
+            RateLimitError: If a limit is reached and the call does not wait.
+            PluginTimeoutError: If the execution runs past its timeout.
         """
-        return await asyncio.to_thread(self.execute_plugin, name, args)
+        return await self.plugin_manager.execute_plugin_async(
+            name, args, backend, block, timeout
+        )
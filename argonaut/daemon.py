@@ -0,0 +1,287 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import traceback
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+from .exceptions import ArgonautError
+
+
+def default_socket_path(prog: str) -> str:
+    """
+    Return the socket path for ``prog``, creating its directory if needed.
+
+    ``XDG_RUNTIME_DIR`` is already private to the user. Without it the socket
+    goes in ``argonaut-<uid>`` under the shared temporary directory, which is
+    created owner-only and refused if another user got there first.
+
+    Raises:
+        ArgonautError: If the directory is not a private directory owned by
+            the current user.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, f"argonaut-{prog}.sock")
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    directory = os.path.join(tempfile.gettempdir(), f"argonaut-{uid}")
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    # lstat, so a symlink planted at the predictable name is not followed.
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != uid:
+        raise ArgonautError(f"{directory} is not a directory owned by the current user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        raise ArgonautError(f"{directory} is accessible to other users")
+    return os.path.join(directory, f"{prog}.sock")
+
+
+class _FrameStream(io.TextIOBase):
+    """A text stream that forwards every write to the client as a frame."""
+
+    def __init__(self, connection: socket.socket, name: str):
+        self.connection = connection
+        self.name = name
+        self.broken = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: str) -> int:
+        if data and not self.broken:
+            frame = json.dumps({"stream": self.name, "data": data}) + "\n"
+            try:
+                self.connection.sendall(frame.encode("utf-8"))
+            except OSError:
+                self.broken = True
+        return len(data)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        header = self.rfile.readline()
+        if not header:
+            return
+        try:
+            request = json.loads(header.decode("utf-8"))
+        except ValueError:
+            return
+        self.server.daemon.execute(request, self.connection)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ArgonautDaemon:
+    """
+    Serve an Argonaut application over a Unix domain socket.
+
+    The parser and its plugins are built once and stay resident. Each
+    connection sends one JSON line holding ``argv``, ``env`` and ``cwd``. The
+    daemon runs the command with that environment and working directory and
+    streams ``stdout``/``stderr`` back as JSON-line frames, followed by a
+    final ``{"exit": code}`` frame.
+
+    The environment, working directory and standard streams belong to the
+    whole process, so requests are executed one at a time. Connections are
+    still accepted concurrently, so clients queue instead of being refused.
+
+    Attributes:
+        parser (Argonaut): The resident parser.
+        socket_path (str): The path of the listening socket.
+        handler (Callable[[List[str]], Any]): Runs one command line. Defaults
+            to ``parser.dispatch``, which prints a streaming plugin's results
+            as they are produced. An ``int`` result is used as the exit
+            code; any other non-None result is printed.
+    """
+
+    def __init__(
+        self,
+        parser: Any,
+        socket_path: Optional[str] = None,
+        handler: Optional[Callable[[List[str]], Any]] = None,
+    ):
+        if not hasattr(socket, "AF_UNIX"):
+            raise ArgonautError("Daemon mode requires Unix domain sockets")
+        self.parser = parser
+        self.socket_path = socket_path or default_socket_path(parser.prog)
+        # Streaming plugins print each result as it is produced.
+        self.handler = handler or partial(parser.dispatch, sink=print)
+        self._lock = threading.Lock()
+        self._server: Optional[_UnixServer] = None
+
+    def serve_forever(self) -> None:
+        """Listen on the socket until interrupted or :meth:`shutdown` is called."""
+        self._remove_stale_socket()
+        # Compile the command tree up front so the first request is as fast
+        # as every other one.
+        self.parser._get_command_node()
+        # Created owner-only rather than chmodded after bind, which would
+        # leave a window where other users could connect.
+        umask = os.umask(0o177)
+        try:
+            self._server = _UnixServer(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(umask)
+        self._server.daemon = self
+        self.parser.logger.info(f"Listening on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+            self._server = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+
+    def execute(self, request: Dict[str, Any], connection: socket.socket) -> int:
+        """Run one request, streaming its output over ``connection``."""
+        stdout = _FrameStream(connection, "stdout")
+        stderr = _FrameStream(connection, "stderr")
+        with self._lock:
+            saved_environ = dict(os.environ)
+            saved_cwd = os.getcwd()
+            saved_streams = (sys.stdout, sys.stderr)
+            try:
+                if request.get("env") is not None:
+                    os.environ.clear()
+                    os.environ.update(request["env"])
+                if request.get("cwd"):
+                    os.chdir(request["cwd"])
+                sys.stdout, sys.stderr = stdout, stderr
+                exit_code = self._run(list(request.get("argv", [])))
+            finally:
+                sys.stdout, sys.stderr = saved_streams
+                os.chdir(saved_cwd)
+                os.environ.clear()
+                os.environ.update(saved_environ)
+
+        try:
+            connection.sendall((json.dumps({"exit": exit_code}) + "\n").encode("utf-8"))
+        except OSError:
+            pass
+        return exit_code
+
+    def _run(self, argv: List[str]) -> int:
+        try:
+            result = self.handler(argv)
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                return e.code or 0
+            print(e.code, file=sys.stderr)
+            return 1
+        except ArgonautError as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            return 2
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+            return 1
+        if isinstance(result, int) and not isinstance(result, bool):
+            return result
+        if result is not None:
+            print(result)
+        return 0
+
+    def _remove_stale_socket(self) -> None:
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise ArgonautError(f"A daemon is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+
+_CLIENT_TEMPLATE = """#!{python} -S
+# Generated by Argonaut: forwards invocations of {prog} to its daemon.
+import json, os, socket, sys
+
+SOCKET_PATH = {socket_path!r}
+FALLBACK = {fallback!r}
+
+
+def main():
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        owner = os.stat(SOCKET_PATH).st_uid
+        client.connect(SOCKET_PATH)
+    except OSError:
+        os.execv(FALLBACK[0], FALLBACK + sys.argv[1:])
+    if hasattr(socket, "SO_PEERCRED"):
+        # The process actually listening, not just whoever created the path.
+        creds = client.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, 12)
+        owner = int.from_bytes(creds[4:8], sys.byteorder)
+    if owner != os.getuid():
+        # The request carries the whole environment, so never hand it to a
+        # daemon run by someone else.
+        sys.stderr.write("Refusing to use %s: owned by another user\\n" % SOCKET_PATH)
+        return 1
+    request = {{"argv": sys.argv[1:], "env": dict(os.environ), "cwd": os.getcwd()}}
+    client.sendall((json.dumps(request) + "\\n").encode("utf-8"))
+    streams = {{"stdout": sys.stdout, "stderr": sys.stderr}}
+    for line in client.makefile("r", encoding="utf-8"):
+        frame = json.loads(line)
+        if "exit" in frame:
+            sys.stdout.flush()
+            return frame["exit"]
+        stream = streams[frame["stream"]]
+        stream.write(frame["data"])
+        stream.flush()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+"""
+
+
+def generate_client_script(
+    prog: str, socket_path: str, fallback: Optional[List[str]] = None
+) -> str:
+    """
+    Generate a standalone client that forwards its invocation to a daemon.
+
+    The client only imports ``json``, ``os``, ``socket`` and ``sys`` and runs
+    with ``python -S``, so it starts in a few milliseconds. If no daemon is
+    listening it replaces itself with ``fallback`` (by default the current
+    interpreter running the current script), so the command keeps working.
+    The request carries the client's whole environment, so it is only sent
+    to a daemon run by the same user.
+    """
+    if fallback is None:
+        fallback = [sys.executable, os.path.abspath(sys.argv[0])]
+    return _CLIENT_TEMPLATE.format(
+        python=sys.executable, prog=prog, socket_path=socket_path, fallback=fallback
+    )
+
+
+def write_client_script(
+    prog: str,
+    socket_path: str,
+    directory: Optional[Union[str, Path]] = None,
+    fallback: Optional[List[str]] = None,
+) -> Path:
+    script_path = Path(directory or Path.home()) / f".{prog}_client.py"
+    script_path.write_text(generate_client_script(prog, socket_path, fallback))
+    script_path.chmod(0o755)
+    return script_path
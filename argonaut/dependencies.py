@@ -0,0 +1,209 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import hashlib
+import importlib.metadata
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple, Union
+
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+    from packaging.specifiers import SpecifierSet
+
+    has_packaging = True
+except ImportError:
+    has_packaging = False
+
+DEPENDENCY_MODES = ("never", "check", "install")
+
+# Distributions that are always present because they are running this code.
+SELF_DISTRIBUTIONS = {"argonautcli"}
+
+_REQUIREMENT_PATTERN = re.compile(
+    r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*([^;]*?)\s*(?:;.*)?$"
+)
+_CLAUSE_PATTERN = re.compile(r"^\s*(~=|===|==|!=|<=|>=|<|>)\s*(\S+)\s*$")
+
+
+def normalize_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def default_cache_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return Path(base) / "argonaut" / "dependencies.json"
+
+
+def environment_fingerprint() -> str:
+    """
+    Identify the current set of installed distributions.
+
+    Installing or removing a distribution adds or removes entries in a
+    site-packages directory, which changes that directory's mtime, so the
+    interpreter, its version and those mtimes together change whenever the
+    answer to "is this requirement satisfied" might.
+    """
+    parts = [sys.executable, sys.version]
+    for path in sys.path:
+        if "-packages" in path and os.path.isdir(path):
+            parts.append(f"{path}:{os.stat(path).st_mtime_ns}")
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _version_key(version: str) -> Tuple[int, ...]:
+    numbers = []
+    for part in version.split("."):
+        match = re.match(r"\d+", part)
+        if not match:
+            break
+        numbers.append(int(match.group()))
+    return tuple(numbers)
+
+
+def _clause_matches(version: str, operator: str, target: str) -> bool:
+    if operator == "===":
+        return version == target
+    if target.endswith(".*"):
+        prefix = _version_key(target[:-2])
+        matches = _version_key(version)[: len(prefix)] == prefix
+        return matches if operator == "==" else not matches
+    current, wanted = _version_key(version), _version_key(target)
+    width = max(len(current), len(wanted))
+    current += (0,) * (width - len(current))
+    wanted += (0,) * (width - len(wanted))
+    if operator == "~=":
+        prefix = _version_key(target)[:-1]
+        return current >= wanted and _version_key(version)[: len(prefix)] == prefix
+    return {
+        "==": current == wanted,
+        "!=": current != wanted,
+        "<=": current <= wanted,
+        ">=": current >= wanted,
+        "<": current < wanted,
+        ">": current > wanted,
+    }[operator]
+
+
+def parse_requirement(requirement: str) -> Tuple[str, str, bool]:
+    """
+    Split a requirement into ``(name, specifier, applies)``.
+
+    ``applies`` is False when the requirement has an environment marker that
+    does not hold here. Markers are only evaluated when :mod:`packaging` is
+    installed; without it they are assumed to hold.
+    """
+    if has_packaging:
+        try:
+            parsed = Requirement(requirement)
+        except InvalidRequirement as e:
+            raise ValueError(f"Invalid requirement '{requirement}': {str(e)}")
+        applies = parsed.marker is None or parsed.marker.evaluate()
+        return parsed.name, str(parsed.specifier), applies
+    match = _REQUIREMENT_PATTERN.match(requirement)
+    if not match:
+        raise ValueError(f"Invalid requirement '{requirement}'")
+    return match.group(1), match.group(2), True
+
+
+def version_satisfies(version: str, specifier: str) -> bool:
+    if not specifier:
+        return True
+    if has_packaging:
+        return SpecifierSet(specifier).contains(version, prereleases=True)
+    for clause in specifier.split(","):
+        match = _CLAUSE_PATTERN.match(clause)
+        if match is None or not _clause_matches(version, *match.groups()):
+            return False
+    return True
+
+
+def is_satisfied(requirement: str) -> bool:
+    name, specifier, applies = parse_requirement(requirement)
+    if not applies or normalize_name(name) in SELF_DISTRIBUTIONS:
+        return True
+    try:
+        version = importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return False
+    return version_satisfies(version, specifier)
+
+
+class DependencyResolver:
+    """
+    Check plugin requirements against the installed distributions.
+
+    Requirements are checked with :mod:`importlib.metadata` and version
+    specifiers, never by running pip. Requirements found satisfied are cached
+    on disk under the current :func:`environment_fingerprint`, so once a
+    machine is provisioned, later runs answer from the cache without looking
+    at any distribution metadata. The cache is dropped as soon as anything is
+    installed or removed.
+
+    Attributes:
+        cache_path (Path): The JSON file holding the satisfied requirements.
+    """
+
+    def __init__(self, cache_path: Optional[Union[str, Path]] = None):
+        self.cache_path = Path(cache_path) if cache_path else default_cache_path()
+        self._fingerprint: Optional[str] = None
+        self._satisfied: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+
+    def missing(self, requirements: Iterable[str]) -> List[str]:
+        """Return the requirements that are not satisfied, in order."""
+        with self._lock:
+            satisfied = self._load()
+            missing = []
+            added = False
+            for requirement in dict.fromkeys(requirements):
+                if requirement in satisfied:
+                    continue
+                if is_satisfied(requirement):
+                    satisfied.add(requirement)
+                    added = True
+                else:
+                    missing.append(requirement)
+            if added:
+                self._save()
+            return missing
+
+    def install(self, requirements: List[str]) -> None:
+        """Install requirements with a single pip invocation."""
+        if not requirements:
+            return
+        subprocess.check_call([sys.executable, "-m", "pip", "install", *requirements])
+        importlib.invalidate_caches()
+        with self._lock:
+            self._fingerprint = None
+            self._satisfied = None
+
+    def _load(self) -> Set[str]:
+        if self._satisfied is None:
+            self._fingerprint = environment_fingerprint()
+            self._satisfied = set()
+            try:
+                data = json.loads(self.cache_path.read_text())
+                if data.get("fingerprint") == self._fingerprint:
+                    self._satisfied = set(data["satisfied"])
+            except (OSError, ValueError, KeyError, AttributeError):
+                pass
+        return self._satisfied
+
+    def _save(self) -> None:
+        data = {"fingerprint": self._fingerprint, "satisfied": sorted(self._satisfied)}
+        temp_path = self.cache_path.with_name(
+            f"{self.cache_path.name}.{os.getpid()}.tmp"
+        )
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path.write_text(json.dumps(data))
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            pass
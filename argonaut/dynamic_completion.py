@@ -0,0 +1,236 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Completion providers and their on-disk cache.
+#
+# Generated completion scripts run this file directly as
+#   python dynamic_completion.py __complete PROVIDER TTL PREFIX
+# rather than importing the argonaut package, so a TAB press only pays for
+# the standard library plus whatever the provider itself imports.
+import os
+import sys
+
+if __name__ == "__main__":
+    # Run as a script, this file's directory lands on sys.path and the
+    # package's own modules (logging, plugins, ...) would shadow the stdlib.
+    _here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or os.curdir) != _here]
+
+import importlib
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Union
+
+DEFAULT_TTL = 60.0
+
+
+def get_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "argonaut", "completion")
+
+
+def provider_spec(provider: Union[str, Callable[[], Iterable[Any]]]) -> Optional[str]:
+    """Return the ``"module:function"`` spec of a provider, if it has one."""
+    if isinstance(provider, str):
+        return provider
+    module = getattr(provider, "__module__", None)
+    qualname = getattr(provider, "__qualname__", "")
+    if not module or module == "__main__" or "<" in qualname:
+        return None
+    return f"{module}:{qualname}"
+
+
+def load_provider(spec: str) -> Callable[[], Iterable[Any]]:
+    # Mirrors utils.import_from_string, which cannot be imported from here
+    # without pulling in the whole package.
+    module_name, _, attribute = spec.partition(":")
+    target: Any = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        target = getattr(target, part)
+    return target
+
+
+def filter_prefix(items: List[str], prefix: str) -> List[str]:
+    """Return the items of a sorted list that start with ``prefix``."""
+    start = bisect_left(items, prefix)
+    end = bisect_left(items, prefix + "\U0010ffff", start)
+    return items[start:end]
+
+
+class CompletionCache:
+    """
+    An on-disk cache of completion provider results.
+
+    Each provider's sorted candidates are stored one per line in a plain
+    text file, after a first line holding the time they were computed (plain
+    text keeps json, and the re module it imports, off the TAB path). A
+    fresh entry is served as is. An expired entry is still served
+    immediately while it is recomputed in the background, so an expensive
+    provider only slows down the very first completion, never the ones
+    after it.
+
+    The recomputation runs on a daemon thread. Only the short-lived
+    ``__complete`` entry point, which exits right after answering, passes
+    ``fork`` to run it in a detached child process instead: forking a
+    long-lived, multi-threaded process such as the shell is not safe.
+
+    Attributes:
+        directory (str): Where the results are stored.
+        fork (bool): Recompute in a detached child process.
+    """
+
+    def __init__(self, directory: Optional[str] = None, fork: bool = False):
+        self.directory = directory or get_cache_dir()
+        self.fork = fork and hasattr(os, "fork")
+
+    def get(
+        self,
+        spec: str,
+        ttl: float = DEFAULT_TTL,
+        provider: Optional[Callable[[], Iterable[Any]]] = None,
+    ) -> List[str]:
+        entry = self.read(spec)
+        if entry is None:
+            return self.refresh(spec, provider)
+        computed_at, items = entry
+        if time.time() - computed_at > ttl:
+            self._refresh_in_background(spec, ttl, provider)
+        return items
+
+    def read(self, spec: str) -> Optional[Tuple[float, List[str]]]:
+        try:
+            with open(self._path(spec), "r", encoding="utf-8") as f:
+                computed_at = float(f.readline())
+                return computed_at, f.read().splitlines()
+        except (OSError, ValueError):
+            return None
+
+    def refresh(
+        self, spec: str, provider: Optional[Callable[[], Iterable[Any]]] = None
+    ) -> List[str]:
+        provider = provider or load_provider(spec)
+        items = sorted({str(item) for item in provider()} - {""})
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(spec)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(f"{time.time()}\n")
+            f.write("".join(f"{item}\n" for item in items))
+        os.replace(temp_path, path)
+        return items
+
+    def clear(self, spec: Optional[str] = None) -> None:
+        """Drop the cached results of one provider, or of all of them."""
+        if spec:
+            paths = [self._path(spec)]
+        elif os.path.isdir(self.directory):
+            paths = [
+                os.path.join(self.directory, n) for n in os.listdir(self.directory)
+            ]
+        else:
+            paths = []
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _path(self, spec: str) -> str:
+        name = "".join(c if c.isalnum() or c in "._-" else "_" for c in spec)
+        return os.path.join(self.directory, f"{name}.txt")
+
+    def _refresh_and_unlock(
+        self,
+        spec: str,
+        provider: Optional[Callable[[], Iterable[Any]]],
+        lock_path: str,
+    ) -> None:
+        try:
+            self.refresh(spec, provider)
+        except Exception:
+            pass
+        finally:
+            try:
+                os.unlink(lock_path)
+            except OSError:
+                pass
+
+    def _refresh_in_background(
+        self,
+        spec: str,
+        ttl: float,
+        provider: Optional[Callable[[], Iterable[Any]]],
+    ) -> None:
+        lock_path = self._path(spec) + ".lock"
+        try:
+            if time.time() - os.path.getmtime(lock_path) < max(ttl, 30.0):
+                return  # Another refresh is already running.
+            os.unlink(lock_path)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except OSError:
+            return
+
+        if not self.fork:
+            # Imported here, as only in-process callers need it.
+            import threading
+
+            threading.Thread(
+                target=self._refresh_and_unlock,
+                args=(spec, provider, lock_path),
+                name="argonaut-completion-refresh",
+                daemon=True,
+            ).start()
+            return
+
+        if os.fork() != 0:
+            return
+        # Child: detach from the shell's command substitution so it does not
+        # wait for us, recompute, and exit without running parent cleanup.
+        try:
+            os.setsid()
+            devnull = os.open(os.devnull, os.O_RDWR)
+            for fd in (0, 1, 2):
+                os.dup2(devnull, fd)
+            self.refresh(spec, provider)
+        except BaseException:
+            pass
+        finally:
+            try:
+                os.unlink(lock_path)
+            finally:
+                os._exit(0)
+
+
+def complete(
+    spec: str, prefix: str = "", ttl: float = DEFAULT_TTL, fork: bool = False
+) -> List[str]:
+    """Return the cached candidates of a provider that start with ``prefix``."""
+    return filter_prefix(CompletionCache(fork=fork).get(spec, ttl), prefix)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 3 or argv[0] != "__complete":
+        print(
+            "usage: dynamic_completion.py __complete PROVIDER TTL [PREFIX]",
+            file=sys.stderr,
+        )
+        return 2
+    spec, ttl = argv[1], float(argv[2])
+    prefix = argv[3] if len(argv) > 3 else ""
+    try:
+        # This process exits as soon as it has answered, which would end a
+        # refresh thread, so an expired entry is refreshed by a child.
+        candidates = complete(spec, prefix, ttl, fork=True)
+    except Exception:
+        return 1
+    sys.stdout.write("\n".join(candidates))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 # /usr/bin/env python3
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import List, Optional
 import traceback
 
 
@@ -77,10 +77,10 @@ class ArgonautUnknownArgumentError(ArgonautError):
 class RateLimitError(ArgonautError):
     """Raised when rate limit is exceeded."""
 
-    def __init__(self, limit: int, period: str):
+    def __init__(self, limit: int, period: str, message: Optional[str] = None):
         self.limit = limit
         self.period = period
-        message = f"Rate limit exceeded: {limit} requests per {period}"
+        message = message or f"Rate limit exceeded: {limit} requests per {period}"
         super().__init__(message)
 
 
@@ -233,3 +233,34 @@ class PluginLoadError(PluginError):
 
 class PluginExecutionError(PluginError):
     pass
+
+
+class PluginTimeoutError(PluginExecutionError):
+    """Raised when a plugin execution runs past its timeout."""
+
+    def __init__(self, plugin_name: str, timeout: float):
+        self.timeout = timeout
+        super().__init__(plugin_name, f"Execution timed out after {timeout}s")
+
+
+class PluginCancelledError(PluginExecutionError):
+    """Raised by a plugin that stops because its execution was cancelled."""
+
+    def __init__(self, plugin_name: str, reason: Optional[str] = None):
+        self.reason = reason
+        super().__init__(plugin_name, f"Execution cancelled: {reason or 'cancelled'}")
+
+
+class PluginWorkerLostError(PluginExecutionError):
+    """
+    Raised for a call that was running in a worker process when the workers
+    were killed to stop another call. The call may or may not have taken
+    effect, so it is only safe to retry if the plugin is idempotent.
+    """
+
+    retryable = True
+
+    def __init__(self, plugin_name: str):
+        super().__init__(
+            plugin_name, "Worker process was killed while the call was running"
+        )
@@ -0,0 +1,261 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import multiprocessing
+import multiprocessing.util
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from .exceptions import PluginWorkerLostError
+
+EXECUTION_BACKENDS = ("inline", "thread", "process")
+
+# The plugin instance held by a process-pool worker.
+_WORKER_PLUGIN: Any = None
+
+
+def process_context() -> Any:
+    """
+    The multiprocessing context worker pools start their processes with:
+    ``forkserver`` where available, else ``spawn``. Unlike ``fork``, both
+    start workers from a clean interpreter, rather than from a copy of a
+    parent whose other threads may hold locks that then never get released.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _initialize_worker(source: str, entry_point: bool) -> None:
+    """Load and initialize the plugin once, when a worker process starts."""
+    global _WORKER_PLUGIN
+    from .core import Argonaut
+    from .plugins import PluginContext
+
+    parser = Argonaut()
+    manager = parser.plugin_manager
+    plugin = manager._create_plugin(source, entry_point)
+    plugin.initialize(
+        PluginContext(
+            parser, parser.logger, parser.colored_output, plugin.metadata.name
+        )
+    )
+    _WORKER_PLUGIN = plugin
+    # Runs when the worker exits, including when the pool shuts down.
+    multiprocessing.util.Finalize(None, plugin.cleanup, exitpriority=10)
+
+
+def _execute_in_worker(args: Dict[str, Any]) -> Any:
+    return _WORKER_PLUGIN.execute(args)
+
+
+class _TrackingContext:
+    """
+    A multiprocessing context that keeps every process it starts, so a
+    pool's workers can be killed without reaching into the pool.
+    """
+
+    def __init__(self, context: Any):
+        self._context = context
+        self.processes: List[Any] = []
+
+    def Process(self, *args, **kwargs):
+        process = self._context.Process(*args, **kwargs)
+        self.processes.append(process)
+        return process
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._context, name)
+
+
+class ProcessBackend:
+    """
+    A pool of worker processes that each hold an initialized copy of a plugin.
+
+    Workers are started once and reused. Each one imports and initializes
+    the plugin in its initializer, so a call only sends the arguments and
+    receives the result. Workers are started with :func:`process_context`
+    (``forkserver`` where available, else ``spawn``), so each begins in a
+    fresh interpreter: it re-imports the main module, argonaut and the
+    plugin before its first call, which makes starting a pool, or replacing
+    one after a kill, cost a few hundred milliseconds. When the pool shuts
+    down, each worker runs the plugin's ``cleanup`` before exiting.
+
+    A call that times out is stopped with :meth:`kill`. A process pool
+    cannot lose a single worker without breaking, so the whole pool is
+    replaced. Calls still queued are resubmitted to the new pool, so they
+    only see the delay. Calls that were running in the other workers may
+    already have taken effect: they are resubmitted only with ``resubmit``,
+    and otherwise fail with :class:`PluginWorkerLostError`.
+
+    Attributes:
+        name (str): The name of the plugin.
+        max_workers (Optional[int]): The number of workers. Defaults to the
+            number of CPUs.
+        resubmit (bool): Whether calls lost to a kill are run again, for
+            idempotent plugins.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        source: str,
+        entry_point: bool,
+        max_workers: Optional[int],
+        resubmit: bool = False,
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self.resubmit = resubmit
+        self._source = source
+        self._entry_point = entry_point
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._context = _TrackingContext(process_context())
+        self._executor = self._start()
+
+    def _start(self) -> ProcessPoolExecutor:
+        self._context = _TrackingContext(self._context._context)
+        return ProcessPoolExecutor(
+            self.max_workers,
+            mp_context=self._context,
+            initializer=_initialize_worker,
+            initargs=(self._source, self._entry_point),
+        )
+
+    def submit(self, args: Dict[str, Any]) -> Future:
+        future: Future = Future()
+        self._dispatch(future, args)
+        return future
+
+    def _dispatch(self, future: Future, args: Dict[str, Any]) -> None:
+        with self._lock:
+            generation = self._generation
+            inner = self._executor.submit(_execute_in_worker, args)
+        inner.add_done_callback(
+            lambda done: self._complete(future, done, args, generation)
+        )
+        future.add_done_callback(lambda done: done.cancelled() and inner.cancel())
+
+    def _complete(
+        self, future: Future, inner: Future, args: Dict[str, Any], generation: int
+    ) -> None:
+        if future.done():
+            return
+        lost = generation != self._generation
+        if lost and inner.cancelled():
+            # Still queued when another call's kill() replaced the pool.
+            self._dispatch(future, args)
+        elif lost and isinstance(inner.exception(), BrokenProcessPool):
+            # Running, or about to, when the workers were killed.
+            if self.resubmit:
+                self._dispatch(future, args)
+            else:
+                future.set_exception(PluginWorkerLostError(self.name))
+        elif inner.cancelled():
+            future.cancel()
+        elif inner.exception() is not None:
+            future.set_exception(inner.exception())
+        else:
+            future.set_result(inner.result())
+
+    def kill(self) -> None:
+        """Kill the workers, including any stuck on a call, and start anew."""
+        with self._lock:
+            executor, context = self._executor, self._context
+            self._executor = self._start()
+            self._generation += 1
+        for process in context.processes:
+            if process.pid is not None and process.exitcode is None:
+                process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+class MapResult:
+    """
+    The outcome of one item of :meth:`PluginManager.map_plugin`.
+
+    Attributes:
+        index (int): The position of the item in the input.
+        args (Dict[str, Any]): The arguments the plugin was called with.
+        result (Any): The plugin's result, or None if it failed.
+        error (Optional[BaseException]): The exception the plugin raised.
+    """
+
+    __slots__ = ("index", "args", "result", "error")
+
+    def __init__(
+        self,
+        index: int,
+        args: Dict[str, Any],
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ):
+        self.index = index
+        self.args = args
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        outcome = f"result={self.result!r}" if self.ok else f"error={self.error!r}"
+        return f"MapResult(index={self.index}, {outcome})"
+
+
+async def iterate_in_thread(
+    iterable: Iterable[Any], buffer: int = 64
+) -> AsyncIterator[Any]:
+    """
+    Iterate a blocking iterable in a worker thread from async code.
+
+    Items are handed over through a buffer of ``buffer`` items, so the
+    iterable runs ahead of the consumer by at most that much, and a slow
+    consumer stalls the thread rather than growing memory. Closing the
+    async iterator stops the thread after its current item and closes the
+    iterable.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    slots = threading.Semaphore(buffer)
+    stopped = threading.Event()
+    end = object()
+
+    def produce() -> None:
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                slots.acquire()
+                if stopped.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (end, e))
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, (end, None))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    producer = asyncio.ensure_future(asyncio.to_thread(produce))
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            slots.release()
+            yield item
+    finally:
+        stopped.set()
+        slots.release()
+        await producer
@@ -0,0 +1,256 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from .exceptions import RateLimitError
+
+
+class TokenBucket:
+    """
+    Allows ``rate`` operations per second on average, with bursts of up to
+    ``burst`` operations.
+
+    Tokens are reserved rather than polled for: a caller that has to wait
+    takes a token in advance and is told how long to sleep, so waiters are
+    spread out at the allowed rate instead of all waking at once.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Reserve a token and return the seconds to wait before using it, or
+        None, without reserving, if that would be longer than ``max_wait``.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def refund(self) -> None:
+        """Give back a token reserved for an operation that did not happen."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+
+class _Waiter:
+    """A thread or a coroutine waiting for a :class:`ConcurrencyLimit` slot."""
+
+    __slots__ = ("event", "loop", "future")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def grant(self) -> bool:
+        """Wake the waiter. Returns False if its event loop has closed."""
+        if self.loop is None:
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(self._resolve)
+        except RuntimeError:
+            return False
+        return True
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class ConcurrencyLimit:
+    """
+    A semaphore that threads and coroutines can wait on alike.
+
+    Slots are handed to waiters in arrival order, whichever kind they are,
+    and a coroutine waiting for a slot does not tie up a thread.
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+        self.active = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, block: bool = True, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return True
+            if not block:
+                return False
+            waiter = _Waiter()
+            self._waiters.append(waiter)
+        if waiter.event.wait(timeout):
+            return True
+        return self._abandon(waiter)
+
+    async def acquire_async(
+        self, block: bool = True, timeout: Optional[float] = None
+    ) -> bool:
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return True
+            if not block:
+                return False
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._abandon(waiter)
+        except BaseException:
+            if self._abandon(waiter):
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            # The slot passes straight to the next waiter that can take it.
+            while self._waiters:
+                if self._waiters.popleft().grant():
+                    return
+            self.active -= 1
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Stop waiting. Returns True if the slot was granted in the meantime."""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+                return False
+            except ValueError:
+                return True
+
+
+class ExecutionLimiter:
+    """
+    Concurrency and rate limits for executing a plugin, or all plugins.
+
+    Attributes:
+        max_concurrent (Optional[int]): The most executions running at once.
+        rate (Optional[float]): The executions started per second, on average.
+        burst (Optional[float]): The executions that may start at once after
+            an idle period. Defaults to ``rate``.
+        block (bool): Whether a call over a limit waits its turn (True) or
+            fails at once with :class:`RateLimitError` (False).
+        timeout (Optional[float]): The longest a blocked call waits before
+            failing with :class:`RateLimitError`. None waits indefinitely.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.block = block
+        self.timeout = timeout
+        self._slots = ConcurrencyLimit(max_concurrent) if max_concurrent else None
+        self._bucket = TokenBucket(rate, burst) if rate else None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ExecutionLimiter":
+        """Build a limiter from a ``limits`` mapping in a plugin's config."""
+        unknown = set(config) - {"max_concurrent", "rate", "burst", "block", "timeout"}
+        if unknown:
+            raise ValueError(f"Unknown limit settings: {', '.join(sorted(unknown))}")
+        return cls(**config)
+
+    def acquire(self, block: Optional[bool] = None) -> None:
+        """Wait for, or fail fast on, both limits. Pair with :meth:`release`."""
+        block, deadline = self._start(block)
+        if self._bucket is not None:
+            wait = self._bucket.reserve(self._remaining(block, deadline))
+            if wait is None:
+                raise RateLimitError(self.rate, "second")
+            if wait:
+                time.sleep(wait)
+        if self._slots is None:
+            return
+        acquired = False
+        try:
+            acquired = self._slots.acquire(block, self._remaining(block, deadline))
+        finally:
+            # The rate token was taken for an execution that will not start.
+            if not acquired and self._bucket is not None:
+                self._bucket.refund()
+        if not acquired:
+            raise self._concurrency_error()
+
+    async def acquire_async(self, block: Optional[bool] = None) -> None:
+        """Asynchronous version of :meth:`acquire`."""
+        block, deadline = self._start(block)
+        if self._bucket is not None:
+            wait = self._bucket.reserve(self._remaining(block, deadline))
+            if wait is None:
+                raise RateLimitError(self.rate, "second")
+            if wait:
+                await asyncio.sleep(wait)
+        if self._slots is None:
+            return
+        acquired = False
+        try:
+            acquired = await self._slots.acquire_async(
+                block, self._remaining(block, deadline)
+            )
+        finally:
+            if not acquired and self._bucket is not None:
+                self._bucket.refund()
+        if not acquired:
+            raise self._concurrency_error()
+
+    def release(self) -> None:
+        if self._slots is not None:
+            self._slots.release()
+
+    def _start(self, block: Optional[bool]):
+        block = self.block if block is None else block
+        deadline = None
+        if block and self.timeout is not None:
+            deadline = time.monotonic() + self.timeout
+        return block, deadline
+
+    @staticmethod
+    def _remaining(block: bool, deadline: Optional[float]) -> Optional[float]:
+        if not block:
+            return 0.0
+        if deadline is None:
+            return None
+        return max(0.0, deadline - time.monotonic())
+
+    def _concurrency_error(self) -> RateLimitError:
+        return RateLimitError(
+            self.max_concurrent,
+            "execution",
+            f"Concurrency limit exceeded: {self.max_concurrent} executions "
+            f"already running",
+        )
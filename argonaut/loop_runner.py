@@ -0,0 +1,249 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import inspect
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+
+class LoopRunner:
+    """
+    A long-lived event loop on a background thread.
+
+    Synchronous code submits coroutines to it instead of starting a new
+    loop with ``asyncio.run`` on every call, so objects bound to a loop,
+    such as HTTP client sessions and their connection pools, can be kept
+    and reused between calls. The thread starts on first use and is a
+    daemon, so it never keeps the process alive.
+    """
+
+    def __init__(self, name: str = "argonaut-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The runner's event loop, started if it is not running yet."""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run_forever,
+                    args=(loop, started),
+                    name=self.name,
+                    daemon=True,
+                )
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+            return self._loop
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def in_loop(self) -> bool:
+        """Whether the caller is running on the runner's thread."""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coroutine: Awaitable) -> Future:
+        """Schedule ``coroutine`` on the loop and return a Future for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run ``coroutine`` on the loop and wait for its result.
+
+        Raises:
+            RuntimeError: If called from the loop's own thread, where
+                waiting would deadlock; await the coroutine there instead.
+            concurrent.futures.TimeoutError: If it runs past ``timeout``, in
+                which case it is cancelled.
+        """
+        if self.in_loop():
+            if inspect.iscoroutine(coroutine):
+                coroutine.close()
+            raise RuntimeError("LoopRunner.run cannot be called from its own loop")
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    async def run_async(self, coroutine: Awaitable) -> Any:
+        """
+        Await ``coroutine`` on the runner's loop from any other loop.
+
+        Cancelling the caller cancels the coroutine.
+        """
+        if self.in_loop():
+            return await coroutine
+        return await asyncio.wrap_future(self.submit(coroutine))
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        Cancel the loop's remaining tasks and stop its thread. The runner
+        starts a new loop if it is used again.
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        if threading.current_thread() is thread:
+            loop.call_soon(loop.stop)
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._drain(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    @staticmethod
+    def _run_forever(loop: asyncio.AbstractEventLoop, started: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    @staticmethod
+    async def _drain() -> None:
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.get_running_loop().shutdown_asyncgens()
+
+
+class _Resource:
+    __slots__ = ("value", "close", "owners")
+
+    def __init__(self, value: Any, close: Optional[Callable[[Any], Any]]):
+        self.value = value
+        self.close = close
+        self.owners: Set[str] = set()
+
+
+class SharedResources:
+    """
+    Named objects, such as client sessions and connection pools, shared by
+    every plugin of a :class:`PluginManager`.
+
+    A resource is created on the runner's loop the first time a plugin asks
+    for it, so objects that bind to a loop can be used from coroutines
+    submitted to that loop. Each plugin that asked for it holds a reference
+    until it is cleaned up; the resource is closed when the last one is.
+    """
+
+    def __init__(self, runner: LoopRunner):
+        self.runner = runner
+        self._resources: Dict[str, _Resource] = {}
+        self._lock = threading.Lock()
+
+    def acquire(
+        self,
+        owner: str,
+        name: str,
+        factory: Callable[[], Any],
+        close: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """
+        Return the resource ``name``, creating it with ``factory`` if needed.
+
+        Args:
+            owner (str): The plugin taking a reference.
+            name (str): The resource's name, shared by every plugin.
+            factory (Callable[[], Any]): Creates the resource. It is called on
+                the runner's loop and may be a coroutine function.
+            close (Optional[Callable[[Any], Any]]): Closes the resource, and
+                may return an awaitable. Defaults to its ``close`` method.
+        """
+        resource = self._take(owner, name)
+        if resource is not None:
+            return resource.value
+        return self.runner.run(self.acquire_async(owner, name, factory, close))
+
+    async def acquire_async(
+        self,
+        owner: str,
+        name: str,
+        factory: Callable[[], Any],
+        close: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """Asynchronous version of :meth:`acquire`."""
+        resource = self._take(owner, name)
+        if resource is not None:
+            return resource.value
+        if not self.runner.in_loop():
+            return await self.runner.run_async(
+                self.acquire_async(owner, name, factory, close)
+            )
+        value = factory()
+        if inspect.isawaitable(value):
+            value = await value
+        with self._lock:
+            resource = self._resources.get(name)
+            duplicate = resource is not None
+            if not duplicate:
+                resource = self._resources[name] = _Resource(value, close)
+            resource.owners.add(owner)
+        if duplicate:
+            # Another plugin created the same resource in the meantime.
+            await self._close_async(_Resource(value, close))
+        return resource.value
+
+    def release(self, owner: str) -> None:
+        """Drop every reference ``owner`` holds, closing unused resources."""
+        with self._lock:
+            unused = []
+            for name, resource in list(self._resources.items()):
+                resource.owners.discard(owner)
+                if not resource.owners:
+                    unused.append(self._resources.pop(name))
+        self._close(unused)
+
+    def close_all(self) -> None:
+        with self._lock:
+            unused, self._resources = list(self._resources.values()), {}
+        self._close(unused)
+
+    def _take(self, owner: str, name: str) -> Optional[_Resource]:
+        with self._lock:
+            resource = self._resources.get(name)
+            if resource is not None:
+                resource.owners.add(owner)
+            return resource
+
+    def _close(self, resources) -> None:
+        if not resources:
+            return
+        if self.runner.in_loop():
+            for resource in resources:
+                self.runner.loop.create_task(self._close_async(resource))
+            return
+        for resource in resources:
+            try:
+                self.runner.run(self._close_async(resource), timeout=5.0)
+            except Exception:
+                pass
+
+    @staticmethod
+    async def _close_async(resource: _Resource) -> None:
+        close = resource.close or getattr(resource.value, "close", None)
+        if close is None:
+            return
+        try:
+            result = close(resource.value) if resource.close else close()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            pass
@@ -0,0 +1,251 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """
+    Counts observations in fixed buckets, as Prometheus histograms do, so
+    recording one costs a binary search and a few additions however many
+    there are. The bucket after the last bound counts everything larger.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile by interpolating within its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.max
+                if index < len(self.buckets):
+                    upper = min(upper, self.buckets[index])
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max if self.count else None,
+        }
+
+
+class PluginMetrics:
+    """
+    What one plugin has cost so far.
+
+    Attributes:
+        load_seconds (Optional[float]): Time spent importing the plugin.
+        initialize_seconds (Optional[float]): Time spent in ``initialize``.
+        calls (Histogram): The latency of every execution, failed or not.
+        errors (Dict[str, int]): Failed executions by exception type.
+        hooks (Dict[str, Histogram]): The time spent in each hook, both the
+            manager's hooks fired for the plugin and the plugin's own.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.load_seconds: Optional[float] = None
+        self.initialize_seconds: Optional[float] = None
+        self.calls = Histogram(buckets)
+        self.errors: Dict[str, int] = {}
+        self.hooks: Dict[str, Histogram] = {}
+        self._buckets = buckets
+        self._lock = threading.Lock()
+
+    def observe_call(self, seconds: float, error: Optional[BaseException]) -> None:
+        with self._lock:
+            self.calls.observe(seconds)
+            if error is not None:
+                kind = type(error).__name__
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def observe_hook(self, hook_name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.hooks.get(hook_name)
+            if histogram is None:
+                histogram = self.hooks[hook_name] = Histogram(self._buckets)
+            histogram.observe(seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "load_seconds": self.load_seconds,
+                "initialize_seconds": self.initialize_seconds,
+                "calls": self.calls.count,
+                "errors": sum(self.errors.values()),
+                "errors_by_type": dict(self.errors),
+                "latency": self.calls.as_dict(),
+                "hooks": {name: h.as_dict() for name, h in self.hooks.items()},
+            }
+
+
+class MetricsRegistry:
+    """
+    The :class:`PluginMetrics` of every plugin of a manager, kept in memory.
+
+    See :meth:`PluginManager.stats` and :meth:`write_prometheus`.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.plugins: Dict[str, PluginMetrics] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> PluginMetrics:
+        metrics = self.plugins.get(name)
+        if metrics is None:
+            with self._lock:
+                metrics = self.plugins.setdefault(name, PluginMetrics(self.buckets))
+        return metrics
+
+    def observe_call(
+        self, name: str, seconds: float, error: Optional[BaseException] = None
+    ) -> None:
+        self.get(name).observe_call(seconds, error)
+
+    def observe_hook(self, name: str, hook_name: str, seconds: float) -> None:
+        self.get(name).observe_hook(hook_name, seconds)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: metrics.as_dict() for name, metrics in list(self.plugins.items())}
+
+    def clear(self) -> None:
+        with self._lock:
+            self.plugins = {}
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        plugins = sorted(self.plugins.items())
+        lines: List[str] = []
+        for metric, attribute, help_text in (
+            ("load", "load_seconds", "Seconds spent importing the plugin."),
+            ("initialize", "initialize_seconds", "Seconds spent in initialize."),
+        ):
+            lines.append(f"# HELP argonaut_plugin_{metric}_seconds {help_text}")
+            lines.append(f"# TYPE argonaut_plugin_{metric}_seconds gauge")
+            for name, metrics in plugins:
+                value = getattr(metrics, attribute)
+                if value is not None:
+                    lines.append(
+                        f"argonaut_plugin_{metric}_seconds"
+                        f"{_labels(plugin=name)} {_number(value)}"
+                    )
+
+        lines.append(
+            "# HELP argonaut_plugin_execution_seconds Plugin execution latency."
+        )
+        lines.append("# TYPE argonaut_plugin_execution_seconds histogram")
+        for name, metrics in plugins:
+            with metrics._lock:
+                _histogram_lines(
+                    lines,
+                    "argonaut_plugin_execution_seconds",
+                    metrics.calls,
+                    plugin=name,
+                )
+
+        lines.append("# HELP argonaut_plugin_errors_total Failed plugin executions.")
+        lines.append("# TYPE argonaut_plugin_errors_total counter")
+        for name, metrics in plugins:
+            with metrics._lock:
+                errors = sorted(metrics.errors.items())
+            for kind, count in errors:
+                lines.append(
+                    f"argonaut_plugin_errors_total"
+                    f"{_labels(plugin=name, error=kind)} {count}"
+                )
+
+        lines.append("# HELP argonaut_plugin_hook_seconds Time spent in hooks.")
+        lines.append("# TYPE argonaut_plugin_hook_seconds histogram")
+        for name, metrics in plugins:
+            with metrics._lock:
+                for hook_name, histogram in sorted(metrics.hooks.items()):
+                    _histogram_lines(
+                        lines,
+                        "argonaut_plugin_hook_seconds",
+                        histogram,
+                        plugin=name,
+                        hook=hook_name,
+                    )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Union[str, Path]) -> None:
+        """
+        Write :meth:`to_prometheus` to ``path`` atomically, for the textfile
+        collector of the Prometheus node exporter.
+        """
+        path = Path(path)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(self.to_prometheus(), encoding="utf-8")
+        os.replace(temp_path, path)
+
+
+def _histogram_lines(
+    lines: List[str], metric: str, histogram: Histogram, **labels: str
+) -> None:
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(
+            f"{metric}_bucket{_labels(**labels, le=_number(bound))} {cumulative}"
+        )
+    lines.append(f'{metric}_bucket{_labels(**labels, le="+Inf")} {histogram.count}')
+    lines.append(f"{metric}_sum{_labels(**labels)} {_number(histogram.sum)}")
+    lines.append(f"{metric}_count{_labels(**labels)} {histogram.count}")
+
+
+def _labels(**labels: str) -> str:
+    pairs = (f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value))
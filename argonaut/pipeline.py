@@ -0,0 +1,336 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import queue
+import shlex
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from .exceptions import ArgonautError
+
+PIPELINE_BACKENDS = ("inline", "thread", "process", "async")
+
+# Marks the end of a stage's output.
+_END = object()
+
+
+class PipelineStage:
+    """
+    One plugin in a :class:`Pipeline`.
+
+    Attributes:
+        name (str): The plugin the stage runs.
+        args (Dict[str, Any]): Arguments passed on every call.
+        input_key (Optional[str]): The argument each item of the previous
+            stage is passed as. With None, items must be dicts and are
+            merged into ``args``.
+        backend (Optional[str]): ``"inline"`` or ``"thread"`` stream the
+            plugin's results from the stage's own threads, ``"process"`` runs
+            each item on the process pool and ``"async"`` streams the
+            plugin's ``execute_stream_async`` on the manager's shared event
+            loop. Defaults to the plugin's ``execution_backend``.
+        concurrency (int): The most items the stage works on at once.
+        timeout (Optional[float]): Seconds each call may take.
+    """
+
+    __slots__ = ("name", "args", "input_key", "backend", "concurrency", "timeout")
+
+    def __init__(
+        self,
+        name: str,
+        args: Optional[Dict[str, Any]] = None,
+        input_key: Optional[str] = "input",
+        backend: Optional[str] = None,
+        concurrency: int = 1,
+        timeout: Optional[float] = None,
+    ):
+        if backend is not None and backend not in PIPELINE_BACKENDS:
+            raise ValueError(
+                f"Unknown pipeline backend '{backend}'. "
+                f"Available: {', '.join(PIPELINE_BACKENDS)}"
+            )
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.name = name
+        self.args = dict(args or {})
+        self.input_key = input_key
+        self.backend = backend
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    def make_args(self, item: Any) -> Dict[str, Any]:
+        """Build the arguments for one item of the previous stage."""
+        if self.input_key is not None:
+            return {**self.args, self.input_key: item}
+        if not isinstance(item, dict):
+            raise TypeError(
+                f"Stage '{self.name}' merges its input but got {type(item).__name__}"
+            )
+        return {**self.args, **item}
+
+    def __repr__(self):
+        return f"PipelineStage({self.name!r}, backend={self.backend!r})"
+
+
+class Pipeline:
+    """
+    Plugins chained so that each stage consumes the results of the one
+    before it as they are produced.
+
+    Every stage runs at the same time as the others, in threads of its own,
+    and passes its results on through a queue of at most ``buffer`` items.
+    A stage that gets ahead waits for the next one to catch up, so memory
+    stays flat however many items flow through. Within a stage working on
+    several items at once, results keep the order they are produced in,
+    not the order of the input.
+
+    The first stage is called once, with the pipeline's arguments; every
+    later stage is called once per item of the stage before it.
+    """
+
+    def __init__(self, manager: Any, buffer: int = 16):
+        if buffer < 1:
+            raise ValueError("buffer must be at least 1")
+        self.manager = manager
+        self.buffer = buffer
+        self.stages: List[PipelineStage] = []
+
+    def stage(self, name: str, args: Optional[Dict[str, Any]] = None, **options):
+        """
+        Append a stage. Options are those of :class:`PipelineStage`.
+
+        Returns:
+            Pipeline: The pipeline, so stages can be chained.
+        """
+        self.stages.append(PipelineStage(name, args, **options))
+        return self
+
+    def run(
+        self, args: Optional[Dict[str, Any]] = None, sink: Optional[Any] = None
+    ) -> Union[Iterator[Any], int]:
+        """
+        Start every stage and pass on the results of the last one.
+
+        Closing the returned iterator early stops the pipeline. The first
+        error raised by any stage stops the others and is raised here.
+
+        Args:
+            args (Optional[Dict[str, Any]]): The arguments of the first stage.
+            sink (Optional[Any]): Receives every result instead, as in
+                :meth:`PluginManager.execute_stream`.
+
+        Returns:
+            Union[Iterator[Any], int]: The results, or their number when they
+            went to ``sink``.
+        """
+        if not self.stages:
+            raise ValueError("A pipeline needs at least one stage")
+        plugins = [self.manager._get_plugin(stage.name) for stage in self.stages]
+        backends = [
+            stage.backend or plugin.execution_backend
+            for stage, plugin in zip(self.stages, plugins)
+        ]
+        stream = _PipelineRun(self, backends).results(args or {})
+        if sink is None:
+            return stream
+        write = self.manager._get_sink(sink)
+        count = 0
+        for item in stream:
+            write(item)
+            count += 1
+        return count
+
+    def __repr__(self):
+        return f"Pipeline({' | '.join(stage.name for stage in self.stages)})"
+
+
+class _PipelineRun:
+    """The threads and queues of one run of a :class:`Pipeline`."""
+
+    def __init__(self, pipeline: Pipeline, backends: List[str]):
+        self.manager = pipeline.manager
+        self.stages = pipeline.stages
+        self.backends = backends
+        # queues[i] feeds stage i; the last one holds the pipeline's results.
+        self.queues = [queue.Queue(pipeline.buffer) for _ in range(len(backends) + 1)]
+        self.stopped = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.lock = threading.Lock()
+        self.threads: List[threading.Thread] = []
+
+    def results(self, args: Dict[str, Any]) -> Iterator[Any]:
+        first = self.stages[0]
+        self.queues[0].put({**first.args, **args})
+        self.queues[0].put(_END)
+        for index, stage in enumerate(self.stages):
+            workers = 1 if self.backends[index] == "async" else stage.concurrency
+            remaining = [workers]
+            for _ in range(workers):
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(index, remaining),
+                    name=f"argonaut-pipeline-{stage.name}",
+                    daemon=True,
+                )
+                thread.start()
+                self.threads.append(thread)
+        try:
+            while True:
+                item = self._get(self.queues[-1])
+                if item is _END:
+                    break
+                yield item
+        finally:
+            self.stopped.set()
+        # Joined before raising, so no stage is still running a plugin once
+        # the caller sees the error.
+        for thread in self.threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _work(self, index: int, remaining: List[int]) -> None:
+        stage = self.stages[index]
+        backend = self.backends[index]
+        inbox, outbox = self.queues[index], self.queues[index + 1]
+        try:
+            if backend == "async":
+                self.manager.loop_runner.run(
+                    self._work_async(index, stage, inbox, outbox)
+                )
+            else:
+                while True:
+                    item = self._get(inbox)
+                    if item is _END:
+                        # Leave the marker for the stage's other workers.
+                        inbox.put(_END)
+                        break
+                    args = item if index == 0 else stage.make_args(item)
+                    if backend == "process":
+                        result = self.manager.execute_plugin(
+                            stage.name, args, backend="process", timeout=stage.timeout
+                        )
+                        if not self._put(outbox, result):
+                            break
+                    elif not self._stream(stage, args, outbox):
+                        break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            with self.lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._put(outbox, _END)
+
+    def _stream(self, stage: PipelineStage, args: Dict[str, Any], outbox) -> bool:
+        stream = self.manager.execute_stream(stage.name, args, timeout=stage.timeout)
+        try:
+            for result in stream:
+                if not self._put(outbox, result):
+                    return False
+            return True
+        finally:
+            stream.close()
+
+    async def _work_async(
+        self, index: int, stage: PipelineStage, inbox, outbox
+    ) -> None:
+        # The shared loop works on up to ``concurrency`` items at once.
+        slots = asyncio.Semaphore(stage.concurrency)
+        tasks = set()
+
+        async def process(args: Dict[str, Any]) -> None:
+            try:
+                stream = self.manager.execute_stream_async(
+                    stage.name, args, timeout=stage.timeout
+                )
+                try:
+                    async for result in stream:
+                        if not await self._put_async(outbox, result):
+                            break
+                finally:
+                    await stream.aclose()
+            except Exception as e:
+                self._fail(e)
+            finally:
+                slots.release()
+
+        try:
+            while not self.stopped.is_set():
+                await slots.acquire()
+                try:
+                    item = inbox.get_nowait()
+                except queue.Empty:
+                    item = await asyncio.to_thread(self._get, inbox)
+                if item is _END:
+                    break
+                args = item if index == 0 else stage.make_args(item)
+                task = asyncio.ensure_future(process(args))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _get(self, inbox: queue.Queue) -> Any:
+        while not self.stopped.is_set():
+            try:
+                return inbox.get(timeout=0.05)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _put(self, outbox: queue.Queue, item: Any) -> bool:
+        """Wait for room in ``outbox``. Returns False if the run stopped."""
+        while not self.stopped.is_set():
+            try:
+                outbox.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def _put_async(self, outbox: queue.Queue, item: Any) -> bool:
+        try:
+            outbox.put_nowait(item)
+            return True
+        except queue.Full:
+            return await asyncio.to_thread(self._put, outbox, item)
+
+    def _fail(self, error: BaseException) -> None:
+        with self.lock:
+            if self.error is None:
+                self.error = error
+        self.stopped.set()
+
+
+def split_pipeline(spec: str) -> List[Tuple[List[str], Optional[str]]]:
+    """
+    Split a pipeline given on the command line into its stages.
+
+    Stages are command lines separated by ``|``. A stage's command may end
+    in ``@backend`` to choose its backend, as in
+    ``"scrape --url https://example.com | analyze@process | report"``.
+
+    Returns:
+        List[Tuple[List[str], Optional[str]]]: Each stage's arguments and
+        backend.
+    """
+    lexer = shlex.shlex(spec, posix=True, punctuation_chars="|")
+    lexer.whitespace_split = True
+    segments: List[List[str]] = [[]]
+    for token in lexer:
+        if token == "|":
+            segments.append([])
+        else:
+            segments[-1].append(token)
+    stages = []
+    for segment in segments:
+        if not segment:
+            raise ArgonautError(f"Empty stage in pipeline '{spec}'")
+        command, _, backend = segment[0].partition("@")
+        stages.append(([command] + segment[1:], backend or None))
+    return stages
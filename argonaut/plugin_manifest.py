@@ -0,0 +1,137 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+
+def default_manifest_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return Path(base) / "argonaut" / "plugin_manifest.json"
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PluginManifest:
+    """
+    A cache of what each plugin declares, so plugins can be listed and their
+    subcommands shown without importing them.
+
+    Each record holds a plugin's metadata, the plugins it depends on and the
+    subcommands it registered when it was last initialized. Records are keyed on the plugin's source:
+    the absolute path of a plugin file, or ``"module:attribute"`` for an entry
+    point. A file record stays valid while the file's mtime and size are
+    unchanged; if they change, the file is hashed and the record is kept when
+    the content is the same. An entry point record stays valid while its
+    distribution's version is unchanged.
+
+    Attributes:
+        path (Path): The JSON file the manifest is stored in.
+    """
+
+    format_version = 1
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else default_manifest_path()
+        self._records: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def get(
+        self, source: str, version: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Return the record of ``source`` if it is still valid."""
+        with self._lock:
+            record = self._load().get(source)
+            if record is None:
+                return None
+            if version is not None:
+                return record if record["stamp"].get("version") == version else None
+            try:
+                stat = os.stat(source)
+            except OSError:
+                return None
+            stamp = record["stamp"]
+            if (
+                stamp.get("mtime_ns") == stat.st_mtime_ns
+                and stamp.get("size") == stat.st_size
+            ):
+                return record
+            if stamp.get("hash") != _hash_file(source):
+                return None
+            # Touched but not changed: remember the new mtime.
+            stamp.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            self._dirty = True
+            return record
+
+    def put(
+        self,
+        source: str,
+        metadata: Dict[str, Any],
+        subcommands: list,
+        version: Optional[str] = None,
+        requires: Optional[list] = None,
+    ) -> Dict[str, Any]:
+        if version is not None:
+            stamp: Dict[str, Any] = {"version": version}
+        else:
+            stat = os.stat(source)
+            stamp = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "hash": _hash_file(source),
+            }
+        record = {
+            "stamp": stamp,
+            "metadata": metadata,
+            "subcommands": subcommands,
+            "requires": list(requires or []),
+        }
+        with self._lock:
+            records = self._load()
+            if records.get(source) != record:
+                records[source] = record
+                self._dirty = True
+        return record
+
+    def remove(self, source: str) -> None:
+        with self._lock:
+            if self._load().pop(source, None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        """Write the manifest back if it changed. Failures are not fatal."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": self.format_version, "plugins": self._records}
+            temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path.write_text(json.dumps(data, indent=1))
+                os.replace(temp_path, self.path)
+                self._dirty = False
+            except OSError:
+                pass
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._records is None:
+            try:
+                data = json.loads(self.path.read_text())
+                if data.get("version") != self.format_version:
+                    raise ValueError("Outdated manifest format")
+                self._records = data["plugins"]
+            except (OSError, ValueError, KeyError, AttributeError):
+                self._records = {}
+        return self._records
@@ -0,0 +1,95 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .plugin_manifest import _hash_file
+
+
+class PluginWatcher:
+    """
+    Reloads plugins whose files change, for REPL and daemon sessions that
+    iterate on plugins without restarting.
+
+    Every ``interval`` seconds each plugin file's mtime and size are
+    checked. A changed file is left until the next check, so a file caught
+    half-written is not loaded, and then hashed. Its plugin is reloaded with
+    :meth:`PluginManager.reload_plugin` only if the content changed, so
+    touching or re-saving a file unchanged does nothing. Only the plugin
+    file itself is watched, not the modules it imports; entry point plugins
+    are not watched. A plugin that fails to reload is logged and keeps
+    running its previous code until the file changes again.
+
+    Attributes:
+        manager (PluginManager): The manager whose plugins are watched.
+        interval (float): Seconds between checks.
+    """
+
+    def __init__(self, manager: Any, interval: float = 1.0):
+        self.manager = manager
+        self.interval = interval
+        # name -> (source, mtime_ns, size, sha256) as last seen.
+        self._stamps: Dict[str, Tuple[str, int, int, str]] = {}
+        # name -> (mtime_ns, size) of a change not yet seen twice.
+        self._changing: Dict[str, Tuple[int, int]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "PluginWatcher":
+        self.check()
+        self._thread = threading.Thread(
+            target=self._run, name="argonaut-plugin-watcher", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def check(self) -> List[str]:
+        """Check every plugin file once and reload the changed ones."""
+        reloaded = []
+        for name, (source, entry_point) in list(self.manager.plugin_sources.items()):
+            if entry_point:
+                continue
+            try:
+                stat = os.stat(source)
+            except OSError:
+                continue
+            stamp = self._stamps.get(name)
+            if stamp is None or stamp[0] != source:
+                self._stamps[name] = (
+                    source,
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                    _hash_file(source),
+                )
+                continue
+            seen = (stat.st_mtime_ns, stat.st_size)
+            if stamp[1:3] == seen:
+                self._changing.pop(name, None)
+                continue
+            if self._changing.get(name) != seen:
+                # Wait for the next check, in case the file is being written.
+                self._changing[name] = seen
+                continue
+            del self._changing[name]
+            digest = _hash_file(source)
+            self._stamps[name] = (source, stat.st_mtime_ns, stat.st_size, digest)
+            if digest == stamp[3]:
+                continue
+            try:
+                self.manager.reload_plugin(name)
+            except Exception as e:
+                self.manager.logger.error(f"Failed to reload plugin '{name}': {e}")
+            else:
+                reloaded.append(name)
+        return reloaded
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
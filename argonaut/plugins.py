@@ -1,18 +1,76 @@
 # /usr/bin/env python3
 # -*- coding: utf-8 -*-
 import importlib
+import importlib.metadata
+import importlib.util
 import inspect
-from typing import Any, Dict, List, Optional, Callable, Type, Union
+import os
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Callable,
+    Tuple,
+    Type,
+    Union,
+)
 from abc import ABC, abstractmethod
 import subprocess
-import sys
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    TimeoutError as FutureTimeoutError,
+    wait,
+)
+from functools import partial
+from argonaut.cancellation import (
+    CancellationToken,
+    current_token,
+    run_with_token,
+    run_with_token_async,
+)
 from argonaut.fancy_output import ColoredOutput
 from argonaut.logging import ArgonautLogger
+from argonaut.dependencies import DEPENDENCY_MODES, DependencyResolver
+from argonaut.executors import (
+    EXECUTION_BACKENDS,
+    MapResult,
+    ProcessBackend,
+    iterate_in_thread,
+)
+from argonaut.limits import ExecutionLimiter
+from argonaut.loop_runner import LoopRunner, SharedResources
+from argonaut.metrics import MetricsRegistry
+from argonaut.pipeline import Pipeline
+from argonaut.plugin_manifest import PluginManifest, _hash_file
+from argonaut.plugin_watcher import PluginWatcher
+from argonaut.result_cache import ResultCache
+from argonaut.utils import import_from_string
 import yaml
 import json
 from pathlib import Path
 import asyncio
-from argonaut.exceptions import PluginError, PluginLoadError, PluginExecutionError
+from argonaut.exceptions import (
+    PluginError,
+    PluginLoadError,
+    PluginExecutionError,
+    PluginTimeoutError,
+    PluginWorkerLostError,
+    RateLimitError,
+)
+
+# Raised to the caller of an execution as they are, rather than wrapped in a
+# PluginExecutionError.
+_PASSED_THROUGH = (RateLimitError, PluginTimeoutError, PluginWorkerLostError)
 
 
 class PluginMetadata:
@@ -35,26 +93,321 @@ class PluginMetadata:
 
 class PluginContext:
     def __init__(
-        self, parser: Any, logger: ArgonautLogger, colored_output: ColoredOutput
+        self,
+        parser: Any,
+        logger: ArgonautLogger,
+        colored_output: ColoredOutput,
+        plugin_name: str = "",
     ):
         self.parser = parser
         self.logger = logger
         self.colored_output = colored_output
+        self.plugin_name = plugin_name
+
+    @property
+    def cancellation(self) -> CancellationToken:
+        """The cancellation token of the execution running in this thread or task."""
+        return current_token()
+
+    @property
+    def loop_runner(self) -> LoopRunner:
+        """The plugin manager's shared background event loop."""
+        return self.parser.plugin_manager.loop_runner
+
+    def run(self, coroutine: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the shared event loop and wait for its result,
+        instead of starting a new loop with ``asyncio.run``.
+        """
+        return self.loop_runner.run(coroutine, timeout)
+
+    async def run_async(self, coroutine: Awaitable) -> Any:
+        """Await a coroutine on the shared event loop from any other loop."""
+        return await self.loop_runner.run_async(coroutine)
+
+    def get_resource(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        close: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """
+        Return a resource shared by every plugin, such as an HTTP client
+        session, creating it on the shared loop if needed. It is closed once
+        every plugin that asked for it has been cleaned up.
+
+        See :meth:`argonaut.loop_runner.SharedResources.acquire`.
+        """
+        return self.parser.plugin_manager.resources.acquire(
+            self.plugin_name, name, factory, close
+        )
+
+    async def get_resource_async(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        close: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """Asynchronous version of :meth:`get_resource`."""
+        return await self.parser.plugin_manager.resources.acquire_async(
+            self.plugin_name, name, factory, close
+        )
+
+
+class HookResult:
+    """
+    The outcome of one hook callback.
+
+    Attributes:
+        callback (Callable): The callback that ran.
+        result (Any): What the callback returned, or None if it failed.
+        error (Optional[BaseException]): The exception the callback raised,
+            or an ``asyncio.TimeoutError`` if it ran past its timeout.
+        duration (float): The seconds the callback took.
+    """
+
+    __slots__ = ("callback", "result", "error", "duration")
+
+    def __init__(
+        self,
+        callback: Callable,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+        duration: float = 0.0,
+    ):
+        self.callback = callback
+        self.result = result
+        self.error = error
+        self.duration = duration
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        name = getattr(self.callback, "__qualname__", repr(self.callback))
+        outcome = f"result={self.result!r}" if self.ok else f"error={self.error!r}"
+        return f"HookResult({name}, {outcome}, duration={self.duration:.6f})"
 
 
 class PluginHook:
-    def __init__(self):
-        self.callbacks: List[Callable] = []
+    """
+    A named event that callbacks subscribe to.
+
+    Callbacks run by descending ``priority``. Callbacks that share a priority
+    run concurrently: coroutine functions on an event loop and regular
+    functions on a thread pool, so a slow audit hook and a slow metrics hook
+    cost the longer of the two rather than their sum. A lone synchronous
+    callback without a timeout is simply called, as before.
+
+    As before, an exception raised by a callback, or the timeout error of
+    one that runs past its timeout, is raised once the callbacks sharing its
+    priority have finished, and the lower priorities do not run. This lets a
+    guard hook stop what it guards. With ``collect_errors``, every callback
+    runs and errors are kept in their :class:`HookResult` instead.
+    Synchronous callbacks cannot be interrupted, so one that times out keeps
+    running in the background.
+
+    Attributes:
+        name (str): The name of the hook.
+        timeout (Optional[float]): The default timeout of each callback.
+        collect_errors (bool): Whether errors are returned rather than raised.
+        loop_runner (Optional[LoopRunner]): The loop that coroutine callbacks
+            run on when the hook is executed synchronously. Without one,
+            each execution starts a loop with ``asyncio.run``.
+    """
+
+    _thread_pool: Optional[ThreadPoolExecutor] = None
+    _thread_pool_lock = threading.Lock()
+
+    def __init__(
+        self,
+        name: str = "",
+        timeout: Optional[float] = None,
+        collect_errors: bool = False,
+        loop_runner: Optional[LoopRunner] = None,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.collect_errors = collect_errors
+        self.loop_runner = loop_runner
+        # (priority, callback, timeout) tuples, highest priority first. The
+        # list is replaced rather than mutated, so a hook that is running
+        # keeps the callbacks it started with.
+        self._entries: List[Tuple[int, Callable, Optional[float]]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def callbacks(self) -> List[Callable]:
+        return [callback for _, callback, _ in self._entries]
+
+    def register(
+        self, callback: Callable, priority: int = 0, timeout: Optional[float] = None
+    ):
+        """
+        Subscribe a callback.
 
-    def register(self, callback: Callable):
-        self.callbacks.append(callback)
+        Args:
+            callback (Callable): A function or coroutine function.
+            priority (int): Higher priorities run first; equal priorities
+                run concurrently. Callbacks with equal priority keep their
+                registration order in the results.
+            timeout (Optional[float]): Seconds to wait for this callback.
+                Defaults to the hook's ``timeout``.
+        """
+        with self._lock:
+            entries = self._entries + [(priority, callback, timeout)]
+            entries.sort(key=lambda entry: -entry[0])
+            self._entries = entries
 
     def unregister(self, callback: Callable):
-        self.callbacks.remove(callback)
+        with self._lock:
+            for index, (_, registered, _) in enumerate(self._entries):
+                if registered == callback:
+                    self._entries = self._entries[:index] + self._entries[index + 1 :]
+                    return
+        raise ValueError(f"Callback is not registered with hook '{self.name}'")
 
-    def execute(self, *args, **kwargs):
-        for callback in self.callbacks:
-            callback(*args, **kwargs)
+    def execute(
+        self, *args, combine: Optional[Callable[[List[Any]], Any]] = None, **kwargs
+    ):
+        """
+        Run the callbacks and return one :class:`HookResult` per callback,
+        in priority order. Other arguments are passed to every callback.
+
+        With ``combine``, it is called with the results of the callbacks
+        that succeeded (for example ``all``, ``any`` or ``sum``) and its
+        return value is returned instead.
+        """
+        results: List[HookResult] = []
+        for tier in self._tiers():
+            if any(asyncio.iscoroutinefunction(callback) for _, callback, _ in tier):
+                tier_results = self._run_in_loop(self._run_tier(tier, args, kwargs))
+            elif len(tier) == 1 and self._timeout(tier[0]) is None:
+                tier_results = [self._call(tier[0][1], args, kwargs)]
+            else:
+                tier_results = self._run_in_threads(tier, args, kwargs)
+            self._raise_error(tier_results)
+            results.extend(tier_results)
+        return self._combine(results, combine)
+
+    async def execute_async(
+        self, *args, combine: Optional[Callable[[List[Any]], Any]] = None, **kwargs
+    ):
+        """Asynchronous version of :meth:`execute`."""
+        results: List[HookResult] = []
+        for tier in self._tiers():
+            tier_results = await self._run_tier(tier, args, kwargs)
+            self._raise_error(tier_results)
+            results.extend(tier_results)
+        return self._combine(results, combine)
+
+    def _raise_error(self, results: List[HookResult]) -> None:
+        if self.collect_errors:
+            return
+        for result in results:
+            if not result.ok:
+                raise result.error
+
+    def _tiers(self) -> List[List[Tuple[int, Callable, Optional[float]]]]:
+        tiers: List[List[Tuple[int, Callable, Optional[float]]]] = []
+        for entry in self._entries:
+            if tiers and tiers[-1][0][0] == entry[0]:
+                tiers[-1].append(entry)
+            else:
+                tiers.append([entry])
+        return tiers
+
+    def _timeout(self, entry: Tuple[int, Callable, Optional[float]]) -> Optional[float]:
+        return entry[2] if entry[2] is not None else self.timeout
+
+    @staticmethod
+    def _call(callback: Callable, args: tuple, kwargs: dict) -> HookResult:
+        started = time.perf_counter()
+        try:
+            result = callback(*args, **kwargs)
+        except Exception as e:
+            return HookResult(callback, error=e, duration=time.perf_counter() - started)
+        return HookResult(callback, result, duration=time.perf_counter() - started)
+
+    def _run_in_threads(
+        self, tier: List[Tuple[int, Callable, Optional[float]]], args, kwargs
+    ) -> List[HookResult]:
+        pool = self._get_thread_pool()
+        started = time.perf_counter()
+        futures = [
+            pool.submit(self._call, callback, args, kwargs) for _, callback, _ in tier
+        ]
+        results = []
+        for entry, future in zip(tier, futures):
+            timeout = self._timeout(entry)
+            if timeout is not None:
+                timeout = max(0.0, started + timeout - time.perf_counter())
+            try:
+                results.append(future.result(timeout))
+            except FutureTimeoutError as e:
+                results.append(
+                    HookResult(
+                        entry[1], error=e, duration=time.perf_counter() - started
+                    )
+                )
+        return results
+
+    async def _run_tier(
+        self, tier: List[Tuple[int, Callable, Optional[float]]], args, kwargs
+    ) -> List[HookResult]:
+        async def run(entry: Tuple[int, Callable, Optional[float]]) -> HookResult:
+            callback, timeout = entry[1], self._timeout(entry)
+            started = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(callback):
+                    awaitable = callback(*args, **kwargs)
+                else:
+                    # Not asyncio.to_thread: the loop's default executor is
+                    # joined when the loop closes, which would wait out a
+                    # callback that has already timed out.
+                    awaitable = asyncio.get_running_loop().run_in_executor(
+                        self._get_thread_pool(), partial(callback, *args, **kwargs)
+                    )
+                result = await asyncio.wait_for(awaitable, timeout)
+            except Exception as e:
+                return HookResult(
+                    callback, error=e, duration=time.perf_counter() - started
+                )
+            return HookResult(callback, result, duration=time.perf_counter() - started)
+
+        if len(tier) == 1:
+            return [await run(tier[0])]
+        return list(await asyncio.gather(*(run(entry) for entry in tier)))
+
+    def _run_in_loop(self, coroutine) -> List[HookResult]:
+        if self.loop_runner is not None and not self.loop_runner.in_loop():
+            return self.loop_runner.run(coroutine)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        # Called from inside a running event loop, which cannot be blocked
+        # on, so the callbacks get a loop of their own in another thread.
+        return self._get_thread_pool().submit(asyncio.run, coroutine).result()
+
+    @staticmethod
+    def _combine(
+        results: List[HookResult], combine: Optional[Callable[[List[Any]], Any]]
+    ):
+        if combine is None:
+            return results
+        return combine([result.result for result in results if result.ok])
+
+    @classmethod
+    def _get_thread_pool(cls) -> ThreadPoolExecutor:
+        if cls._thread_pool is None:
+            with cls._thread_pool_lock:
+                if cls._thread_pool is None:
+                    cls._thread_pool = ThreadPoolExecutor(
+                        thread_name_prefix="argonaut-hook"
+                    )
+        return cls._thread_pool
 
 
 class Plugin(ABC):
@@ -86,6 +439,55 @@ class Plugin(ABC):
     def plugin_dependencies(self) -> List[str]:
         return []
 
+    @property
+    def execution_backend(self) -> str:
+        """
+        Where ``execute`` runs by default: ``"inline"`` in the caller's
+        thread, ``"thread"`` on the manager's thread pool, or ``"process"``
+        on a pool of worker processes that each load this plugin once.
+        CPU-bound plugins should use ``"process"``; their arguments and
+        results must then be picklable.
+        """
+        return "inline"
+
+    @property
+    def execution_timeout(self) -> Optional[float]:
+        """
+        Seconds an execution may run before it is abandoned and its
+        cancellation token cancelled. Read from the ``timeout`` key of the
+        plugin's config by default; None waits indefinitely.
+        """
+        return (self.config or {}).get("timeout")
+
+    @property
+    def idempotent(self) -> bool:
+        """
+        Whether running a call twice has the same effect as running it once.
+        When the process backend kills its workers to stop a call that timed
+        out, the calls of an idempotent plugin that were running alongside
+        it are run again; those of other plugins fail with
+        :class:`PluginWorkerLostError`.
+        """
+        return False
+
+    @property
+    def cache_ttl(self) -> Optional[float]:
+        """
+        Seconds a result may be reused for a call with the same
+        :meth:`cache_key`. None, the default, disables result caching.
+        """
+        return None
+
+    def cache_key(self, args: Dict[str, Any]) -> Optional[str]:
+        """
+        Identify a call for result caching: calls with the same key share a
+        result. The default is the arguments themselves. Include anything
+        else the result depends on, such as the mtime of a file being read,
+        and return None for calls that must always run, such as ones with
+        side effects.
+        """
+        return json.dumps(args, sort_keys=True, default=repr)
+
     @abstractmethod
     def initialize(self, context: PluginContext) -> None:
         self.context = context
@@ -106,6 +508,40 @@ class Plugin(ABC):
         self.logger.info(f"Executing plugin asynchronously: {self.metadata.name}")
         raise NotImplementedError("Asynchronous plugin execution not implemented")
 
+    def execute_stream(self, args: Dict[str, Any]) -> Iterator[Any]:
+        """
+        Yield results one at a time as they are produced.
+
+        Override this in plugins that produce many results, so callers can
+        consume the first ones while the rest are computed, without holding
+        all of them in memory. The default yields the result of ``execute``.
+        """
+        yield self.execute(args)
+
+    async def execute_stream_async(self, args: Dict[str, Any]) -> AsyncIterator[Any]:
+        """
+        Asynchronous version of :meth:`execute_stream`.
+
+        The default runs :meth:`execute_stream` in a worker thread, a bounded
+        number of items ahead of the consumer. Plugins that do not stream
+        yield the result of ``execute_async`` instead.
+        """
+        if type(self).execute_stream is not Plugin.execute_stream:
+            async for item in iterate_in_thread(self.execute_stream(args)):
+                yield item
+        elif asyncio.iscoroutinefunction(self.execute_async):
+            yield await self.execute_async(args)
+        else:
+            yield await asyncio.to_thread(self.execute, args)
+
+    @property
+    def streams(self) -> bool:
+        """Whether the plugin overrides one of the streaming methods."""
+        return (
+            type(self).execute_stream is not Plugin.execute_stream
+            or type(self).execute_stream_async is not Plugin.execute_stream_async
+        )
+
     def cleanup(self) -> None:
         self.logger.info(f"Cleaning up plugin: {self.metadata.name}")
 
@@ -121,15 +557,51 @@ class Plugin(ABC):
         log_method = getattr(self.logger, level, self.logger.info)
         log_method(f"[{self.metadata.name}] {message}")
 
-    def register_hook(self, hook_name: str, callback: Callable):
+    def register_hook(
+        self,
+        hook_name: str,
+        callback: Callable,
+        priority: int = 0,
+        timeout: Optional[float] = None,
+    ):
         if hook_name not in self.hooks:
-            self.hooks[hook_name] = PluginHook()
-        self.hooks[hook_name].register(callback)
+            self.hooks[hook_name] = PluginHook(hook_name)
+        self.hooks[hook_name].register(callback, priority, timeout)
 
     def execute_hook(self, hook_name: str, *args, **kwargs):
         if hook_name in self.hooks:
-            return self.hooks[hook_name].execute(*args, **kwargs)
-        return []
+            hook = self.hooks[hook_name]
+            if hook.loop_runner is None:
+                hook.loop_runner = self._get_loop_runner()
+            started = time.perf_counter()
+            try:
+                return hook.execute(*args, **kwargs)
+            finally:
+                self._observe_hook(hook_name, time.perf_counter() - started)
+        combine = kwargs.get("combine")
+        return combine([]) if combine else []
+
+    async def execute_hook_async(self, hook_name: str, *args, **kwargs):
+        if hook_name in self.hooks:
+            started = time.perf_counter()
+            try:
+                return await self.hooks[hook_name].execute_async(*args, **kwargs)
+            finally:
+                self._observe_hook(hook_name, time.perf_counter() - started)
+        combine = kwargs.get("combine")
+        return combine([]) if combine else []
+
+    def _get_loop_runner(self) -> Optional[LoopRunner]:
+        manager = getattr(getattr(self.context, "parser", None), "plugin_manager", None)
+        return manager.loop_runner if manager is not None else None
+
+    def _observe_hook(self, hook_name: str, seconds: float) -> None:
+        manager = getattr(getattr(self.context, "parser", None), "plugin_manager", None)
+        if manager is not None:
+            manager.metrics.observe_hook(self.metadata.name, hook_name, seconds)
+            manager.parser.tracer.record(
+                f"hook: {hook_name}", seconds, plugin=self.metadata.name
+            )
 
     def load_config(self, config_file: Union[str, Path]):
         config_path = Path(config_file)
@@ -172,105 +644,1605 @@ class Plugin(ABC):
             yaml.dump(self.config, f)
 
 
+class LazyPlugin:
+    """
+    Stands in for a plugin that is only known from the plugin manifest.
+
+    It carries the plugin's metadata and declared subcommands, so the plugin
+    can be listed, filtered by tag and shown in help output without being
+    imported. The real plugin is imported and initialized the first time it
+    is executed or one of its subcommands is dispatched.
+    """
+
+    is_lazy = True
+
+    def __init__(
+        self,
+        manager: "PluginManager",
+        source: str,
+        record: Dict[str, Any],
+        version: Optional[str] = None,
+    ):
+        self.manager = manager
+        self.source = source
+        self.version = version
+        self.metadata = PluginMetadata(**record["metadata"])
+        self.subcommands: List[Dict[str, Any]] = record["subcommands"]
+        self.plugin_dependencies: List[str] = record.get("requires", [])
+
+    def load(self) -> Plugin:
+        return self.manager._materialize(self.metadata.name)
+
+
 class PluginManager:
-    def __init__(self, parser, logger: ArgonautLogger, colored_output: ColoredOutput):
-        self.plugins: Dict[str, Union[Plugin, str]] = {}
+    def __init__(
+        self,
+        parser,
+        logger: ArgonautLogger,
+        colored_output: ColoredOutput,
+        manifest: Optional[PluginManifest] = None,
+        dependency_mode: Optional[str] = None,
+        result_cache: Optional[ResultCache] = None,
+    ):
+        # Replaced, never changed in place, under _load_lock (see _publish),
+        # so executions look plugins up without taking a lock.
+        self.plugins: Dict[str, Union[Plugin, LazyPlugin]] = {}
         self.parser = parser
         self.logger = logger
         self.colored_output = colored_output
         self.hooks: Dict[str, PluginHook] = {}
+        self.command_plugins: Dict[str, str] = {}
+        # Only used when plugins are loaded lazily, unless one is given, in
+        # which case every plugin loaded is recorded in it.
+        self.manifest: Optional[PluginManifest] = manifest
+        self._manifest_given = manifest is not None
+        self._load_lock = threading.RLock()
+        self._initializing = threading.local()
+        self._materializing: set = set()
+        self.load_timings: Dict[str, float] = {}
+        self.plugin_sources: Dict[str, Tuple[str, bool]] = {}
+        self.max_workers: Optional[int] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pools: Dict[str, ProcessBackend] = {}
+        # "never" skips dependency checks, "check" fails on missing
+        # dependencies and "install" installs them, with one pip call for
+        # all the plugins of a load_plugins call.
+        self.dependency_mode: str = (
+            dependency_mode or os.environ.get("ARGONAUT_PLUGIN_DEPS") or "check"
+        )
+        if self.dependency_mode not in DEPENDENCY_MODES:
+            raise ValueError(
+                f"dependency_mode must be one of {DEPENDENCY_MODES}, "
+                f"got '{self.dependency_mode}'"
+            )
+        self.dependency_resolver = DependencyResolver()
+        # Held while pip runs, so concurrent loads never install at once.
+        self._install_lock = threading.Lock()
+        # Results of plugins that set cache_ttl, in memory by default. Use
+        # ResultCache(SQLiteCache()) to share them across processes and runs.
+        self.result_cache = result_cache or ResultCache()
+        # Limits on all plugins together, and each plugin's own limits (None
+        # for a plugin without any), see set_limits.
+        self.limits: Optional[ExecutionLimiter] = None
+        self._limiters: Dict[str, Optional[ExecutionLimiter]] = {}
+        # The token of every execution in flight, which is how unloading and
+        # reloading a plugin know when its executions have drained.
+        self._active_tokens: set = set()
+        # A background event loop that synchronous code submits coroutines
+        # to, and the client resources plugins share on it.
+        self.loop_runner = LoopRunner()
+        self.resources = SharedResources(self.loop_runner)
+        # The content hash of each reloaded plugin, part of its cache keys.
+        self._revisions: Dict[str, str] = {}
+        self._watcher: Optional[PluginWatcher] = None
+        # Load, initialize, execution and hook timings of every plugin.
+        self.metrics = MetricsRegistry()
+
+    def load_plugin(self, module_path: str, lazy: bool = False) -> None:
+        """
+        Load the plugin defined in a Python file.
 
-    def load_plugin(self, module_path: str) -> None:
+        With ``lazy``, a plugin whose file is unchanged since it was last
+        loaded is registered from the manifest as a :class:`LazyPlugin`
+        instead, and only imported when it is first used.
+        """
+        source = os.path.abspath(module_path)
+        if lazy:
+            record = self._get_manifest().get(source)
+            if record is not None:
+                self._register_lazy_plugin(LazyPlugin(self, source, record))
+                return
         try:
-            spec = importlib.util.spec_from_file_location("plugin_module", module_path)
-            if spec is None:
+            self._activate(source, self._create_plugin(source), lazy=lazy)
+        except Exception as e:
+            raise PluginLoadError(module_path, f"Error loading plugin: {str(e)}")
+
+    def load_plugins(
+        self,
+        paths: Iterable[str],
+        max_workers: Optional[int] = None,
+        lazy: bool = False,
+    ) -> Dict[str, float]:
+        """
+        Load several plugin files, initializing independent plugins concurrently.
+
+        All files are imported in parallel first. The plugins'
+        ``plugin_dependencies`` then form a graph that is initialized layer by
+        layer: each plugin in a layer only depends on plugins from earlier
+        layers or on plugins that were already loaded, so a whole layer is
+        initialized at once on a thread pool. With ``lazy``, unchanged plugins
+        are registered from the manifest as in :meth:`load_plugin`.
+
+        Args:
+            paths (Iterable[str]): The plugin files to load.
+            max_workers (Optional[int]): The size of the thread pool.
+            lazy (bool): Register unchanged plugins lazily.
+
+        Returns:
+            Dict[str, float]: The seconds spent importing and initializing
+            each plugin that was loaded eagerly.
+
+        Raises:
+            PluginLoadError: If a plugin fails to load, depends on an unknown
+                plugin, or the dependencies form a cycle.
+        """
+        started = time.perf_counter()
+        sources = []
+        for path in paths:
+            source = os.path.abspath(path)
+            record = self._get_manifest().get(source) if lazy else None
+            if record is not None:
+                self._register_lazy_plugin(LazyPlugin(self, source, record))
+            else:
+                sources.append(source)
+
+        timings: Dict[str, float] = {}
+        plugins: Dict[str, Tuple[str, Plugin]] = {}
+        with ThreadPoolExecutor(max_workers) as executor:
+            for source, plugin, seconds in executor.map(self._timed_create, sources):
+                name = plugin.metadata.name
+                if name in plugins:
+                    raise PluginLoadError(source, f"Duplicate plugin name '{name}'")
+                plugins[name] = (source, plugin)
+                timings[name] = seconds
+
+            try:
+                self._install_dependencies([plugin for _, plugin in plugins.values()])
+            except PluginError as e:
+                raise PluginLoadError(e.plugin_name, e.error_message)
+
+            for layer in self._dependency_layers(plugins):
+                futures = {
+                    name: executor.submit(self._timed_activate, *plugins[name], lazy)
+                    for name in layer
+                }
+                for name, future in futures.items():
+                    timings[name] += future.result()
+
+        self.load_timings.update(timings)
+        if timings:
+            slowest = max(timings, key=timings.get)
+            self.logger.info(
+                f"Loaded {len(timings)} plugins in "
+                f"{(time.perf_counter() - started) * 1000:.1f}ms "
+                f"(slowest: {slowest}, {timings[slowest] * 1000:.1f}ms)"
+            )
+        return timings
+
+    def _timed_create(self, source: str) -> Tuple[str, Plugin, float]:
+        started = time.perf_counter()
+        try:
+            plugin = self._create_plugin(source)
+        except Exception as e:
+            raise PluginLoadError(source, f"Error loading plugin: {str(e)}")
+        return source, plugin, time.perf_counter() - started
+
+    def _timed_activate(self, source: str, plugin: Plugin, lazy: bool) -> float:
+        started = time.perf_counter()
+        try:
+            self._activate(source, plugin, lazy=lazy)
+        except Exception as e:
+            raise PluginLoadError(source, f"Error loading plugin: {str(e)}")
+        return time.perf_counter() - started
+
+    def _dependency_layers(
+        self, plugins: Dict[str, Tuple[str, Plugin]]
+    ) -> List[List[str]]:
+        """Group plugins into layers that only depend on earlier layers."""
+        pending: Dict[str, set] = {}
+        for name, (source, plugin) in plugins.items():
+            pending[name] = set()
+            for dependency in plugin.plugin_dependencies:
+                if dependency in plugins:
+                    pending[name].add(dependency)
+                elif dependency not in self.plugins:
+                    raise PluginLoadError(
+                        source, f"Depends on unknown plugin '{dependency}'"
+                    )
+
+        layers = []
+        while pending:
+            layer = sorted(name for name, requires in pending.items() if not requires)
+            if not layer:
+                # Every remaining plugin waits on another one, so following
+                # the first dependency of each must revisit a plugin.
+                path = [min(pending)]
+                while path[-1] not in path[:-1]:
+                    path.append(min(pending[path[-1]]))
+                cycle = path[path.index(path[-1]) :]
                 raise PluginLoadError(
-                    module_path, f"Could not find module: {module_path}"
+                    cycle[0], f"Plugin dependency cycle: {' -> '.join(cycle)}"
                 )
+            layers.append(layer)
+            for name in layer:
+                del pending[name]
+            for requires in pending.values():
+                requires.difference_update(layer)
+        return layers
+
+    def load_entry_points(self, group: str = "argonaut.plugins", lazy: bool = True):
+        """
+        Load the plugins installed under an entry point group.
+
+        Each entry point names a plugin class (``"package.module:MyPlugin"``).
+        With ``lazy``, plugins whose distribution version is unchanged since
+        they were last loaded are registered from the manifest.
+        """
+        entry_points = importlib.metadata.entry_points()
+        if hasattr(entry_points, "select"):
+            entry_points = entry_points.select(group=group)
+        else:
+            entry_points = entry_points.get(group, [])
+
+        for entry_point in entry_points:
+            dist = getattr(entry_point, "dist", None)
+            version = f"{dist.name}=={dist.version}" if dist else None
+            source = entry_point.value
+            if lazy and version:
+                record = self._get_manifest().get(source, version)
+                if record is not None:
+                    plugin = LazyPlugin(self, source, record, version)
+                    self._register_lazy_plugin(plugin)
+                    continue
+            try:
+                plugin = self._create_plugin(source, entry_point=True)
+                self._activate(source, plugin, version, entry_point=True, lazy=lazy)
+            except Exception as e:
+                raise PluginLoadError(
+                    entry_point.name, f"Error loading plugin: {str(e)}"
+                )
+
+    def _create_plugin(self, source: str, entry_point: bool = False) -> Plugin:
+        started = time.perf_counter()
+        if entry_point:
+            plugin_class = import_from_string(source)
+        else:
+            spec = importlib.util.spec_from_file_location("plugin_module", source)
+            if spec is None:
+                raise PluginLoadError(source, f"Could not find module: {source}")
             module = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(module)
-
             plugin_class = self._find_plugin_class(module)
-            if not plugin_class:
-                raise PluginLoadError(
-                    module_path,
-                    f"No valid plugin class found in module '{module_path}'",
+        if not plugin_class:
+            raise PluginLoadError(
+                source,
+                f"No valid plugin class found in module '{source}'",
+            )
+
+        plugin_instance = plugin_class()
+        if not isinstance(plugin_instance, Plugin):
+            raise PluginLoadError(
+                source,
+                f"Plugin class does not inherit from the Plugin base class",
+            )
+        seconds = time.perf_counter() - started
+        self.metrics.get(plugin_instance.metadata.name).load_seconds = seconds
+        self.parser.tracer.record(
+            f"plugin load: {plugin_instance.metadata.name}", seconds, source=source
+        )
+        return plugin_instance
+
+    def _activate(
+        self,
+        source: str,
+        plugin_instance: Plugin,
+        version: Optional[str] = None,
+        entry_point: bool = False,
+        lazy: bool = False,
+    ) -> Plugin:
+        started = time.perf_counter()
+        # Before initialize(), which registers the plugin's subcommands. Does
+        # nothing for the plugins of load_plugins, already checked together.
+        self._install_dependencies([plugin_instance])
+        context = PluginContext(
+            self.parser,
+            self.logger,
+            self.colored_output,
+            plugin_instance.metadata.name,
+        )
+        # Plugins may be initialized concurrently, so the subcommands each one
+        # adds are collected per thread (see _record_subcommand) rather than
+        # by diffing the parser.
+        self._initializing.commands = commands = []
+        try:
+            plugin_instance.initialize(context)
+        finally:
+            self._initializing.commands = None
+        seconds = time.perf_counter() - started
+        self.metrics.get(plugin_instance.metadata.name).initialize_seconds = seconds
+        self.parser.tracer.record(
+            f"plugin initialize: {plugin_instance.metadata.name}", seconds
+        )
+        for command in commands:
+            self.command_plugins[command.name] = plugin_instance.metadata.name
+
+        with self._load_lock:
+            self._publish(plugin_instance.metadata.name, plugin_instance)
+            self.plugin_sources[plugin_instance.metadata.name] = (source, entry_point)
+        if lazy or self._manifest_given:
+            manifest = self._get_manifest()
+            manifest.put(
+                source,
+                self._describe(plugin_instance),
+                [
+                    {
+                        "name": command.name,
+                        "description": command.description,
+                        "aliases": list(command.aliases),
+                    }
+                    for command in commands
+                ],
+                version,
+                plugin_instance.plugin_dependencies,
+            )
+            manifest.save()
+        self.load_timings[plugin_instance.metadata.name] = time.perf_counter() - started
+        self.logger.info(
+            f"Loaded plugin: {plugin_instance.metadata.name} v{plugin_instance.metadata.version}"
+        )
+
+        plugin_instance.on_load()
+        return plugin_instance
+
+    def _get_manifest(self) -> PluginManifest:
+        """The manifest, created at its default path on first use."""
+        if self.manifest is None:
+            with self._load_lock:
+                if self.manifest is None:
+                    self.manifest = PluginManifest()
+        return self.manifest
+
+    def _record_subcommand(self, subcommand: Any) -> None:
+        """Called by the parser for every top-level subcommand it adds."""
+        commands = getattr(self._initializing, "commands", None)
+        if commands is not None:
+            commands.append(subcommand)
+
+    def _register_lazy_plugin(self, plugin: LazyPlugin) -> None:
+        name = plugin.metadata.name
+        self._publish(name, plugin)
+        for command in plugin.subcommands:
+            self.parser.add_subcommand(
+                command["name"],
+                aliases=command["aliases"],
+                loader=partial(self._load_subcommand, name, command["name"]),
+                description=command["description"],
+            )
+            self.command_plugins[command["name"]] = name
+        self._get_manifest().save()
+        self.logger.debug(f"Registered plugin: {name} v{plugin.metadata.version}")
+
+    def _load_subcommand(self, plugin_name: str, command: str, _placeholder: Any):
+        self._materialize(plugin_name)
+        subcommand = self.parser.subcommands.get(command)
+        return None if getattr(subcommand, "is_lazy", False) else subcommand
+
+    def _materialize(self, name: str) -> Plugin:
+        """Replace a lazy plugin with the real, initialized one."""
+        with self._load_lock:
+            plugin = self.plugins.get(name)
+            if not isinstance(plugin, LazyPlugin):
+                if plugin is None:
+                    raise PluginError(name, f"Plugin '{name}' not found")
+                return plugin
+            if name in self._materializing:
+                raise PluginLoadError(name, "Plugin dependency cycle")
+            self._materializing.add(name)
+            try:
+                for dependency in plugin.plugin_dependencies:
+                    if dependency in self.plugins:
+                        self._materialize(dependency)
+                instance = self._create_plugin(
+                    plugin.source, entry_point=plugin.version is not None
+                )
+                return self._activate(
+                    plugin.source,
+                    instance,
+                    plugin.version,
+                    entry_point=plugin.version is not None,
+                    lazy=True,
                 )
+            except Exception as e:
+                raise PluginLoadError(name, f"Error loading plugin: {str(e)}")
+            finally:
+                self._materializing.discard(name)
 
-            plugin_instance = plugin_class()
-            if not isinstance(plugin_instance, Plugin):
-                raise PluginLoadError(
-                    module_path,
-                    f"Plugin class does not inherit from the Plugin base class",
+    def _get_plugin(self, name: str) -> Plugin:
+        plugin = self.plugins.get(name)
+        if plugin is None:
+            raise PluginError(name, f"Plugin '{name}' not found")
+        if isinstance(plugin, LazyPlugin):
+            return plugin.load()
+        return plugin
+
+    def _publish(self, name: str, plugin: Union[Plugin, LazyPlugin]) -> None:
+        """Register ``plugin`` by replacing the registry with a copy."""
+        with self._load_lock:
+            self.plugins = {**self.plugins, name: plugin}
+
+    def _withdraw(self, name: str) -> None:
+        with self._load_lock:
+            plugins = dict(self.plugins)
+            del plugins[name]
+            self.plugins = plugins
+
+    def _checkout(self, name: str) -> Tuple[Plugin, CancellationToken]:
+        """
+        Look a plugin up for an execution, without a lock.
+
+        The execution counts as in flight until the caller discards the
+        returned token from ``_active_tokens``. The token is added before
+        the lookup, so an unload or reload that swaps the plugin out and
+        then collects the plugin's tokens either finds this one, or the
+        lookup already saw the new registry.
+        """
+        token = CancellationToken(name)
+        self._active_tokens.add(token)
+        try:
+            return self._get_plugin(name), token
+        except BaseException:
+            self._release(token)
+            raise
+
+    def _release(self, token: CancellationToken) -> None:
+        """End an execution that :meth:`_checkout` or ``_run`` counted."""
+        self._active_tokens.discard(token)
+        token.finish()
+
+    async def _checkout_async(self, name: str) -> Tuple[Plugin, CancellationToken]:
+        """Asynchronous version of :meth:`_checkout`."""
+        token = CancellationToken(name)
+        self._active_tokens.add(token)
+        try:
+            plugin = self.plugins.get(name)
+            if isinstance(plugin, LazyPlugin):
+                plugin = await asyncio.to_thread(plugin.load)
+            elif plugin is None:
+                raise PluginError(name, f"Plugin '{name}' not found")
+        except BaseException:
+            self._release(token)
+            raise
+        return plugin, token
+
+    def _install_dependencies(self, plugins: List[Plugin]):
+        """Check the plugins' dependencies, installing what is missing at once."""
+        if self.dependency_mode == "never":
+            return
+        owners: Dict[str, str] = {}
+        for plugin in plugins:
+            required_deps = plugin.required_dependencies + plugin.dependencies
+            for requirement in self.dependency_resolver.missing(required_deps):
+                owners.setdefault(requirement, plugin.metadata.name)
+        if not owners:
+            return
+        names = ", ".join(dict.fromkeys(owners.values()))
+        if self.dependency_mode != "install":
+            raise PluginError(
+                names,
+                f"Missing dependencies: {', '.join(owners)}. Install them or "
+                f"set dependency_mode='install' (ARGONAUT_PLUGIN_DEPS=install)",
+            )
+        with self._install_lock:
+            # Another load may have installed them while this one waited.
+            missing = self.dependency_resolver.missing(owners)
+            if not missing:
+                return
+            self.logger.info(f"Installing dependencies for plugins: {names}")
+            try:
+                self.dependency_resolver.install(missing)
+            except subprocess.CalledProcessError:
+                raise PluginError(
+                    names, f"Failed to install dependencies: {', '.join(missing)}"
                 )
 
-            context = PluginContext(self.parser, self.logger, self.colored_output)
-            plugin_instance.initialize(context)
+    def unload_plugin(self, name: str, drain_timeout: Optional[float] = 30.0) -> None:
+        """
+        Remove a plugin.
 
-            self._install_dependencies(plugin_instance)
+        New executions fail with :class:`PluginError` as soon as it is
+        removed. Executions already running finish first: the plugin's
+        ``on_unload`` and ``cleanup`` run, and its worker processes and
+        shared resources are released, once they have, or after
+        ``drain_timeout`` seconds. An execution of the plugin may unload it.
 
-            self.plugins[plugin_instance.metadata.name] = plugin_instance
-            self.logger.info(
-                f"Loaded plugin: {plugin_instance.metadata.name} v{plugin_instance.metadata.version}"
+        Raises:
+            PluginError: If the plugin is not loaded.
+        """
+        # Same order as reload_plugin.
+        with self.parser._dispatch_lock, self._load_lock:
+            plugin = self.plugins.get(name)
+            if plugin is None:
+                raise PluginError(name, f"Plugin '{name}' is not loaded")
+            self._withdraw(name)
+            if isinstance(plugin, LazyPlugin):
+                self._remove_lazy_subcommands(name)
+            pool = self._process_pools.pop(name, None)
+            self.plugin_sources.pop(name, None)
+            self._limiters.pop(name, None)
+            self.command_plugins = {
+                command: owner
+                for command, owner in self.command_plugins.items()
+                if owner != name
+            }
+            running = [t for t in list(self._active_tokens) if t.name == name]
+        self._retire(name, plugin, running, pool, drain_timeout)
+        if not isinstance(plugin, LazyPlugin):
+            self.resources.release(name)
+        self.logger.info(f"Unloaded plugin: {name}")
+
+    def _remove_lazy_subcommands(self, name: str) -> None:
+        for command, owner in self.command_plugins.items():
+            subcommand = self.parser.subcommands.get(command)
+            if owner == name and getattr(subcommand, "is_lazy", False):
+                del self.parser.subcommands[command]
+                for alias in subcommand.aliases:
+                    self.parser.subcommand_aliases.pop(alias, None)
+        self.parser._invalidate_command_tree()
+
+    def reload_plugin(self, name: str, drain_timeout: Optional[float] = 30.0) -> Plugin:
+        """
+        Re-execute a plugin file and swap the new instance in.
+
+        The new instance is created and initialized while the old one keeps
+        serving, so a plugin that fails to reload is left as it was and the
+        error is raised. Once swapped in, new executions use the new
+        instance; executions already running finish on the old one, whose
+        ``on_unload`` and ``cleanup`` run once they have, or after
+        ``drain_timeout`` seconds. Subcommands the plugin no longer adds are
+        removed from the parser, its worker processes are replaced and its
+        earlier results are no longer served from the cache. Shared
+        resources are kept for the new instance.
+
+        Returns:
+            Plugin: The new instance.
+
+        Raises:
+            PluginError: If the plugin is not loaded or comes from an entry
+                point, which is reloaded by reinstalling its distribution.
+            PluginLoadError: If the new code fails to load.
+        """
+        # Same order as a dispatch that loads a lazy subcommand.
+        with self.parser._dispatch_lock, self._load_lock:
+            old = self.plugins.get(name)
+            if old is None:
+                raise PluginError(name, f"Plugin '{name}' is not loaded")
+            if isinstance(old, LazyPlugin):
+                source, entry_point = old.source, old.version is not None
+            else:
+                source, entry_point = self.plugin_sources[name]
+            if entry_point:
+                raise PluginError(name, "Entry point plugins cannot be reloaded")
+            subcommands = dict(self.parser.subcommands)
+            aliases = dict(self.parser.subcommand_aliases)
+            owners = dict(self.command_plugins)
+            try:
+                instance = self._activate(
+                    source,
+                    self._create_plugin(source),
+                    lazy=self.manifest is not None,
+                )
+            except Exception as e:
+                # Put back the parser and the plugin as they were.
+                self.parser.subcommands.clear()
+                self.parser.subcommands.update(subcommands)
+                self.parser.subcommand_aliases.clear()
+                self.parser.subcommand_aliases.update(aliases)
+                self.parser._invalidate_command_tree()
+                self.command_plugins = owners
+                self._publish(name, old)
+                self.plugin_sources[name] = (source, entry_point)
+                raise PluginLoadError(name, f"Error reloading plugin: {str(e)}")
+            self._refresh_subcommands(name, subcommands)
+            self._limiters.pop(name, None)
+            # Keyed on the file's content rather than a count of reloads, so
+            # a persistent cache shared by several processes never serves a
+            # result computed by different code under the same key.
+            self._revisions[name] = _hash_file(source)[:16]
+            pool = self._process_pools.pop(name, None)
+            running = [t for t in list(self._active_tokens) if t.name == name]
+        self._retire(name, old, running, pool, drain_timeout)
+        self.logger.info(f"Reloaded plugin: {name}")
+        return instance
+
+    def _refresh_subcommands(self, name: str, previous: Dict[str, Any]) -> None:
+        """Drop what a reloaded plugin registered before and no longer does."""
+        stale = []
+        for command, subcommand in previous.items():
+            if self.command_plugins.get(command) != name:
+                continue
+            current = self.parser.subcommands.get(command)
+            if current is subcommand:
+                stale.append(command)
+                del self.parser.subcommands[command]
+            kept = current.aliases if current is not subcommand else []
+            for alias in subcommand.aliases:
+                if alias not in kept and (
+                    self.parser.subcommand_aliases.get(alias) == command
+                ):
+                    del self.parser.subcommand_aliases[alias]
+        if stale:
+            self.command_plugins = {
+                command: owner
+                for command, owner in self.command_plugins.items()
+                if command not in stale
+            }
+        self.parser._invalidate_command_tree()
+
+    def _retire(
+        self,
+        name: str,
+        plugin: Union[Plugin, LazyPlugin],
+        running: List[CancellationToken],
+        pool: Optional[ProcessBackend],
+        drain_timeout: Optional[float],
+    ) -> None:
+        """Clean up a removed instance once its executions have finished."""
+        current = current_token()
+        deadline = None if drain_timeout is None else time.monotonic() + drain_timeout
+        for token in running:
+            if token is current:
+                continue
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if not token.wait_finished(remaining):
+                self.logger.warning(
+                    f"Plugin '{name}' still has executions running after "
+                    f"{drain_timeout}s; cleaning up the old instance anyway"
+                )
+                break
+        if pool is not None:
+            pool.shutdown()
+        if not isinstance(plugin, LazyPlugin):
+            plugin.on_unload()
+            plugin.cleanup()
+
+    def watch_plugins(self, interval: float = 1.0) -> PluginWatcher:
+        """
+        Reload plugins whose files change, from a background thread.
+
+        See :class:`argonaut.plugin_watcher.PluginWatcher`.
+        """
+        with self._load_lock:
+            if self._watcher is None:
+                self._watcher = PluginWatcher(self, interval).start()
+            return self._watcher
+
+    def stop_watching(self) -> None:
+        with self._load_lock:
+            watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.stop()
+
+    def register_hook(
+        self,
+        hook_name: str,
+        callback: Callable,
+        priority: int = 0,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Subscribe to an event the manager fires around every plugin execution.
+
+        ``"before_execute"`` is called with ``(name, args)``,
+        ``"after_execute"`` with ``(name, args, result, duration)`` and
+        ``"execution_error"`` with ``(name, args, error, duration)``. A
+        failing callback is logged and does not affect the execution.
+        Priorities and timeouts work as in :meth:`PluginHook.register`.
+        """
+        if hook_name not in self.hooks:
+            self.hooks[hook_name] = PluginHook(
+                hook_name, collect_errors=True, loop_runner=self.loop_runner
             )
+        self.hooks[hook_name].register(callback, priority, timeout)
 
-            plugin_instance.on_load()
+    def unregister_hook(self, hook_name: str, callback: Callable) -> None:
+        if hook_name not in self.hooks:
+            raise ValueError(f"No hook named '{hook_name}'")
+        self.hooks[hook_name].unregister(callback)
 
-        except Exception as e:
-            raise PluginLoadError(module_path, f"Error loading plugin: {str(e)}")
+    def _fire(self, hook_name: str, *args, traced: bool = False) -> None:
+        self._observe(hook_name, args, traced)
+        hook = self.hooks.get(hook_name)
+        if hook is not None and hook._entries:
+            started = time.perf_counter()
+            with self.parser.tracer.span(f"hook: {hook_name}", plugin=args[0]):
+                results = hook.execute(*args)
+            self.metrics.observe_hook(args[0], hook_name, time.perf_counter() - started)
+            self._log_hook_errors(hook_name, results)
 
-    def _install_dependencies(self, plugin: Plugin):
-        required_deps = plugin.required_dependencies + plugin.dependencies
-        if required_deps:
-            self.logger.info(
-                f"Installing dependencies for plugin: {plugin.metadata.name}"
+    async def _fire_async(self, hook_name: str, *args, traced: bool = False) -> None:
+        self._observe(hook_name, args, traced)
+        hook = self.hooks.get(hook_name)
+        if hook is not None and hook._entries:
+            started = time.perf_counter()
+            with self.parser.tracer.span(f"hook: {hook_name}", plugin=args[0]):
+                results = await hook.execute_async(*args)
+            self.metrics.observe_hook(args[0], hook_name, time.perf_counter() - started)
+            self._log_hook_errors(hook_name, results)
+
+    def _observe(self, hook_name: str, args: tuple, traced: bool) -> None:
+        """
+        Record an execution in the metrics as its end is announced, and as a
+        span unless it was ``traced`` by a span of its own already. Streams
+        and map items only get the latter, since a span cannot stay open
+        across the yields of a generator.
+        """
+        if hook_name == "after_execute":
+            name, _, _, duration = args
+            error = None
+        elif hook_name == "execution_error":
+            name, _, error, duration = args
+        else:
+            return
+        self.metrics.observe_call(name, duration, error)
+        if not traced:
+            self.parser.tracer.record(f"plugin execute: {name}", duration, error)
+
+    def _log_hook_errors(self, hook_name: str, results: List[HookResult]) -> None:
+        for result in results:
+            if not result.ok:
+                self.logger.warning(
+                    f"Hook '{hook_name}' callback {result.callback!r} failed: "
+                    f"{result.error!r}"
+                )
+
+    def execute_plugin(
+        self,
+        name: str,
+        args: Dict[str, Any],
+        backend: Optional[str] = None,
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Execute a plugin.
+
+        Args:
+            name (str): The name of the plugin.
+            args (Dict[str, Any]): The arguments passed to ``execute``.
+            backend (Optional[str]): ``"inline"``, ``"thread"`` or
+                ``"process"``. Defaults to the plugin's ``execution_backend``.
+            block (Optional[bool]): Whether to wait when the plugin or the
+                manager is at its concurrency or rate limit, or to fail at
+                once with :class:`RateLimitError`. Defaults to the limit's
+                own ``block`` setting.
+            timeout (Optional[float]): Seconds to wait for the result.
+                Defaults to the plugin's ``execution_timeout``. On timeout the
+                execution's cancellation token is cancelled, and process
+                workers are killed and replaced.
+
+        Raises:
+            RateLimitError: If a limit is reached and the call does not wait.
+            PluginTimeoutError: If the execution runs past its timeout.
+            PluginExecutionError: If the plugin fails.
+        """
+        plugin, token = self._checkout(name)
+        try:
+            backend = self._get_backend(plugin, backend)
+            if timeout is None:
+                timeout = plugin.execution_timeout
+            self._fire("before_execute", name, args)
+            started = time.perf_counter()
+            try:
+                with self.parser.tracer.span(f"plugin execute: {name}"):
+                    plugin.on_command_execution(name)
+                    run = partial(
+                        self._run, name, plugin, args, backend, block, timeout, token
+                    )
+                    cache = self._cache_entry(name, plugin, args)
+                    if cache is None:
+                        result = run()
+                    else:
+                        result = self.result_cache.get_or_compute(
+                            name, *cache, run, timeout
+                        )
+            except Exception as e:
+                self._fire(
+                    "execution_error",
+                    name,
+                    args,
+                    e,
+                    time.perf_counter() - started,
+                    traced=True,
+                )
+                if isinstance(e, _PASSED_THROUGH):
+                    raise
+                raise PluginExecutionError(name, f"Error executing plugin: {str(e)}")
+            self._fire(
+                "after_execute",
+                name,
+                args,
+                result,
+                time.perf_counter() - started,
+                traced=True,
             )
-            for dep in required_deps:
-                try:
-                    subprocess.check_call([sys.executable, "-m", "pip", "install", dep])
-                except subprocess.CalledProcessError:
-                    raise PluginError(
-                        plugin.metadata.name, f"Failed to install dependency: {dep}"
+            return result
+        finally:
+            self._release(token)
+
+    async def execute_plugin_async(
+        self,
+        name: str,
+        args: Dict[str, Any],
+        backend: Optional[str] = None,
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        plugin, token = await self._checkout_async(name)
+        try:
+            backend = self._get_backend(plugin, backend)
+            if timeout is None:
+                timeout = plugin.execution_timeout
+            await self._fire_async("before_execute", name, args)
+            started = time.perf_counter()
+            try:
+                with self.parser.tracer.span(f"plugin execute: {name}"):
+                    await plugin.on_command_execution_async(name)
+                    if backend == "inline" and not asyncio.iscoroutinefunction(
+                        getattr(plugin, "execute_async", None)
+                    ):
+                        self.logger.warning(
+                            f"Plugin '{name}' does not have an async execute method. Falling back to sync execution."
+                        )
+                    run = partial(
+                        self._run_async,
+                        name,
+                        plugin,
+                        args,
+                        backend,
+                        block,
+                        timeout,
+                        token,
                     )
+                    cache = self._cache_entry(name, plugin, args)
+                    if cache is None:
+                        result = await run()
+                    else:
+                        result = await self.result_cache.get_or_compute_async(
+                            name, *cache, run, timeout
+                        )
+            except Exception as e:
+                await self._fire_async(
+                    "execution_error",
+                    name,
+                    args,
+                    e,
+                    time.perf_counter() - started,
+                    traced=True,
+                )
+                if isinstance(e, _PASSED_THROUGH):
+                    raise
+                raise PluginExecutionError(
+                    name, f"Error executing plugin asynchronously: {str(e)}"
+                )
+            await self._fire_async(
+                "after_execute",
+                name,
+                args,
+                result,
+                time.perf_counter() - started,
+                traced=True,
+            )
+            return result
+        finally:
+            self._release(token)
 
-    def unload_plugin(self, name: str) -> None:
-        if name not in self.plugins:
-            raise PluginError(f"Plugin '{name}' is not loaded")
-        plugin = self.plugins[name]
-        plugin.on_unload()
-        plugin.cleanup()
-        del self.plugins[name]
-        self.logger.info(f"Unloaded plugin: {name}")
+    def _run(
+        self,
+        name: str,
+        plugin: Plugin,
+        args: Dict[str, Any],
+        backend: str,
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        token: Optional[CancellationToken] = None,
+    ) -> Any:
+        limiters = self._get_limiters(name, plugin)
+        acquired = []
+        # Map items run with a token of their own; other executions pass the
+        # one they were checked out with, which they discard themselves.
+        owned = token is None
+        if owned:
+            token = CancellationToken(name)
+            self._active_tokens.add(token)
+        try:
+            for limiter in limiters:
+                limiter.acquire(block)
+                acquired.append(limiter)
+            if backend == "inline" and timeout is None:
+                return run_with_token(token, plugin.execute, args)
+            future = self._submit(name, plugin, args, backend, token)
+            try:
+                return future.result(timeout)
+            except FutureTimeoutError:
+                if future.done():
+                    raise
+                self._abandon(name, backend, future, token, "timed out")
+                raise PluginTimeoutError(name, timeout)
+        finally:
+            if owned:
+                self._release(token)
+            for limiter in reversed(acquired):
+                limiter.release()
 
-    def execute_plugin(self, name: str, args: Dict[str, Any]) -> Any:
-        if name not in self.plugins:
-            raise PluginError(name, f"Plugin '{name}' not found")
-        plugin = self.plugins[name]
+    async def _run_async(
+        self,
+        name: str,
+        plugin: Plugin,
+        args: Dict[str, Any],
+        backend: str,
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        token: Optional[CancellationToken] = None,
+    ) -> Any:
+        limiters = self._get_limiters(name, plugin)
+        acquired = []
+        owned = token is None
+        if owned:
+            token = CancellationToken(name)
+            self._active_tokens.add(token)
         try:
-            plugin.on_command_execution(name)
-            return plugin.execute(args)
-        except Exception as e:
-            raise PluginExecutionError(name, f"Error executing plugin: {str(e)}")
+            for limiter in limiters:
+                await limiter.acquire_async(block)
+                acquired.append(limiter)
+            future = None
+            if backend != "inline":
+                future = self._submit(name, plugin, args, backend, token)
+                task = asyncio.wrap_future(future)
+            elif asyncio.iscoroutinefunction(getattr(plugin, "execute_async", None)):
+                task = asyncio.ensure_future(
+                    run_with_token_async(token, plugin.execute_async, args)
+                )
+            else:
+                task = asyncio.ensure_future(
+                    asyncio.to_thread(run_with_token, token, plugin.execute, args)
+                )
+            try:
+                done, _ = await asyncio.wait({task}, timeout=timeout)
+            except asyncio.CancelledError:
+                self._abandon(name, backend, future, token, "cancelled")
+                task.cancel()
+                raise
+            if not done:
+                self._abandon(name, backend, future, token, "timed out")
+                task.cancel()
+                raise PluginTimeoutError(name, timeout)
+            return task.result()
+        finally:
+            if owned:
+                self._release(token)
+            for limiter in reversed(acquired):
+                limiter.release()
 
-    async def execute_plugin_async(self, name: str, args: Dict[str, Any]) -> Any:
-        if name not in self.plugins:
-            raise PluginError(name, f"Plugin '{name}' not found")
-        plugin = self.plugins[name]
+    def _abandon(
+        self,
+        name: str,
+        backend: str,
+        future: Optional[Future],
+        token: CancellationToken,
+        reason: str,
+    ) -> None:
+        """Stop waiting on an execution and make sure it stops too."""
+        token.cancel(reason)
+        if future is None or future.done():
+            return
+        future.cancel()
+        pool = self._process_pools.get(name) if backend == "process" else None
+        if pool is not None:
+            self.logger.warning(
+                f"Replacing the worker processes of plugin '{name}': "
+                f"an execution {reason}"
+            )
+            pool.kill()
+
+    def set_limits(
+        self,
+        name: Optional[str] = None,
+        max_concurrent: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Limit how many executions of a plugin run at once and how many start
+        per second. Without a ``name``, the limits apply to all plugins
+        together, on top of each plugin's own limits.
+
+        A plugin's limits can also come from the ``limits`` mapping in its
+        config, with the same keys. Limits set here take precedence.
+        """
+        limiter = ExecutionLimiter(max_concurrent, rate, burst, block, timeout)
+        if name is None:
+            self.limits = limiter
+        else:
+            self._limiters[name] = limiter
+
+    def _get_limiters(self, name: str, plugin: Plugin) -> List[ExecutionLimiter]:
+        # Read once, as an unload or reload may drop the entry at any time.
+        limiter = self._limiters.get(name, False)
+        if limiter is False:
+            with self._load_lock:
+                limiter = self._limiters.get(name, False)
+                if limiter is False:
+                    config = (plugin.config or {}).get("limits")
+                    limiter = self._limiters[name] = (
+                        ExecutionLimiter.from_config(config) if config else None
+                    )
+        limiters = []
+        if limiter is not None:
+            limiters.append(limiter)
+        if self.limits is not None:
+            limiters.append(self.limits)
+        return limiters
+
+    def _cache_entry(
+        self, name: str, plugin: Plugin, args: Dict[str, Any]
+    ) -> Optional[Tuple[str, float]]:
+        """Return the cache key and TTL of a call, or None if it is not cached."""
+        ttl = plugin.cache_ttl
+        if ttl is None:
+            return None
+        key = plugin.cache_key(args)
+        if key is None:
+            return None
+        version = plugin.metadata.version
+        if name in self._revisions:
+            version = f"{version}+{self._revisions[name]}"
+        return ResultCache.make_key(name, version, key), ttl
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return what each plugin has cost so far: its load and initialize
+        times, its number of executions and errors (by exception type), its
+        execution latency (mean, estimated p50/p95/p99, max) and the time
+        spent in each of its hooks.
+        """
+        return self.metrics.stats()
+
+    def write_metrics(self, path: Union[str, Path]) -> None:
+        """
+        Write the metrics to ``path`` in the Prometheus text format, for the
+        node exporter's textfile collector. The file is replaced atomically.
+        """
+        self.metrics.write_prometheus(path)
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the result cache hits, misses and coalesced calls per plugin."""
+        return {
+            name: stats.as_dict() for name, stats in self.result_cache.stats.items()
+        }
+
+    def execute_stream(
+        self,
+        name: str,
+        args: Dict[str, Any],
+        sink: Optional[Any] = None,
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ) -> Union[Iterator[Any], int]:
+        """
+        Execute a plugin's :meth:`Plugin.execute_stream` and pass its results
+        on as they are produced.
+
+        The plugin runs in the caller's thread, one item ahead of the
+        consumer, so the first result is available as soon as the plugin
+        yields it and memory stays flat however many results there are.
+        Closing the returned iterator early cancels the execution's token and
+        closes the plugin's generator. Hooks fire once per stream, with the
+        number of items as the result. Results are never cached.
+
+        Args:
+            name (str): The name of the plugin.
+            args (Dict[str, Any]): The arguments passed to ``execute_stream``.
+            sink (Optional[Any]): A callable, or a file-like object written
+                one line per item, that receives every result. Without it,
+                an iterator over the results is returned.
+            block (Optional[bool]): As in :meth:`execute_plugin`.
+            timeout (Optional[float]): Seconds the whole stream may take,
+                checked between items. Defaults to the plugin's
+                ``execution_timeout``.
+
+        Returns:
+            Union[Iterator[Any], int]: The results, or their number when they
+            went to ``sink``.
+        """
+        plugin = self._get_plugin(name)
+        if timeout is None:
+            timeout = plugin.execution_timeout
+        stream = self._stream(name, args, block, timeout)
+        if sink is None:
+            return stream
+        write = self._get_sink(sink)
+        count = 0
+        for item in stream:
+            write(item)
+            count += 1
+        return count
+
+    def _stream(
+        self,
+        name: str,
+        args: Dict[str, Any],
+        block: Optional[bool],
+        timeout: Optional[float],
+    ) -> Iterator[Any]:
+        # Checked out when the stream starts, not when it is created, since
+        # a generator that never starts never runs its finally clause.
+        plugin, token = self._checkout(name)
+        acquired = []
+        iterator = None
+        count = 0
+        end = object()
+        try:
+            limiters = self._get_limiters(name, plugin)
+            self._fire("before_execute", name, args)
+            started = time.perf_counter()
+            deadline = None if timeout is None else started + timeout
+            try:
+                for limiter in limiters:
+                    limiter.acquire(block)
+                    acquired.append(limiter)
+                plugin.on_command_execution(name)
+                iterator = plugin.execute_stream(args)
+                while True:
+                    item = run_with_token(token, next, iterator, end)
+                    if item is end:
+                        break
+                    if deadline is not None and time.perf_counter() > deadline:
+                        token.cancel("timed out")
+                        raise PluginTimeoutError(name, timeout)
+                    count += 1
+                    yield item
+            except GeneratorExit:
+                token.cancel("closed")
+                raise
+            except Exception as e:
+                self._fire(
+                    "execution_error", name, args, e, time.perf_counter() - started
+                )
+                if isinstance(e, _PASSED_THROUGH):
+                    raise
+                raise PluginExecutionError(name, f"Error executing plugin: {str(e)}")
+            self._fire(
+                "after_execute", name, args, count, time.perf_counter() - started
+            )
+        finally:
+            if iterator is not None and hasattr(iterator, "close"):
+                run_with_token(token, iterator.close)
+            self._release(token)
+            for limiter in reversed(acquired):
+                limiter.release()
+
+    def execute_stream_async(
+        self,
+        name: str,
+        args: Dict[str, Any],
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        Asynchronous version of :meth:`execute_stream`, consumed with
+        ``async for``. It runs the plugin's ``execute_stream_async``, and
+        the timeout also interrupts an item that takes too long.
+        """
+        return self._stream_async(name, args, block, timeout)
+
+    async def _stream_async(
+        self,
+        name: str,
+        args: Dict[str, Any],
+        block: Optional[bool],
+        timeout: Optional[float],
+    ) -> AsyncIterator[Any]:
+        plugin, token = await self._checkout_async(name)
+        acquired = []
+        iterator = None
+        count = 0
         try:
-            await plugin.on_command_execution_async(name)
-            if hasattr(plugin, "execute_async") and asyncio.iscoroutinefunction(
-                plugin.execute_async
+            if timeout is None:
+                timeout = plugin.execution_timeout
+            limiters = self._get_limiters(name, plugin)
+            await self._fire_async("before_execute", name, args)
+            started = time.perf_counter()
+            try:
+                for limiter in limiters:
+                    await limiter.acquire_async(block)
+                    acquired.append(limiter)
+                await plugin.on_command_execution_async(name)
+                # Async generators run in the context of whoever awaits them,
+                # so the token is set around every step rather than once.
+                iterator = plugin.execute_stream_async(args).__aiter__()
+                while True:
+                    remaining = None
+                    if timeout is not None:
+                        remaining = max(0.0, started + timeout - time.perf_counter())
+                    try:
+                        item = await asyncio.wait_for(
+                            run_with_token_async(token, iterator.__anext__), remaining
+                        )
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        token.cancel("timed out")
+                        raise PluginTimeoutError(name, timeout)
+                    count += 1
+                    yield item
+            except (GeneratorExit, asyncio.CancelledError):
+                token.cancel("closed")
+                raise
+            except Exception as e:
+                await self._fire_async(
+                    "execution_error", name, args, e, time.perf_counter() - started
+                )
+                if isinstance(e, _PASSED_THROUGH):
+                    raise
+                raise PluginExecutionError(
+                    name, f"Error executing plugin asynchronously: {str(e)}"
+                )
+            await self._fire_async(
+                "after_execute", name, args, count, time.perf_counter() - started
+            )
+        finally:
+            if iterator is not None and hasattr(iterator, "aclose"):
+                await iterator.aclose()
+            self._release(token)
+            for limiter in reversed(acquired):
+                limiter.release()
+
+    @staticmethod
+    def _get_sink(sink: Any) -> Callable[[Any], Any]:
+        if callable(sink):
+            return sink
+        if hasattr(sink, "write"):
+
+            def write(item: Any) -> None:
+                sink.write(f"{item}\n")
+                if hasattr(sink, "flush"):
+                    sink.flush()
+
+            return write
+        raise TypeError("sink must be callable or have a write method")
+
+    def map_plugin(
+        self,
+        name: str,
+        args_iterable: Iterable[Dict[str, Any]],
+        concurrency: int = 8,
+        backend: Optional[str] = None,
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[MapResult]:
+        """
+        Run a plugin over many argument sets with bounded concurrency.
+
+        At most ``concurrency`` items are in flight at once, and the input is
+        consumed lazily, so memory stays flat however long it is. Results
+        are yielded as they complete, not in input order; each carries its
+        input ``index``. A failing item does not stop the others: its
+        exception is returned in :attr:`MapResult.error`. Closing the
+        iterator early cancels the items that have not started.
+
+        Args:
+            name (str): The name of the plugin.
+            args_iterable (Iterable[Dict[str, Any]]): One argument set per item.
+            concurrency (int): The maximum number of items in flight.
+            backend (Optional[str]): The execution backend. The inline backend
+                runs items on a thread pool of ``concurrency`` threads.
+            block (Optional[bool]): Whether items wait for the plugin's
+                limits, as in :meth:`execute_plugin`. An item that does not
+                wait fails with :class:`RateLimitError` in its result.
+            timeout (Optional[float]): Seconds each item may run, defaulting
+                to the plugin's ``execution_timeout``. An item that runs
+                longer fails with :class:`PluginTimeoutError` and frees its
+                slot for the next item.
+
+        Returns:
+            Iterator[MapResult]: One result per item, in completion order.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        plugin = self._get_plugin(name)
+        backend = self._get_backend(plugin, backend)
+        if timeout is None:
+            timeout = plugin.execution_timeout
+        plugin.on_command_execution(name)
+        return self._map(name, args_iterable, concurrency, backend, block, timeout)
+
+    def _map(
+        self,
+        name: str,
+        args_iterable: Iterable[Dict[str, Any]],
+        concurrency: int,
+        backend: str,
+        block: Optional[bool],
+        timeout: Optional[float],
+    ) -> Iterator[MapResult]:
+        # The whole map counts as one execution in flight, and each item as
+        # another while it runs.
+        plugin, lease = self._checkout(name)
+        pool = None
+        pending: Dict[Future, Tuple[int, Dict[str, Any], float]] = {}
+
+        def collect() -> Iterator[MapResult]:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, args, started = pending.pop(future)
+                duration = time.perf_counter() - started
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self._fire("execution_error", name, args, e, duration)
+                    yield MapResult(index, args, error=e)
+                else:
+                    self._fire("after_execute", name, args, result, duration)
+                    yield MapResult(index, args, result)
+
+        try:
+            # Items wait for limits and timeouts in a thread of their own, so
+            # such items always go through the pool, whatever the backend.
+            limited = bool(self._get_limiters(name, plugin)) or timeout is not None
+            if backend == "inline" or limited:
+                pool = ThreadPoolExecutor(concurrency)
+            for index, args in enumerate(args_iterable):
+                while len(pending) >= concurrency:
+                    yield from collect()
+                self._fire("before_execute", name, args)
+                if pool is not None:
+                    future = pool.submit(
+                        self._run, name, plugin, args, backend, block, timeout
+                    )
+                else:
+                    future = self._submit_counted(name, plugin, args, backend)
+                pending[future] = (index, args, time.perf_counter())
+            while pending:
+                yield from collect()
+        finally:
+            for future in pending:
+                future.cancel()
+            if pool is not None:
+                pool.shutdown(wait=False)
+            self._release(lease)
+
+    def map_plugin_async(
+        self,
+        name: str,
+        args_iterable: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        concurrency: int = 8,
+        backend: Optional[str] = None,
+        block: Optional[bool] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[MapResult]:
+        """
+        Asynchronous version of :meth:`map_plugin`.
+
+        Accepts a regular or an asynchronous iterable and is consumed with
+        ``async for``. With the inline backend, items run through the
+        plugin's ``execute_async`` when it has one.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        return self._map_async(
+            name, args_iterable, concurrency, backend, block, timeout
+        )
+
+    async def _map_async(
+        self,
+        name: str,
+        args_iterable: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        concurrency: int,
+        backend: Optional[str],
+        block: Optional[bool],
+        timeout: Optional[float],
+    ) -> AsyncIterator[MapResult]:
+        plugin, lease = await self._checkout_async(name)
+        try:
+            async for result in self._map_checked_out(
+                name, plugin, args_iterable, concurrency, backend, block, timeout
             ):
-                return await plugin.execute_async(args)
+                yield result
+        finally:
+            self._release(lease)
+
+    async def _map_checked_out(
+        self,
+        name: str,
+        plugin: Plugin,
+        args_iterable: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        concurrency: int,
+        backend: Optional[str],
+        block: Optional[bool],
+        timeout: Optional[float],
+    ) -> AsyncIterator[MapResult]:
+        backend = self._get_backend(plugin, backend)
+        if timeout is None:
+            timeout = plugin.execution_timeout
+        await plugin.on_command_execution_async(name)
+        run = partial(
+            self._run_async,
+            name,
+            plugin,
+            backend=backend,
+            block=block,
+            timeout=timeout,
+        )
+
+        async def iterate() -> AsyncIterator[Dict[str, Any]]:
+            if hasattr(args_iterable, "__aiter__"):
+                async for args in args_iterable:
+                    yield args
             else:
-                self.logger.warning(
-                    f"Plugin '{name}' does not have an async execute method. Falling back to sync execution."
-                )
-                return await asyncio.to_thread(plugin.execute, args)
-        except Exception as e:
-            raise PluginExecutionError(
-                name, f"Error executing plugin asynchronously: {str(e)}"
+                for args in args_iterable:
+                    yield args
+
+        pending: Dict[asyncio.Future, Tuple[int, Dict[str, Any], float]] = {}
+
+        async def collect() -> List[MapResult]:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            results = []
+            for task in done:
+                index, args, started = pending.pop(task)
+                duration = time.perf_counter() - started
+                try:
+                    result = task.result()
+                except Exception as e:
+                    await self._fire_async("execution_error", name, args, e, duration)
+                    results.append(MapResult(index, args, error=e))
+                else:
+                    await self._fire_async(
+                        "after_execute", name, args, result, duration
+                    )
+                    results.append(MapResult(index, args, result))
+            return results
+
+        try:
+            index = 0
+            async for args in iterate():
+                while len(pending) >= concurrency:
+                    for result in await collect():
+                        yield result
+                await self._fire_async("before_execute", name, args)
+                task = asyncio.ensure_future(run(args))
+                pending[task] = (index, args, time.perf_counter())
+                index += 1
+            while pending:
+                for result in await collect():
+                    yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def pipeline(self, *names: str, buffer: int = 16) -> Pipeline:
+        """
+        Chain plugins so each consumes the results of the one before it.
+
+        Stages can be given here by name, with default options, or added
+        with :meth:`Pipeline.stage`::
+
+            manager.pipeline(buffer=32).stage("scrape", backend="async").stage(
+                "analyze", backend="process", concurrency=4
+            ).run({"url": url}, sink=print)
+
+        See :class:`argonaut.pipeline.Pipeline`.
+        """
+        pipeline = Pipeline(self, buffer)
+        for name in names:
+            pipeline.stage(name)
+        return pipeline
+
+    def _get_backend(self, plugin: Plugin, backend: Optional[str]) -> str:
+        backend = backend or plugin.execution_backend
+        if backend not in EXECUTION_BACKENDS:
+            raise PluginError(
+                plugin.metadata.name,
+                f"Unknown execution backend '{backend}', "
+                f"expected one of {EXECUTION_BACKENDS}",
             )
+        return backend
+
+    def _submit_counted(
+        self, name: str, plugin: Plugin, args: Dict[str, Any], backend: str
+    ) -> Future:
+        """Submit an execution that counts as in flight until it is done."""
+        token = CancellationToken(name)
+        self._active_tokens.add(token)
+        try:
+            future = self._submit(name, plugin, args, backend, token)
+        except BaseException:
+            self._release(token)
+            raise
+        future.add_done_callback(lambda _: self._release(token))
+        return future
+
+    def _submit(
+        self,
+        name: str,
+        plugin: Plugin,
+        args: Dict[str, Any],
+        backend: str,
+        token: Optional[CancellationToken] = None,
+    ) -> Future:
+        token = token or CancellationToken(name)
+        if backend == "inline":
+            # Inline executions with a timeout get a thread of their own, so
+            # one that never returns does not hold a pool thread forever.
+            future: Future = Future()
+
+            def target() -> None:
+                if not future.set_running_or_notify_cancel():
+                    return
+                try:
+                    future.set_result(run_with_token(token, plugin.execute, args))
+                except BaseException as e:
+                    future.set_exception(e)
+
+            threading.Thread(
+                target=target, name=f"argonaut-plugin-{name}", daemon=True
+            ).start()
+            return future
+
+        if backend == "thread":
+            if self._thread_pool is None:
+                with self._load_lock:
+                    if self._thread_pool is None:
+                        self._thread_pool = ThreadPoolExecutor(
+                            self.max_workers, thread_name_prefix="argonaut-plugin"
+                        )
+            return self._thread_pool.submit(run_with_token, token, plugin.execute, args)
+
+        pool = self._process_pools.get(name)
+        if pool is None:
+            with self._load_lock:
+                pool = self._process_pools.get(name)
+                if pool is None:
+                    if name not in self.plugin_sources:
+                        raise PluginError(
+                            name, "Plugin has no source to load in a worker process"
+                        )
+                    source, entry_point = self.plugin_sources[name]
+                    pool = ProcessBackend(
+                        name, source, entry_point, self.max_workers, plugin.idempotent
+                    )
+                    self._process_pools[name] = pool
+        return pool.submit(args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Cancel the running executions' tokens, then stop the thread pool,
+        every plugin's worker processes and the shared event loop, closing
+        the shared resources first.
+        """
+        self.stop_watching()
+        for token in list(self._active_tokens):
+            token.cancel("shutting down")
+        with self._load_lock:
+            pools, self._process_pools = list(self._process_pools.values()), {}
+            thread_pool, self._thread_pool = self._thread_pool, None
+        for pool in pools:
+            pool.shutdown(wait)
+        if thread_pool is not None:
+            thread_pool.shutdown(wait)
+        self.resources.close_all()
+        self.loop_runner.close()
 
     def _find_plugin_class(self, module) -> Type[Plugin]:
         for name, obj in inspect.getmembers(module, inspect.isclass):
@@ -278,23 +2250,26 @@ class PluginManager:
                 return obj
         return None
 
+    def _describe(self, plugin: Union[Plugin, LazyPlugin]) -> Dict[str, Any]:
+        return {
+            "name": plugin.metadata.name,
+            "version": plugin.metadata.version,
+            "description": plugin.metadata.description,
+            "author": plugin.metadata.author,
+            "website": plugin.metadata.website,
+            "tags": plugin.metadata.tags,
+        }
+
     def list_plugins(self) -> List[Dict[str, Any]]:
         return [
-            {
-                "name": plugin.metadata.name,
-                "version": plugin.metadata.version,
-                "description": plugin.metadata.description,
-                "author": plugin.metadata.author,
-                "website": plugin.metadata.website,
-                "tags": plugin.metadata.tags,
-            }
+            self._describe(plugin)
             for plugin in self.plugins.values()
-            if isinstance(plugin, Plugin)
+            if isinstance(plugin, (Plugin, LazyPlugin))
         ]
 
-    def get_plugins_by_tag(self, tag: str) -> List[Plugin]:
+    def get_plugins_by_tag(self, tag: str) -> List[Union[Plugin, LazyPlugin]]:
         return [
             plugin
             for plugin in self.plugins.values()
-            if isinstance(plugin, Plugin) and tag in plugin.metadata.tags
+            if isinstance(plugin, (Plugin, LazyPlugin)) and tag in plugin.metadata.tags
         ]
@@ -0,0 +1,130 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional, TextIO
+
+from .tracing import Span, Tracer
+
+
+class Profiler:
+    """
+    Breaks the time of one invocation down by phase.
+
+    Every span of the parser's :class:`Tracer` that does not contain other
+    spans is a phase: each step of :meth:`Argonaut.parse`, and loading,
+    initializing, executing and the hooks of each plugin. Spans such as
+    ``parse`` and ``dispatch`` are left out, since their phases already
+    count their time. Phases that run more than once, or on several threads
+    at once, are summed, so the total can exceed the wall-clock time.
+    Optionally, a cProfile of the whole invocation is written to a
+    ``.pstats`` file and the lines that allocated the most memory are
+    listed.
+
+    Started by the ``--profile`` global argument that
+    :meth:`Argonaut.enable_profiling` adds. Those two options have no flags
+    of their own: they are read from ``ARGONAUT_PROFILE_OUTPUT`` (the
+    ``.pstats`` path) and ``ARGONAUT_PROFILE_MEMORY`` (how many allocation
+    sites to list), as the flag's help says.
+    """
+
+    def __init__(self, tracer: Optional[Tracer] = None):
+        self.tracer = tracer or Tracer()
+        self.active = False
+        self.phases: Dict[str, List[float]] = {}
+        self.pstats_path: Optional[str] = None
+        self.memory_top = 0
+        self._started = 0.0
+        self._wall = 0.0
+        self._profile: Optional[cProfile.Profile] = None
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        pstats_path: Optional[str] = None,
+        memory_top: int = 0,
+        since: Optional[float] = None,
+    ) -> None:
+        """
+        Start profiling. ``since`` is the ``time.perf_counter()`` the wall
+        clock is measured from, when phases that already ran are recorded.
+        """
+        if self.active:
+            return
+        self.phases = {}
+        self.pstats_path = pstats_path
+        self.memory_top = memory_top
+        if memory_top and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if pstats_path:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._started = time.perf_counter() if since is None else since
+        self.active = True
+        self.tracer.add_listener(self.record)
+
+    def start_from_env(self, since: Optional[float] = None) -> None:
+        memory_top = os.environ.get("ARGONAUT_PROFILE_MEMORY", "")
+        self.start(
+            os.environ.get("ARGONAUT_PROFILE_OUTPUT") or None,
+            int(memory_top) if memory_top.isdigit() else 0,
+            since,
+        )
+
+    def stop(self) -> None:
+        if not self.active:
+            return
+        self.active = False
+        self.tracer.remove_listener(self.record)
+        self._wall = time.perf_counter() - self._started
+        if self._profile is not None:
+            self._profile.disable()
+
+    def record(self, span: Span) -> None:
+        if not self.active or span.has_children:
+            return
+        seconds = span.seconds
+        with self._lock:
+            totals = self.phases.get(span.name)
+            if totals is None:
+                self.phases[span.name] = [1, seconds]
+            else:
+                totals[0] += 1
+                totals[1] += seconds
+
+    def report(self) -> str:
+        """Stop profiling and return the breakdown table."""
+        self.stop()
+        wall = self._wall or 1e-9
+        width = max([len(name) for name in self.phases] + [len("Phase")])
+        lines = [
+            f"{'Phase':<{width}}  {'Calls':>6}  {'Total ms':>10}  {'% wall':>7}",
+            f"{'-' * width}  {'-' * 6}  {'-' * 10}  {'-' * 7}",
+        ]
+        for name, (calls, seconds) in self.phases.items():
+            lines.append(
+                f"{name:<{width}}  {calls:>6}  {seconds * 1000:>10.3f}  "
+                f"{seconds / wall * 100:>6.1f}%"
+            )
+        lines.append(f"{'wall clock':<{width}}  {'':>6}  {wall * 1000:>10.3f}")
+        if self.memory_top and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            lines.append(f"\nTop {self.memory_top} allocations:")
+            for stat in snapshot.statistics("lineno")[: self.memory_top]:
+                lines.append(f"  {stat}")
+        if self._profile is not None:
+            try:
+                self._profile.dump_stats(self.pstats_path)
+                lines.append(f"\ncProfile statistics written to {self.pstats_path}")
+            except OSError as e:
+                lines.append(f"\nCould not write {self.pstats_path}: {e}")
+            self._profile = None
+        return "\n".join(lines)
+
+    def print_report(self, file: Optional[TextIO] = None) -> None:
+        print(self.report(), file=file or sys.stderr)
@@ -0,0 +1,211 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import shlex
+import traceback
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+from .dynamic_completion import CompletionCache, filter_prefix, provider_spec
+from .exceptions import ArgonautError
+from .utils import PrefixIndex
+
+try:
+    import readline
+
+    has_readline = True
+except ImportError:
+    has_readline = False
+
+
+class ArgonautShell:
+    """
+    A persistent command shell on top of an Argonaut parser.
+
+    Each line is tokenized with :mod:`shlex` and handed to
+    :meth:`Argonaut.dispatch`, so the parser, its compiled command tree and
+    every loaded plugin stay warm between commands. TAB completes subcommand
+    names, aliases, options, option choices and completion provider values
+    for the command being typed, plus words from the shell history.
+
+    Attributes:
+        parser (Argonaut): The parser that dispatches each command line.
+        prompt (str): The input prompt.
+        history_file (Optional[Path]): Where history is kept between sessions.
+    """
+
+    exit_commands = ("exit", "quit")
+    help_commands = ("help", "?")
+
+    def __init__(
+        self,
+        parser: Any,
+        prompt: Optional[str] = None,
+        history_file: Optional[Union[str, Path]] = None,
+    ):
+        self.parser = parser
+        self.prompt = prompt or f"{parser.prog}> "
+        self.history_file: Optional[Path] = (
+            Path(history_file)
+            if history_file
+            else Path.home() / f".{parser.prog}_history"
+        )
+        self._matches: List[str] = []
+        self._indexes: Dict[Tuple[Any, ...], PrefixIndex] = {}
+        self._indexed_root: Any = None
+
+    def run(self) -> None:
+        """Read and dispatch command lines until EOF or an exit command."""
+        previous_completer = self._setup_readline()
+        try:
+            while True:
+                try:
+                    line = input(self.prompt)
+                except EOFError:
+                    print()
+                    break
+                except KeyboardInterrupt:
+                    print()
+                    continue
+                if not self.onecmd(line):
+                    break
+        finally:
+            self._teardown_readline(previous_completer)
+
+    def onecmd(self, line: str) -> bool:
+        """
+        Dispatch a single command line and print its result.
+
+        Errors raised by the command are printed and the shell carries on.
+
+        Returns:
+            bool: False if the shell should exit, True otherwise.
+        """
+        try:
+            args = shlex.split(line)
+        except ValueError as e:
+            print(self.parser.colored_output.red(f"Error: {str(e)}"))
+            return True
+
+        if not args:
+            return True
+        if args[0] in self.exit_commands:
+            return False
+        if args[0] in self.help_commands and len(args) == 1:
+            self.parser.print_help()
+            return True
+
+        try:
+            result = self.parser.dispatch(args, sink=print)
+        except SystemExit:
+            # --help and --version exit after printing; the shell carries on.
+            return True
+        except ArgonautError as e:
+            print(self.parser.colored_output.red(f"Error: {str(e)}"))
+        except KeyboardInterrupt:
+            print()
+        except Exception:
+            # A failing handler or plugin must not take the session with it.
+            traceback.print_exc()
+        else:
+            if result is not None:
+                print(result)
+        return True
+
+    def get_candidates(self, words: List[str], text: str) -> List[str]:
+        """Return the sorted completions for ``text`` after the given words."""
+        node = self.parser._get_command_node()
+        global_options = self.parser._get_global_options()
+        argument = None
+        for word in words:
+            argument = node.get_option(word) or global_options.get(word)
+            try:
+                child = node.get_child(word)
+            except ArgonautError:
+                child = None
+            if child is not None:
+                node = child[1]._get_command_node()
+
+        if argument is not None and not text.startswith("-"):
+            if argument.completer:
+                return filter_prefix(self._provide(argument), text)
+            if argument.choices:
+                return self._get_index(argument).matches(text)
+
+        matches = self._get_index(node, not words).matches(text)
+        history = {w for w in self._history_words() if w.startswith(text)}
+        return sorted(history.union(matches)) if history else list(matches)
+
+    def _get_index(self, *key: Any) -> PrefixIndex:
+        """Return the index of the static candidates of a node or argument."""
+        root = self.parser._get_command_node()
+        if root is not self._indexed_root:
+            # The command tree was rebuilt, so every cached index is stale.
+            self._indexes.clear()
+            self._indexed_root = root
+        index = self._indexes.get(key)
+        if index is None:
+            target = key[0]
+            if len(key) == 1:
+                words = {str(choice) for choice in target.choices}
+            else:
+                words = set(target.children.keys())
+                words.update(name for name in target.options if name.startswith("-"))
+                words.update(self.parser._get_global_options())
+                if key[1]:
+                    words.update(self.exit_commands + self.help_commands)
+            index = self._indexes[key] = PrefixIndex(words)
+        return index
+
+    def complete(self, text: str, state: int) -> Optional[str]:
+        if state == 0:
+            line = readline.get_line_buffer()[: readline.get_begidx()]
+            try:
+                words = shlex.split(line)
+            except ValueError:
+                words = line.split()
+            self._matches = self.get_candidates(words, text)
+        return self._matches[state] if state < len(self._matches) else None
+
+    def _provide(self, argument: Any) -> List[str]:
+        completer = argument.completer
+        spec = provider_spec(completer)
+        try:
+            if spec is None:
+                return sorted({str(item) for item in completer()})
+            provider = None if isinstance(completer, str) else completer
+            return CompletionCache().get(spec, argument.completion_ttl, provider)
+        except Exception:
+            return []
+
+    def _history_words(self) -> List[str]:
+        if not has_readline:
+            return []
+        words = []
+        for i in range(1, readline.get_current_history_length() + 1):
+            item = readline.get_history_item(i)
+            if item:
+                words.extend(item.split())
+        return words
+
+    def _setup_readline(self) -> Any:
+        if not has_readline:
+            return None
+        previous_completer = readline.get_completer()
+        if self.history_file and self.history_file.exists():
+            try:
+                readline.read_history_file(str(self.history_file))
+            except OSError:
+                pass
+        readline.set_completer_delims(" \t\n")
+        readline.set_completer(self.complete)
+        readline.parse_and_bind("tab: complete")
+        return previous_completer
+
+    def _teardown_readline(self, previous_completer: Any) -> None:
+        if not has_readline:
+            return
+        if self.history_file:
+            try:
+                readline.write_history_file(str(self.history_file))
+            except OSError:
+                pass
+        readline.set_completer(previous_completer)
@@ -0,0 +1,307 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from .exceptions import PluginTimeoutError
+
+# Returned by backends for a key they do not hold, since None is a valid result.
+MISSING = object()
+
+
+def default_cache_path() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return Path(base) / "argonaut" / "results.sqlite"
+
+
+class MemoryCache:
+    """
+    An in-process least-recently-used cache.
+
+    Attributes:
+        maxsize (int): The number of results kept before the least recently
+            used one is evicted.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    A cache stored in an SQLite database, shared by every process that uses
+    the same file and kept across runs.
+
+    Results are pickled, so they must be picklable; a result that is not is
+    simply not cached. Expired rows are removed when they are read.
+
+    Attributes:
+        path (Path): The database file.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(
+            str(self.path), timeout=5.0, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return MISSING
+            if row[1] < time.time():
+                with self._connection:
+                    self._connection.execute(
+                        "DELETE FROM results WHERE key = ?", (key,)
+                    )
+                return MISSING
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            return MISSING
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires) VALUES (?, ?, ?)",
+                (key, data, time.time() + ttl),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class CacheStats:
+    """
+    Counters for one plugin's cached results.
+
+    Attributes:
+        hits (int): Calls answered from the cache.
+        misses (int): Calls that ran the plugin.
+        coalesced (int): Calls that waited on an identical call already
+            running instead of running the plugin themselves.
+    """
+
+    __slots__ = ("hits", "misses", "coalesced")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hit_rate,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"CacheStats(hits={self.hits}, misses={self.misses}, "
+            f"coalesced={self.coalesced})"
+        )
+
+
+class ResultCache:
+    """
+    Memoizes plugin results in a cache backend.
+
+    Identical calls that arrive while the first is still running are
+    single-flighted: they wait for its result rather than running the plugin
+    again, across threads and event loops alike. Failures are never cached;
+    every caller waiting on a failed call gets its exception.
+
+    Attributes:
+        backend: A :class:`MemoryCache`, a :class:`SQLiteCache`, or any object
+            with the same ``get``/``set``/``clear`` methods.
+        stats (Dict[str, CacheStats]): The counters of each plugin.
+    """
+
+    def __init__(self, backend: Optional[Any] = None):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.stats: Dict[str, CacheStats] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(name: str, version: str, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return f"{name}:{version}:{digest}"
+
+    def get_or_compute(
+        self,
+        name: str,
+        key: str,
+        ttl: float,
+        compute: Callable[[], Any],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Return the cached result of ``key``, or run ``compute`` once for it.
+
+        ``timeout`` bounds how long a call waits for an identical one that
+        is already running. A call that gives up raises
+        :class:`PluginTimeoutError`; the running one carries on.
+        """
+        value = self.backend.get(key)
+        future, leader = self._claim(name, key, value)
+        if future is None:
+            return value
+        if not leader:
+            try:
+                return future.result(timeout)
+            except FutureTimeoutError:
+                if future.done():
+                    raise
+                raise PluginTimeoutError(name, timeout)
+        try:
+            value = compute()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, value, ttl)
+        return value
+
+    async def get_or_compute_async(
+        self,
+        name: str,
+        key: str,
+        ttl: float,
+        compute: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Asynchronous version of :meth:`get_or_compute`."""
+        value = self.backend.get(key)
+        future, leader = self._claim(name, key, value)
+        if future is None:
+            return value
+        if not leader:
+            # Shielded: cancelling a wrapped future cancels the one it wraps,
+            # which belongs to the leader.
+            waiter = asyncio.shield(asyncio.wrap_future(future))
+            try:
+                return await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                if future.done():
+                    raise
+                raise PluginTimeoutError(name, timeout)
+        try:
+            value = await compute()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, value, ttl)
+        return value
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def _claim(self, name: str, key: str, value: Any) -> Tuple[Optional[Future], bool]:
+        """
+        Count the call and find out who computes it. Returns no future on a
+        hit, the running call's future for a follower, or a new future the
+        caller must complete.
+        """
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = CacheStats()
+            if value is not MISSING:
+                stats.hits += 1
+                return None, False
+            future = self._inflight.get(key)
+            if future is not None:
+                stats.coalesced += 1
+                return future, False
+            stats.misses += 1
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def _finish(
+        self,
+        key: str,
+        future: Future,
+        value: Any = None,
+        ttl: float = 0.0,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        if error is None:
+            # Stored before the call stops being in flight, so a caller
+            # arriving in between finds one or the other. A result the
+            # backend cannot store is still returned, just not cached.
+            try:
+                self.backend.set(key, value, ttl)
+            except Exception:
+                pass
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
@@ -1,9 +1,15 @@
 # /usr/bin/env python3
 # -*- coding: utf-8 -*-
+import importlib.util
 import os
-from typing import List, Any
+import re
+import shlex
+from typing import List, Any, Dict, Union
 import sys
 from pathlib import Path
+from . import dynamic_completion
+
+ROOT_NODE = "_"
 
 
 def generate_completion_script(shell: str, parser: Any) -> str:
@@ -19,70 +25,362 @@ def generate_completion_script(shell: str, parser: Any) -> str:
         raise ValueError(f"Unsupported shell: {shell}")
 
 
+def compile_completion_table(parser: Any) -> Dict[str, Any]:
+    """
+    Compile the whole command tree into a static completion table.
+
+    Every command level is keyed by its path (``"_"`` for the top level,
+    ``"_/remote/add"`` below it) and records:
+
+    * ``words``: subcommand names, aliases and positional choices.
+    * ``options``: every option spelling at that level, global ones included.
+    * ``children``: the node each subcommand name or alias leads to.
+    * ``arity``: how many values each option consumes (``"*"`` for a
+      variable number, ``0`` for flags).
+    * ``choices``: the allowed values of options that have them.
+    * ``dynamic``: the ``"provider ttl"`` of options whose values come from a
+      completion provider, with the key ``""`` used for positional ones.
+
+    Lazily registered subcommands are built so their options can be listed.
+    The shell scripts generated from this table walk it with builtins only,
+    so pressing TAB only starts Python for values that need a provider.
+    """
+    global_arguments = parser._get_global_arguments()
+    table: Dict[str, Any] = {}
+
+    def visit(command: Any, path: str, node: Any) -> None:
+        entry = {
+            "words": [],
+            "options": [],
+            "children": {},
+            "arity": {},
+            "choices": {},
+            "dynamic": {},
+        }
+        table[path] = entry
+        entry["words"].extend(node.children.keys())
+
+        arguments = list(dict.fromkeys(list(node.options.values()) + global_arguments))
+        for arg in arguments:
+            provider = _get_provider(arg)
+            if arg.is_positional:
+                entry["words"].extend(str(choice) for choice in arg.choices or [])
+                if provider and "" not in entry["dynamic"]:
+                    entry["dynamic"][""] = provider
+                continue
+            for name in arg.names:
+                entry["options"].append(name)
+                entry["arity"][name] = _get_arity(arg)
+                if arg.choices:
+                    entry["choices"][name] = [str(choice) for choice in arg.choices]
+                if provider:
+                    entry["dynamic"][name] = provider
+
+        for token in node.children.keys():
+            name, child = node.get_child(token)
+            child_path = f"{path}/{name}"
+            entry["children"][token] = child_path
+            if child_path not in table:
+                visit(child, child_path, child._get_command_node())
+
+    visit(parser, ROOT_NODE, parser._get_command_node())
+    return table
+
+
+def _get_arity(arg: Any) -> Union[int, str]:
+    if arg.action in ("store_true", "store_false", "count") or callable(arg.action):
+        return 0
+    if isinstance(arg.nargs, int):
+        return arg.nargs
+    if arg.nargs in ("+", "*"):
+        return "*"
+    return 1
+
+
+def _get_provider(arg: Any) -> str:
+    if not arg.completer:
+        return ""
+    spec = dynamic_completion.provider_spec(arg.completer)
+    return f"{spec} {arg.completion_ttl:g}" if spec else ""
+
+
+def _get_provider_command(table: Dict[str, Any], shell: str) -> str:
+    """
+    Build the shell command that runs the ``__complete`` entry point.
+
+    The entry point is run as a plain script, so the directories holding the
+    providers' top-level modules are put on ``PYTHONPATH`` explicitly.
+    """
+    paths = []
+    for entry in table.values():
+        for provider in entry["dynamic"].values():
+            module = provider.split(":", 1)[0].split(".", 1)[0]
+            spec = importlib.util.find_spec(module)
+            if spec is None or not spec.origin:
+                continue
+            path = os.path.dirname(spec.origin)
+            if spec.submodule_search_locations is not None:
+                path = os.path.dirname(path)
+            if path not in paths:
+                paths.append(path)
+    pythonpath = shlex.quote(os.pathsep.join(paths))
+    command = (
+        f"{shlex.quote(sys.executable)} "
+        f"{shlex.quote(dynamic_completion.__file__)} __complete"
+    )
+    if shell == "fish":
+        return f"env PYTHONPATH={pythonpath}(string join -- {os.pathsep} '' $PYTHONPATH) {command}"
+    return f"PYTHONPATH={pythonpath}${{PYTHONPATH:+{os.pathsep}$PYTHONPATH}} {command}"
+
+
+def _get_function_name(parser: Any) -> str:
+    return "_argonaut_" + re.sub(r"\W", "_", parser.prog)
+
+
+def _flatten_table(table: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    """Flatten the table into string-to-string maps that shells can hold."""
+    flat: Dict[str, Dict[str, str]] = {
+        "words": {},
+        "opts": {},
+        "child": {},
+        "arity": {},
+        "choices": {},
+        "dynamic": {},
+    }
+    for path, entry in table.items():
+        flat["words"][path] = " ".join(entry["words"])
+        flat["opts"][path] = " ".join(entry["options"])
+        for token, child_path in entry["children"].items():
+            flat["child"][f"{path} {token}"] = child_path
+        for option, arity in entry["arity"].items():
+            if arity != 0:
+                flat["arity"][f"{path} {option}"] = str(arity)
+        for option, choices in entry["choices"].items():
+            flat["choices"][f"{path} {option}"] = " ".join(choices)
+        for option, provider in entry["dynamic"].items():
+            flat["dynamic"][f"{path} {option}" if option else path] = provider
+    return flat
+
+
 def _generate_bash_completion(parser: Any) -> str:
+    func = _get_function_name(parser)
+    table = compile_completion_table(parser)
+    tables = ""
+    for kind, values in _flatten_table(table).items():
+        items = " ".join(
+            f"[{shlex.quote(key)}]={shlex.quote(value)}"
+            for key, value in values.items()
+        )
+        tables += f"declare -gA {func}_{kind}=( {items} )\n"
+
     script = f"""
-_argonaut_completion()
+# Completion table for {parser.prog}, generated by Argonaut (requires bash >= 4).
+{tables}
+{func}_provide()
 {{
-    local cur prev opts
-    COMPREPLY=()
-    cur="${{COMP_WORDS[COMP_CWORD]}}"
-    prev="${{COMP_WORDS[COMP_CWORD-1]}}"
-    opts="{' '.join(_get_all_options(parser))}"
-    subcommands="{' '.join(parser.subcommands.keys())}"
+    {_get_provider_command(table, "bash")} ${{{func}_dynamic["$1"]}} "$2" 2>/dev/null
+}}
 
-    if [[ ${{cur}} == -* ]] ; then
-        COMPREPLY=( $(compgen -W "${{opts}}" -- ${{cur}}) )
-        return 0
-    fi
+{func}()
+{{
+    local cur="${{COMP_WORDS[COMP_CWORD]}}"
+    local node={ROOT_NODE} value_of="" word words arity i=1
+    COMPREPLY=()
 
-    case "${{prev}}" in
-{_generate_option_cases(parser)}
-    esac
+    while (( i < COMP_CWORD )); do
+        word="${{COMP_WORDS[i]}}"
+        if [[ ${{word}} == -* ]]; then
+            arity="${{{func}_arity["$node $word"]:-0}}"
+            if [[ ${{arity}} == "*" ]]; then
+                while (( i + 1 < COMP_CWORD )) && [[ ${{COMP_WORDS[i+1]}} != -* ]]; do
+                    (( i++ ))
+                done
+                if (( i + 1 == COMP_CWORD )) && [[ ${{cur}} != -* ]]; then
+                    value_of="$node $word"
+                fi
+            elif (( i + arity >= COMP_CWORD )); then
+                value_of="$node $word"
+                break
+            else
+                (( i += arity ))
+            fi
+        elif [[ -n "${{{func}_child["$node $word"]}}" ]]; then
+            node="${{{func}_child["$node $word"]}}"
+        fi
+        (( i++ ))
+    done
 
-    if [[ ${{COMP_CWORD}} -eq 1 ]] ; then
-        COMPREPLY=( $(compgen -W "${{subcommands}}" -- ${{cur}}) )
-        return 0
+    if [[ -n ${{value_of}} ]]; then
+        if [[ -n "${{{func}_dynamic["$value_of"]}}" ]]; then
+            COMPREPLY=( $(compgen -W "$({func}_provide "$value_of" "${{cur}}")" -- "${{cur}}") )
+        elif [[ -n "${{{func}_choices["$value_of"]}}" ]]; then
+            COMPREPLY=( $(compgen -W "${{{func}_choices["$value_of"]}}" -- "${{cur}}") )
+        else
+            COMPREPLY=( $(compgen -f -- "${{cur}}") )
+        fi
+    elif [[ ${{cur}} == -* ]]; then
+        COMPREPLY=( $(compgen -W "${{{func}_opts["$node"]}}" -- "${{cur}}") )
+    else
+        words="${{{func}_words["$node"]}}"
+        if [[ -n "${{{func}_dynamic["$node"]}}" ]]; then
+            words+=" $({func}_provide "$node" "${{cur}}")"
+        fi
+        COMPREPLY=( $(compgen -W "${{words}}" -- "${{cur}}") )
     fi
-
-    COMPREPLY=( $(compgen -W "${{opts}}" -- ${{cur}}) )
     return 0
 }}
 
-complete -F _argonaut_completion {os.path.basename(sys.argv[0])}
+complete -F {func} {parser.prog}
 """
     return script
 
 
 def _generate_zsh_completion(parser: Any) -> str:
+    func = _get_function_name(parser)
+    table = compile_completion_table(parser)
+    tables = ""
+    for kind, values in _flatten_table(table).items():
+        items = " ".join(
+            f"{shlex.quote(key)} {shlex.quote(value)}" for key, value in values.items()
+        )
+        tables += f"typeset -gA {func}_{kind}\n{func}_{kind}=( {items} )\n"
+
     script = f"""
-#compdef {os.path.basename(sys.argv[0])}
+#compdef {parser.prog}
+
+# Completion table for {parser.prog}, generated by Argonaut.
+{tables}
+{func}_provide() {{
+    {_get_provider_command(table, "zsh")} ${{={func}_dynamic[$1]}} "$2" 2>/dev/null
+}}
+
+{func}() {{
+    local cur="${{words[CURRENT]}}"
+    local node={ROOT_NODE} value_of="" word arity i=2
 
-_argonaut_completion() {{
-    local curcontext="$curcontext" state line
-    typeset -A opt_args
+    while (( i < CURRENT )); do
+        word="${{words[i]}}"
+        if [[ $word == -* ]]; then
+            arity="${{{func}_arity[$node $word]:-0}}"
+            if [[ $arity == "*" ]]; then
+                while (( i + 1 < CURRENT )) && [[ ${{words[i+1]}} != -* ]]; do
+                    (( i++ ))
+                done
+                if (( i + 1 == CURRENT )) && [[ $cur != -* ]]; then
+                    value_of="$node $word"
+                fi
+            elif (( i + arity >= CURRENT )); then
+                value_of="$node $word"
+                break
+            else
+                (( i += arity ))
+            fi
+        elif [[ -n "${{{func}_child[$node $word]}}" ]]; then
+            node="${{{func}_child[$node $word]}}"
+        fi
+        (( i++ ))
+    done
 
-    _arguments \\
-        {_generate_zsh_arguments(parser)}
+    if [[ -n $value_of ]]; then
+        if [[ -n "${{{func}_dynamic[$value_of]}}" ]]; then
+            compadd -- ${{(f)"$({func}_provide "$value_of" "$cur")"}}
+        elif [[ -n "${{{func}_choices[$value_of]}}" ]]; then
+            compadd -- ${{={func}_choices[$value_of]}}
+        else
+            _files
+        fi
+    elif [[ $cur == -* ]]; then
+        compadd -- ${{={func}_opts[$node]}}
+    else
+        compadd -- ${{={func}_words[$node]}}
+        if [[ -n "${{{func}_dynamic[$node]}}" ]]; then
+            compadd -- ${{(f)"$({func}_provide "$node" "$cur")"}}
+        fi
+    fi
 }}
 
-_argonaut_completion "$@"
+compdef {func} {parser.prog}
 """
     return script
 
 
 def _generate_fish_completion(parser: Any) -> str:
+    func = "_" + _get_function_name(parser)
+    table = compile_completion_table(parser)
+    tables = ""
+    for kind, values in _flatten_table(table).items():
+        records = " ".join(
+            shlex.quote(f"{key}\t{value}") for key, value in values.items()
+        )
+        tables += f"set -g {func}_{kind} {records}\n"
+
     script = f"""
-function __fish_argonaut_no_subcommand
-    set cmd (commandline -opc)
-    if [ (count $cmd) -eq 1 ]
-        return 0
-    end
-    return 1
+# Completion table for {parser.prog}, generated by Argonaut.
+{tables}
+function {func}_lookup --argument-names table key
+    string replace -rf -- '^'(string escape --style=regex -- $key)'\\t' '' $$table
 end
 
-{_generate_fish_options(parser)}
+function {func}_provide --argument-names key cur
+    set -l provider (string split ' ' -- ({func}_lookup {func}_dynamic $key))
+    {_get_provider_command(table, "fish")} $provider $cur 2>/dev/null
+end
+
+function {func}
+    set -l tokens (commandline -opc)
+    set -l cur (commandline -ct)
+    set -l n (count $tokens)
+    set -l node {ROOT_NODE}
+    set -l value_of
+    set -l i 2
+
+    while test $i -le $n
+        set -l word $tokens[$i]
+        if string match -q -- '-*' $word
+            set -l arity ({func}_lookup {func}_arity "$node $word")
+            test -z "$arity"; and set arity 0
+            if test "$arity" = '*'
+                while test $i -lt $n; and not string match -q -- '-*' $tokens[(math $i + 1)]
+                    set i (math $i + 1)
+                end
+                if test $i -eq $n; and not string match -q -- '-*' "$cur"
+                    set value_of "$node $word"
+                end
+            else if test (math $i + $arity) -gt $n
+                set value_of "$node $word"
+                break
+            else
+                set i (math $i + $arity)
+            end
+        else
+            set -l child ({func}_lookup {func}_child "$node $word")
+            test -n "$child"; and set node $child
+        end
+        set i (math $i + 1)
+    end
+
+    if test -n "$value_of"
+        set -l choices ({func}_lookup {func}_choices "$value_of")
+        set -l dynamic ({func}_lookup {func}_dynamic "$value_of")
+        if test -n "$dynamic"
+            {func}_provide "$value_of" "$cur"
+        else if test -n "$choices"
+            string split ' ' -- $choices
+        else
+            __fish_complete_path "$cur"
+        end
+    else if string match -q -- '-*' "$cur"
+        string split ' ' -- ({func}_lookup {func}_opts $node)
+    else
+        string split ' ' -- ({func}_lookup {func}_words $node)
+        set -l dynamic ({func}_lookup {func}_dynamic $node)
+        if test -n "$dynamic"
+            {func}_provide $node "$cur"
+        end
+    end
+end
 
-{_generate_fish_subcommands(parser)}
+complete -c {parser.prog} -f -a '({func})'
 """
     return script
 
@@ -105,39 +403,3 @@ def _get_all_options(parser: Any) -> List[str]:
     for arg in parser.arguments:
         options.extend([name for name in arg.names if name.startswith("-")])
     return options
-
-
-def _generate_option_cases(parser: Any) -> str:
-    cases = ""
-    for arg in parser.arguments:
-        if arg.choices:
-            cases += f"        {arg.names[0]})\n"
-            cases += f"            COMPREPLY=( $(compgen -W \"{' '.join(arg.choices)}\" -- ${{cur}}) )\n"
-            cases += "            return 0\n"
-            cases += "            ;;\n"
-    return cases
-
-
-def _generate_zsh_arguments(parser: Any) -> str:
-    args = []
-    for arg in parser.arguments:
-        arg_str = f"'{arg.names[0]}[{arg.help}]"
-        if arg.choices:
-            arg_str += f":({' '.join(arg.choices)})"
-        arg_str += "'"
-        args.append(arg_str)
-    return " \\\n        ".join(args)
-
-
-def _generate_fish_options(parser: Any) -> str:
-    options = ""
-    for arg in parser.arguments:
-        options += f"complete -c {os.path.basename(sys.argv[0])} -n '__fish_argonaut_no_subcommand' -l {arg.names[0][2:]} -d '{arg.help}'\n"
-    return options
-
-
-def _generate_fish_subcommands(parser: Any) -> str:
-    subcommands = ""
-    for name, subcommand in parser.subcommands.items():
-        subcommands += f"complete -c {os.path.basename(sys.argv[0])} -n '__fish_argonaut_no_subcommand' -a {name} -d '{subcommand.description}'\n"
-    return subcommands
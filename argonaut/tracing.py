@@ -0,0 +1,377 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Union
+
+TRACE_FORMATS = ("chrome", "otlp")
+
+# Returned by Tracer.span while nobody listens, so instrumenting a phase
+# costs next to nothing unless tracing or profiling is on.
+_NOT_TRACING = contextlib.nullcontext()
+
+# The innermost open span of the running thread or task. Tasks and
+# asyncio.to_thread copy it, so their spans nest under the span that
+# started them.
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "argonaut_current_span", default=None
+)
+
+
+class Span:
+    """
+    One timed operation of a trace.
+
+    Attributes:
+        name (str): What was timed, e.g. ``"parse: validate"``.
+        span_id (str): 16 hex digits, unique within the trace.
+        parent_id (Optional[str]): The span this one ran within.
+        start_ns (int): ``time.perf_counter_ns()`` when it started.
+        end_ns (int): ``time.perf_counter_ns()`` when it ended.
+        lane (tuple): The thread, and the asyncio task if any, it ran on.
+            Concurrent tasks of one thread get lanes of their own.
+        attributes (Dict[str, Any]): Details such as the plugin's name.
+        error (Optional[str]): The exception that ended it, if any.
+        has_children (bool): Whether other spans ran within it.
+    """
+
+    __slots__ = (
+        "name",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "lane",
+        "attributes",
+        "error",
+        "has_children",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["Span"],
+        start_ns: int,
+        attributes: Dict[str, Any],
+    ):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = None
+        if parent is not None:
+            self.parent_id = parent.span_id
+            parent.has_children = True
+        self.start_ns = start_ns
+        self.end_ns = start_ns
+        self.lane = _lane()
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.has_children = False
+
+    @property
+    def seconds(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def __repr__(self):
+        return f"Span({self.name!r}, {self.seconds * 1000:.3f}ms)"
+
+
+class Tracer:
+    """
+    Records spans around parsing, config loading, plugin loading, hooks and
+    plugin executions, and writes them to a local file for a trace viewer.
+
+    Two formats are written:
+
+    - ``"chrome"``: a Chrome trace-event JSON file, for Perfetto
+      (https://ui.perfetto.dev) or ``chrome://tracing``. Each thread, and
+      each asyncio task, such as every call of ``execute_plugin_async``
+      gathered together, is drawn on a row of its own.
+    - ``"otlp"``: OpenTelemetry (OTLP/JSON) trace requests, one per line,
+      appended to the file, as the OpenTelemetry Collector's file exporter
+      writes them, so its ``otlpjsonfile`` receiver can forward them.
+
+    Spans are only recorded while the tracer is started, and only the last
+    ``max_spans`` are kept, so a long-running shell or daemon does not grow
+    without bound. Others may listen for every span that ends (the
+    :class:`Profiler` sums them by name), and while nobody does,
+    :meth:`span` and :meth:`record` do nothing.
+
+    Started when the parser is created if ``ARGONAUT_TRACE`` names the file
+    to write; the format follows ``ARGONAUT_TRACE_FORMAT``, or else the
+    file's extension (``.jsonl`` for OTLP, anything else for Chrome).
+    Spans of process workers are not recorded, only the time the parent
+    waited for them.
+
+    Attributes:
+        active (bool): Whether spans are being recorded or listened to.
+        spans (Deque[Span]): The most recent spans recorded.
+        max_spans (int): How many spans are kept.
+        dropped (int): How many older spans were dropped to keep to it.
+        service_name (str): Reported as the OTLP ``service.name``.
+    """
+
+    def __init__(self, service_name: str = "argonaut", max_spans: int = 100_000):
+        self.active = False
+        self.recording = False
+        self.max_spans = max_spans
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+        self.dropped = 0
+        self.service_name = service_name
+        self.trace_id = ""
+        self.path: Optional[str] = None
+        self.format: Optional[str] = None
+        self._listeners: List[Callable[[Span], Any]] = []
+        self._epoch_offset_ns = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start recording spans, dropping any recorded before."""
+        with self._lock:
+            self.spans = deque(maxlen=self.max_spans)
+            self.dropped = 0
+            self.trace_id = os.urandom(16).hex()
+            self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+            self.recording = True
+            self.active = True
+
+    def start_from_env(self) -> bool:
+        """
+        Start recording if ``ARGONAUT_TRACE`` is set.
+
+        Returns:
+            bool: Whether it was.
+        """
+        path = os.environ.get("ARGONAUT_TRACE")
+        if not path:
+            return False
+        self.path = path
+        self.format = os.environ.get("ARGONAUT_TRACE_FORMAT") or None
+        self.start()
+        return True
+
+    def stop(self) -> None:
+        with self._lock:
+            self.recording = False
+            self.active = bool(self._listeners)
+
+    def add_listener(self, listener: Callable[[Span], Any]) -> None:
+        """Call ``listener(span)`` whenever a span ends."""
+        with self._lock:
+            self._listeners = self._listeners + [listener]
+            self.active = True
+
+    def remove_listener(self, listener: Callable[[Span], Any]) -> None:
+        with self._lock:
+            self._listeners = [l for l in self._listeners if l != listener]
+            self.active = self.recording or bool(self._listeners)
+
+    def span(self, name: str, **attributes: Any):
+        """A context manager that times what runs within it as a span."""
+        if not self.active:
+            return _NOT_TRACING
+        return self._span(name, attributes)
+
+    @contextlib.contextmanager
+    def _span(self, name: str, attributes: Dict[str, Any]):
+        span = Span(name, _current_span.get(), time.perf_counter_ns(), attributes)
+        reset = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(reset)
+            span.end_ns = time.perf_counter_ns()
+            self._finish(span)
+
+    def record(
+        self,
+        name: str,
+        seconds: float,
+        error: Optional[BaseException] = None,
+        **attributes: Any,
+    ) -> None:
+        """Record a span of ``seconds`` that has just ended."""
+        if not self.active:
+            return
+        end_ns = time.perf_counter_ns()
+        span = Span(name, _current_span.get(), end_ns - int(seconds * 1e9), attributes)
+        span.end_ns = end_ns
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        for listener in self._listeners:
+            listener(span)
+        if self.recording:
+            if len(self.spans) == self.max_spans:
+                self.dropped += 1
+            self.spans.append(span)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """The recorded spans as a Chrome trace-event document."""
+        spans = list(self.spans)
+        origin = min((span.start_ns for span in spans), default=0)
+        pid = os.getpid()
+        lanes: Dict[tuple, int] = {}
+        events: List[Dict[str, Any]] = []
+        for span in sorted(spans, key=lambda span: span.start_ns):
+            tid = lanes.get(span.lane)
+            if tid is None:
+                tid = lanes[span.lane] = len(lanes) + 1
+                events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": pid,
+                        "tid": tid,
+                        "args": {"name": _lane_name(span.lane)},
+                    }
+                )
+            args = dict(span.attributes)
+            if span.error is not None:
+                args["error"] = span.error
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": "argonaut",
+                    "ph": "X",
+                    "ts": (span.start_ns - origin) / 1000,
+                    "dur": (span.end_ns - span.start_ns) / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": _jsonable(args),
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The recorded spans as an OTLP/JSON ``ExportTraceServiceRequest``."""
+        otlp_spans = []
+        for span in list(self.spans):
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns + self._epoch_offset_ns),
+                "endTimeUnixNano": str(span.end_ns + self._epoch_offset_ns),
+                "attributes": _otlp_attributes(
+                    {
+                        **span.attributes,
+                        "thread.id": span.lane[0],
+                        "thread.name": span.lane[1],
+                    }
+                ),
+                "status": {},
+            }
+            if span.parent_id is not None:
+                otlp_span["parentSpanId"] = span.parent_id
+            if span.error is not None:
+                otlp_span["status"] = {"code": 2, "message": span.error}
+            otlp_spans.append(otlp_span)
+        resource = {"service.name": self.service_name, "process.pid": os.getpid()}
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otlp_attributes(resource)},
+                    "scopeSpans": [
+                        {"scope": {"name": "argonaut"}, "spans": otlp_spans}
+                    ],
+                }
+            ]
+        }
+
+    def export(
+        self, path: Union[str, Path, None] = None, format: Optional[str] = None
+    ) -> None:
+        """
+        Write the recorded spans to ``path``.
+
+        A Chrome trace replaces the file, atomically; OTLP appends a line.
+
+        Args:
+            path (Union[str, Path, None]): Defaults to ``ARGONAUT_TRACE``.
+            format (Optional[str]): ``"chrome"`` or ``"otlp"``. Defaults to
+                ``ARGONAUT_TRACE_FORMAT``, or else the file's extension.
+
+        Raises:
+            ValueError: If there is no path or the format is unknown.
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("No trace file given")
+        path = Path(path)
+        format = format or self.format
+        if format is None:
+            format = "otlp" if path.suffix == ".jsonl" else "chrome"
+        if format not in TRACE_FORMATS:
+            raise ValueError(
+                f"Unknown trace format '{format}'. "
+                f"Available: {', '.join(TRACE_FORMATS)}"
+            )
+        if format == "otlp":
+            with path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(self.to_otlp(), separators=(",", ":")) + "\n")
+            return
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps(self.to_chrome()), encoding="utf-8")
+        os.replace(temp_path, path)
+
+    def write_at_exit(self) -> None:
+        """Stop recording and export, reporting a failure on stderr."""
+        self.stop()
+        try:
+            self.export()
+        except (OSError, ValueError) as e:
+            print(f"Could not write trace to {self.path}: {e}", file=sys.stderr)
+
+
+def _lane() -> tuple:
+    thread = threading.current_thread()
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is None:
+        return (thread.ident, thread.name, None)
+    return (thread.ident, thread.name, task.get_name())
+
+
+def _lane_name(lane: tuple) -> str:
+    _, thread_name, task_name = lane
+    return thread_name if task_name is None else f"{thread_name} / {task_name}"
+
+
+def _jsonable(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value if isinstance(value, (str, int, float, bool)) else repr(value)
+        for key, value in attributes.items()
+    }
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    result = []
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        result.append({"key": key, "value": typed})
+    return result
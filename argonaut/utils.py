@@ -6,17 +6,66 @@ try:
     has_readline = True
 except ImportError:
     has_readline = False
-from typing import List
+import importlib
+from bisect import bisect_left, insort
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
 
 
-def get_input_with_autocomplete(prompt: str, choices: List[str]) -> str:
-    if has_readline:
+class PrefixIndex:
+    """
+    A sorted set of words answering prefix queries with two bisections.
+
+    All words sharing a prefix sit next to each other in sorted order, so
+    finding them costs O(log n) plus the size of the result, however many
+    words the index holds. The matches of the last prefix are kept, which
+    makes :meth:`complete` usable directly as a readline completer: readline
+    calls it once per candidate with the same text, and only the first call
+    does any work.
+    """
+
+    __slots__ = ("_words", "_prefix", "_matches")
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._words: List[str] = sorted(set(words))
+        self._prefix: Optional[str] = None
+        self._matches: List[str] = []
+
+    def add(self, word: str) -> None:
+        if word not in self:
+            insort(self._words, word)
+            self._prefix = None
+
+    def range(self, prefix: str) -> Tuple[int, int]:
+        """Return the slice bounds of the words starting with ``prefix``."""
+        start = bisect_left(self._words, prefix)
+        return start, bisect_left(self._words, prefix + "\U0010ffff", start)
+
+    def matches(self, prefix: str) -> List[str]:
+        if prefix != self._prefix:
+            start, end = self.range(prefix)
+            self._prefix, self._matches = prefix, self._words[start:end]
+        return self._matches
 
-        def completer(text: str, state: int) -> str:
-            options = [choice for choice in choices if choice.startswith(text)]
-            return options[state] if state < len(options) else None
+    def complete(self, text: str, state: int) -> Optional[str]:
+        matches = self.matches(text)
+        return matches[state] if state < len(matches) else None
 
-        readline.set_completer(completer)
+    def __contains__(self, word: object) -> bool:
+        if not isinstance(word, str):
+            return False
+        i = bisect_left(self._words, word)
+        return i < len(self._words) and self._words[i] == word
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._words)
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+
+def get_input_with_autocomplete(prompt: str, choices: List[str]) -> str:
+    if has_readline:
+        readline.set_completer(PrefixIndex(choices).complete)
         readline.parse_and_bind("tab: complete")
 
     user_input = input(prompt)
@@ -29,3 +78,16 @@ def get_input_with_autocomplete(prompt: str, choices: List[str]) -> str:
 
 def sanitize_input(input_str: str) -> str:
     return input_str.replace(";", "").replace("&", "").replace("|", "")
+
+
+def import_from_string(spec: Union[str, Callable[..., Any]]) -> Callable[..., Any]:
+    """Resolve a ``"package.module:attribute"`` spec, passing callables through."""
+    if callable(spec):
+        return spec
+    module_name, _, attribute = spec.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"Expected 'module:attribute', got '{spec}'")
+    target = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        target = getattr(target, part)
+    return target
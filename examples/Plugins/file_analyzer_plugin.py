@@ -1,7 +1,7 @@
 # /usr/bin/env python3
 # -*- coding: utf-8 -*-
 from argonaut.plugins import Plugin, PluginMetadata, PluginContext
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional
 import os
 import re
 import asyncio
@@ -33,6 +33,24 @@ class FileAnalyzerPlugin(Plugin):
     def dependencies(self) -> List[str]:
         return []
 
+    @property
+    def cache_ttl(self) -> float:
+        return 300.0
+
+    def cache_key(self, args: Dict[str, Any]) -> Optional[str]:
+        # Only read-only analyses of individual files are cached, keyed on
+        # each file's size and mtime so an edited file is analyzed again.
+        if args.get("replace") or args.get("directory") or not args.get("files"):
+            return None
+        stamps = []
+        for file_path in args["files"]:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                return None
+            stamps.append((os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size))
+        return repr((sorted(args.items(), key=lambda item: item[0]), stamps))
+
     @property
     def banner(self) -> str:
         return r"""
@@ -99,6 +117,16 @@ class FileAnalyzerPlugin(Plugin):
         self.execute_hook("before_analyze", args)
         return self.analyze_targets(args)
 
+    def execute_stream(self, args: Dict[str, Any]) -> Iterator[str]:
+        self.verbose = args.get("verbose", False)
+        self.quiet = args.get("quiet", False)
+        if not args.get("files") and not args.get("directory"):
+            yield "Error: No files or directory specified for analysis."
+            return
+
+        self.execute_hook("before_analyze", args)
+        yield from self.iter_results(args)
+
     async def execute_async(self, args: Dict[str, Any]) -> Any:
         self.logger.info("Executing File Analyzer plugin asynchronously")
         return await self.analyze_targets_async(args)
@@ -107,23 +135,28 @@ class FileAnalyzerPlugin(Plugin):
         self.log("Starting file/folder analysis", "verbose")
 
     def analyze_targets(self, args: Dict[str, Any]) -> str:
-        results = []
+        return "\n\n".join(self.iter_results(args))
+
+    def iter_results(self, args: Dict[str, Any]) -> Iterator[str]:
+        """Yield the result of each file as soon as it is analyzed."""
+        cancellation = self.context.cancellation
         if args.get("files"):
             for file_path in args["files"]:
+                cancellation.raise_if_cancelled()
                 path = Path(file_path).resolve()
                 if path.is_file():
-                    results.append(self.process_file(path, args))
+                    result = self.process_file(path, args)
+                    if result:
+                        yield result
                 else:
-                    results.append(f"Error: Invalid file path - {path}")
+                    yield f"Error: Invalid file path - {path}"
 
         if args.get("directory"):
             dir_path = Path(args["directory"]).resolve()
             if dir_path.is_dir():
-                results.extend(self.process_directory(dir_path, args))
+                yield from self.iter_directory(dir_path, args)
             else:
-                results.append(f"Error: Invalid directory path - {dir_path}")
-
-        return "\n\n".join(filter(None, results))
+                yield f"Error: Invalid directory path - {dir_path}"
 
     async def analyze_targets_async(self, args: Dict[str, Any]) -> str:
         tasks = []
@@ -186,19 +219,24 @@ class FileAnalyzerPlugin(Plugin):
             return f"Error processing {file_path}: {str(e)}"
 
     def process_directory(self, dir_path: Path, args: Dict[str, Any]) -> List[str]:
-        results = []
+        return list(self.iter_directory(dir_path, args))
+
+    def iter_directory(self, dir_path: Path, args: Dict[str, Any]) -> Iterator[str]:
+        cancellation = self.context.cancellation
         if args.get("recursive"):
             for root, _, files in os.walk(dir_path):
                 for file in files:
+                    cancellation.raise_if_cancelled()
                     file_path = Path(root) / file
                     if self._should_analyze_file(file_path, args):
-                        results.append(self.process_file(file_path, args))
+                        result = self.process_file(file_path, args)
+                        if result:
+                            yield result
         else:
-            results.append(f"Contents of {dir_path}:")
+            yield f"Contents of {dir_path}:"
             for item in dir_path.iterdir():
                 if item.is_file() and self._should_analyze_file(item, args):
-                    results.append(f"  {item.name}")
-        return list(filter(None, results))
+                    yield f"  {item.name}"
 
     async def process_file_async(self, file_path: Path, args: Dict[str, Any]) -> str:
         return await asyncio.to_thread(self.process_file, file_path, args)
@@ -2,7 +2,6 @@
 # -*- coding: utf-8 -*-
 from argonaut.plugins import Plugin, PluginMetadata, PluginContext
 from typing import Dict, Any, List
-import asyncio
 import aiohttp
 from bs4 import BeautifulSoup
 
@@ -46,24 +45,29 @@ class WebScraperPlugin(Plugin):
         )
 
     def execute(self, args: Dict[str, Any]) -> Dict[str, Any]:
-        return asyncio.run(self.scrape_url_async(args["url"]))
+        # Runs on the plugin manager's shared loop, where the session lives.
+        return self.context.run(self.scrape_url_async(args["url"]))
 
     async def execute_async(self, args: Dict[str, Any]) -> Dict[str, Any]:
-        return await self.scrape_url_async(args["url"])
+        return await self.context.run_async(self.scrape_url_async(args["url"]))
 
     async def scrape_url_async(self, url: str) -> Dict[str, Any]:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    soup = BeautifulSoup(html, "html.parser")
-                    title = soup.title.string if soup.title else "No title found"
-                    return {"url": url, "title": title, "status": response.status}
-                else:
-                    return {
-                        "url": url,
-                        "error": f"Failed to scrape. Status code: {response.status}",
-                    }
+        # One session, and its connection pool, is shared by every call and
+        # closed when the plugin is cleaned up.
+        session = await self.context.get_resource_async(
+            "aiohttp.ClientSession", aiohttp.ClientSession
+        )
+        async with session.get(url) as response:
+            if response.status == 200:
+                html = await response.text()
+                soup = BeautifulSoup(html, "html.parser")
+                title = soup.title.string if soup.title else "No title found"
+                return {"url": url, "title": title, "status": response.status}
+            else:
+                return {
+                    "url": url,
+                    "error": f"Failed to scrape. Status code: {response.status}",
+                }
 
 
 def register_plugin():
@@ -0,0 +1,49 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+import json
+
+from argonaut import Argonaut
+
+
+def build_parser():
+    parser = Argonaut(description="batch test")
+    greet = parser.add_subcommand("greet")
+    greet.add("--name")
+
+    def handler(args):
+        print(f"hello {args.get('name')}")
+        return {"greeted": args.get("name")}
+
+    greet.set_handler(handler)
+    return parser
+
+
+def run(**kwargs):
+    source = io.StringIO("\n".join(f"greet --name n{i}" for i in range(6)))
+    output = io.StringIO()
+    failures = build_parser().run_batch(source, output, **kwargs)
+    return failures, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def check(records):
+    assert len(records) == 6
+    for record in records:
+        name = record["result"]["greeted"]
+        assert record["exit"] == 0
+        assert record["stdout"] == f"hello {name}\n"
+
+
+def test_thread_pool_captures_output():
+    failures, records = run(jobs=3)
+    assert failures == 0
+    check(records)
+
+
+def test_process_pool_with_factory_captures_output(capfd):
+    failures, records = run(
+        jobs=2, use_processes=True, parser_factory=f"{__name__}:build_parser"
+    )
+    assert failures == 0
+    check(records)
+    assert "hello" not in capfd.readouterr().out
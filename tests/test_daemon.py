@@ -0,0 +1,71 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+from argonaut import Argonaut
+from argonaut.daemon import ArgonautDaemon, default_socket_path, write_client_script
+from argonaut.exceptions import ArgonautError
+
+
+@pytest.fixture
+def shared_tmp(tmp_path, monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+def test_socket_directory_is_private(shared_tmp):
+    path = default_socket_path("tool")
+    directory = os.path.dirname(path)
+    assert directory == str(shared_tmp / f"argonaut-{os.getuid()}")
+    assert stat.S_IMODE(os.lstat(directory).st_mode) == 0o700
+    assert default_socket_path("tool") == path
+
+
+def test_socket_directory_open_to_others_is_refused(shared_tmp):
+    directory = shared_tmp / f"argonaut-{os.getuid()}"
+    directory.mkdir()
+    directory.chmod(0o755)
+    with pytest.raises(ArgonautError):
+        default_socket_path("tool")
+
+
+def test_socket_directory_symlink_is_refused(shared_tmp):
+    (shared_tmp / "elsewhere").mkdir(mode=0o700)
+    (shared_tmp / f"argonaut-{os.getuid()}").symlink_to(shared_tmp / "elsewhere")
+    with pytest.raises(ArgonautError):
+        default_socket_path("tool")
+
+
+def test_client_runs_command_through_daemon(shared_tmp):
+    parser = Argonaut(description="daemon test")
+    socket_path = default_socket_path("tool")
+    daemon = ArgonautDaemon(
+        parser, socket_path, handler=lambda argv: print(f"hello {argv[-1]}")
+    )
+    server = threading.Thread(target=daemon.serve_forever, daemon=True)
+    server.start()
+    deadline = time.time() + 5
+    while not os.path.exists(socket_path) and time.time() < deadline:
+        time.sleep(0.01)
+    try:
+        client = write_client_script("tool", socket_path, shared_tmp, ["false"])
+        result = subprocess.run(
+            [sys.executable, "-S", str(client), "greet", "world"],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+    finally:
+        daemon.shutdown()
+        server.join(5)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == "hello world\n"
@@ -0,0 +1,34 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+from argonaut.dynamic_completion import CompletionCache
+
+CALLS = []
+
+
+def hosts():
+    CALLS.append(threading.current_thread().name)
+    return ["beta", "alpha"]
+
+
+def test_expired_entry_is_refreshed_on_a_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "fork", lambda: (_ for _ in ()).throw(AssertionError))
+    cache = CompletionCache(str(tmp_path))
+    spec = f"{__name__}:hosts"
+    CALLS.clear()
+    assert cache.get(spec, ttl=60, provider=hosts) == ["alpha", "beta"]
+    computed_at, _ = cache.read(spec)
+    time.sleep(0.05)
+    assert cache.get(spec, ttl=0.01, provider=hosts) == ["alpha", "beta"]
+    lock_path = cache._path(spec) + ".lock"
+    deadline = time.time() + 5
+    while time.time() < deadline and (
+        cache.read(spec)[0] == computed_at or os.path.exists(lock_path)
+    ):
+        time.sleep(0.01)
+    assert cache.read(spec)[0] > computed_at
+    assert CALLS[-1] == "argonaut-completion-refresh"
+    assert not os.path.exists(lock_path)
@@ -0,0 +1,51 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+import pytest
+
+from argonaut.exceptions import RateLimitError
+from argonaut.limits import ExecutionLimiter
+
+
+def test_fail_fast_over_concurrency_limit():
+    limiter = ExecutionLimiter(max_concurrent=1, block=False)
+    limiter.acquire()
+    started = time.monotonic()
+    with pytest.raises(RateLimitError) as error:
+        limiter.acquire()
+    assert error.value.period == "execution"
+    assert time.monotonic() - started < 0.5
+    limiter.release()
+    limiter.acquire()
+
+
+def test_fail_fast_over_rate_limit():
+    limiter = ExecutionLimiter(rate=1, burst=1, block=False)
+    limiter.acquire()
+    with pytest.raises(RateLimitError) as error:
+        limiter.acquire()
+    assert error.value.period == "second"
+
+
+def test_rate_token_is_refunded_when_no_slot_is_free():
+    limiter = ExecutionLimiter(max_concurrent=1, rate=0.01, burst=2, block=False)
+    limiter.acquire()
+    with pytest.raises(RateLimitError):
+        limiter.acquire()
+    limiter.release()
+    limiter.acquire()
+
+
+def test_rate_token_is_refunded_when_no_slot_is_free_async():
+    limiter = ExecutionLimiter(max_concurrent=1, rate=0.01, burst=2, block=False)
+
+    async def scenario():
+        await limiter.acquire_async()
+        with pytest.raises(RateLimitError):
+            await limiter.acquire_async()
+        limiter.release()
+        await limiter.acquire_async()
+
+    asyncio.run(scenario())
@@ -0,0 +1,29 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+
+from argonaut import Argonaut
+from argonaut.exceptions import ParsingError
+
+
+def build_parser():
+    parser = Argonaut(description="parsing test", allow_subcommand_prefix=True)
+    parser.add_global_argument("--name")
+    parser.add_subcommand("start")
+    parser.add_subcommand("stop")
+    return parser
+
+
+def test_option_value_is_not_resolved_as_a_subcommand():
+    parsed = build_parser().parse(["--name", "st", "start"])
+    assert parsed["name"] == "st"
+    assert parsed["subcommand"] == "start"
+
+
+def test_unambiguous_prefix_selects_the_subcommand():
+    assert build_parser().parse(["sta"])["subcommand"] == "start"
+
+
+def test_ambiguous_prefix_is_a_parsing_error():
+    with pytest.raises(ParsingError):
+        build_parser().parse(["st"])
@@ -0,0 +1,194 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import textwrap
+import threading
+import time
+
+import pytest
+
+from argonaut import Argonaut
+from argonaut.exceptions import PluginTimeoutError, RateLimitError
+
+PLUGIN_SOURCE = textwrap.dedent("""
+    import time
+
+    from argonaut.cancellation import current_token
+    from argonaut.plugins import Plugin, PluginMetadata
+
+    CALLS = []
+
+
+    class Worker(Plugin):
+        metadata = PluginMetadata("worker", "1.0", "test plugin", "tests", "")
+
+        cache_ttl = 60
+
+        def initialize(self, context):
+            super().initialize(context)
+            self.alive = True
+            self.tokens = []
+
+        def cache_key(self, args):
+            return args.get("cache")
+
+        def execute(self, args):
+            assert self.alive, "ran after cleanup"
+            CALLS.append(args)
+            self.tokens.append(current_token())
+            if args.get("wait_cancel"):
+                return current_token().wait(args["wait_cancel"])
+            time.sleep(args.get("sleep", 0))
+            assert self.alive, "cleaned up mid-run"
+            return args.get("value")
+
+        async def execute_async(self, args):
+            return self.execute(args)
+
+        def cleanup(self):
+            self.alive = False
+    """)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    path = tmp_path / "worker_plugin.py"
+    path.write_text(PLUGIN_SOURCE)
+    manager = Argonaut(description="plugin test").plugin_manager
+    manager.dependency_mode = "never"
+    manager.load_plugin(str(path))
+    yield manager
+    manager.shutdown()
+
+
+def test_map_items_are_cancelled_on_shutdown(manager):
+    items = [{"wait_cancel": 10}] * 3
+    results = manager.map_plugin("worker", items, concurrency=3, backend="thread")
+    threading.Timer(0.2, manager.shutdown, kwargs={"wait": False}).start()
+    started = time.monotonic()
+    assert [r.result for r in results] == [True, True, True]
+    assert time.monotonic() - started < 5
+    assert not manager._active_tokens
+
+
+def test_hooks_run_coroutines_on_the_shared_loop(manager):
+    plugin = manager.plugins["worker"]
+    loops = []
+
+    async def validate(args):
+        loops.append(asyncio.get_running_loop())
+        return bool(args)
+
+    async def observe(name, args, result, duration):
+        loops.append(asyncio.get_running_loop())
+
+    plugin.register_hook("validate", validate)
+    assert plugin.execute_hook("validate", {"a": 1}, combine=all) is True
+    assert plugin.execute_hook("validate", {}, combine=all) is False
+    manager.register_hook("after_execute", observe)
+    manager.execute_plugin("worker", {"value": 1})
+    assert len(loops) == 3
+    assert all(loop is manager.loop_runner.loop for loop in loops)
+
+
+def run_in_threads(count, function):
+    results, errors = [], []
+
+    def target():
+        try:
+            results.append(function())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_reload_during_concurrent_executions(manager):
+    old = manager.plugins["worker"]
+    stop = threading.Event()
+
+    def hammer():
+        count = 0
+        while not stop.is_set():
+            assert manager.execute_plugin("worker", {"value": 1}) == 1
+            count += 1
+        return count
+
+    threads, results, errors = run_in_threads(8, hammer)
+    slow, slow_results, slow_errors = run_in_threads(
+        1, lambda: manager.execute_plugin("worker", {"sleep": 0.3, "value": 2})
+    )
+    time.sleep(0.05)
+    for _ in range(5):
+        manager.reload_plugin("worker")
+    stop.set()
+    for thread in threads + slow:
+        thread.join()
+    assert not errors and not slow_errors
+    assert slow_results == [2] and sum(results) > 0
+    assert not old.alive
+    assert manager.plugins["worker"] is not old
+    assert manager.plugins["worker"].alive
+    assert not manager._active_tokens
+
+
+def test_coalesced_callers_share_one_computation(manager):
+    args = {"cache": "shared", "sleep": 0.3, "value": 7}
+    threads, results, errors = run_in_threads(
+        5, lambda: manager.execute_plugin("worker", args)
+    )
+    for thread in threads:
+        thread.join()
+    assert not errors and results == [7] * 5
+    assert len(manager.plugins["worker"].tokens) == 1
+    stats = manager.cache_stats()["worker"]
+    assert stats["misses"] == 1
+    assert stats["coalesced"] + stats["hits"] == 4
+
+
+def test_coalesced_caller_times_out_while_the_leader_runs(manager):
+    args = {"cache": "slow", "sleep": 0.5, "value": 3}
+    threads, results, errors = run_in_threads(
+        1, lambda: manager.execute_plugin("worker", args)
+    )
+    while not manager.result_cache._inflight:
+        time.sleep(0.01)
+    started = time.monotonic()
+    with pytest.raises(PluginTimeoutError):
+        manager.execute_plugin("worker", args, timeout=0.1)
+    assert time.monotonic() - started < 0.4
+    threads[0].join()
+    assert not errors and results == [3]
+    assert manager.execute_plugin("worker", args, timeout=0.1) == 3
+
+
+def test_limit_fails_fast_when_not_blocking(manager):
+    manager.set_limits("worker", max_concurrent=1, block=False)
+    threads, results, errors = run_in_threads(
+        1, lambda: manager.execute_plugin("worker", {"sleep": 0.3, "value": 1})
+    )
+    while not manager.plugins["worker"].tokens:
+        time.sleep(0.01)
+    started = time.monotonic()
+    with pytest.raises(RateLimitError):
+        manager.execute_plugin("worker", {"value": 2})
+    assert time.monotonic() - started < 0.2
+    threads[0].join()
+    assert not errors and results == [1]
+    assert manager.execute_plugin("worker", {"value": 2}) == 2
+
+
+@pytest.mark.parametrize("backend", ["inline", "thread"])
+def test_timeout_cancels_the_execution_token(manager, backend):
+    started = time.monotonic()
+    with pytest.raises(PluginTimeoutError):
+        manager.execute_plugin(
+            "worker", {"wait_cancel": 10}, backend=backend, timeout=0.2
+        )
+    assert time.monotonic() - started < 2
+    token = manager.plugins["worker"].tokens[-1]
+    assert token.cancelled
+    assert token.wait_finished(5)
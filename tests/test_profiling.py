@@ -0,0 +1,36 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+from argonaut import Argonaut
+
+
+def make_parser():
+    parser = Argonaut()
+    greet = parser.add_subcommand("greet")
+    greet.add("--name")
+    greet.set_handler(lambda args: "hi")
+    return parser
+
+
+def test_profile_is_opt_in():
+    parser = make_parser()
+    assert "profile" not in parser.dispatch(["greet"])
+    assert not parser.profiler.active
+
+
+def test_application_profile_argument_is_left_alone():
+    parser = make_parser()
+    parser.add("--profile")
+    parser.enable_profiling()
+    assert parser.parse(["--profile", "prod"])["profile"] == "prod"
+    assert not parser.profiler.active
+
+
+def test_dispatch_profiles_the_command_line(capsys):
+    parser = make_parser()
+    parser.enable_profiling()
+    assert parser.dispatch(["greet", "--name", "x"]) == "hi"
+    assert capsys.readouterr().err == ""
+    assert parser.dispatch(["--profile", "greet", "--name", "x"]) == "hi"
+    report = capsys.readouterr().err
+    assert "parse: tokenize" in report
+    assert not parser.profiler.active
@@ -0,0 +1,17 @@
+# /usr/bin/env python3
+# -*- coding: utf-8 -*-
+from argonaut import Argonaut
+from argonaut.repl import ArgonautShell
+
+
+def test_unexpected_error_keeps_the_shell_running(tmp_path, capsys):
+    parser = Argonaut(description="repl test")
+    shell = ArgonautShell(parser, history_file=tmp_path / "history")
+
+    def dispatch(args, sink=None):
+        raise ValueError("broken handler")
+
+    parser.dispatch = dispatch
+    assert shell.onecmd("anything") is True
+    assert "ValueError: broken handler" in capsys.readouterr().err
+    assert shell.onecmd("exit") is False